@@ -0,0 +1,55 @@
+import sys
+import os
+import time
+
+# Ensure we can import from src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from proteintoolbox.skills.esm_skills import ESMSkills
+
+MODELS = [
+    "facebook/esm2_t6_8M_UR50D",
+    "facebook/esm2_t12_35M_UR50D",
+    "facebook/esm2_t30_150M_UR50D",
+]
+
+BACKENDS = {
+    "fp32": {},
+    "int8": {"quantize": True},
+    "bf16": {"dtype": "bfloat16"},
+}
+
+SEQUENCES = [
+    "MKTVRQERLKSIVRILERSKEPVSGAQLAEELSVSRQVIVQDIAYLRSLGYNIVATPRGYVLAGG",
+    "TTCCPSIVARSNFNVCRLPGTPEAICATYTGCIIIPGATCPGDYAN",
+    "GIVEQCCTSICSLYQLENYCN" * 10,
+] * 4
+
+def benchmark(model_name: str, backend: dict, num_threads: int, reference: ESMSkills) -> dict:
+    skills = ESMSkills(model_name, device="cpu", num_threads=num_threads, **backend)
+    skills.get_embedding(SEQUENCES[0])  # Warm-up (loads the model)
+
+    start = time.perf_counter()
+    for seq in SEQUENCES:
+        skills.get_embedding(seq)
+    elapsed = time.perf_counter() - start
+
+    accuracy = skills.compare_to_reference(SEQUENCES[:3], reference=reference)
+    return {
+        "seq_per_s": len(SEQUENCES) / elapsed,
+        "residues_per_s": sum(len(s) for s in SEQUENCES) / elapsed,
+        "min_cosine": accuracy["min_cosine_similarity"],
+    }
+
+def main():
+    num_threads = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    print(f"ESM CPU benchmark ({num_threads} threads)")
+    print(f"{'model':<32} {'backend':<6} {'seq/s':>8} {'res/s':>10} {'cos(fp32)':>10}")
+    for model_name in MODELS:
+        reference = ESMSkills(model_name, device="cpu", num_threads=num_threads)
+        for label, backend in BACKENDS.items():
+            row = benchmark(model_name, backend, num_threads, reference)
+            print(f"{model_name:<32} {label:<6} {row['seq_per_s']:>8.2f} {row['residues_per_s']:>10.0f} {row['min_cosine']:>10.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import sys
+import os
+import tempfile
+
+# Ensure we can import from src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import numpy as np
+from openmm import app, unit
+from proteintoolbox.skills.sim_skills import MinimizationEngine
+
+TEST_PDB = os.path.join(os.path.dirname(__file__), '../tests/data/pdb1crn.ent')
+
+MODES = ["vacuum", "cutoff", "obc2", "gbn2", "pme"]
+COPIES = [int(n) for n in os.environ.get("BENCH_COPIES", "1,8,27").split(",")]
+MAX_ITERATIONS = 100
+
+def tiled_structure(n_copies: int, path: str) -> str:
+    """Writes n copies of crambin on a 3 nm lattice as separate chains (scales the atom count)."""
+    pdb = app.PDBFile(TEST_PDB)
+    modeller = app.Modeller(pdb.topology, pdb.positions)
+    coords = pdb.getPositions(asNumpy=True).value_in_unit(unit.nanometer)
+    side = max(1, round(n_copies ** (1 / 3)))
+    for i in range(1, n_copies):
+        shift = 3.0 * np.array([i % side, (i // side) % side, i // side ** 2])
+        modeller.add(pdb.topology, (coords + shift) * unit.nanometer)
+    with open(path, 'w') as f:
+        app.PDBFile.writeFile(modeller.topology, modeller.positions, f)
+    return path
+
+def benchmark(mode: str, pdb_path: str, threads: int) -> dict:
+    engine = MinimizationEngine(platform="CPU", threads=threads, solvent=mode)
+    output = os.path.join(os.path.dirname(pdb_path), f"{mode}_min.pdb")
+    report = engine.minimize(pdb_path, output, max_iterations=MAX_ITERATIONS)
+    timings = report["timings"]
+    return {
+        "atoms": report["n_atoms"],
+        "setup_s": timings["load"] + timings["hydrogens"] + timings["create_system"],
+        "minimize_s": timings["minimize"],
+    }
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    modes = sys.argv[2].split(",") if len(sys.argv) > 2 else MODES
+    print(f"Minimization benchmark ({threads} CPU threads, {MAX_ITERATIONS} L-BFGS iterations)")
+    print(f"| {'mode':<7} | {'copies':>6} | {'atoms':>7} | {'setup (s)':>9} | {'minimize (s)':>12} |")
+    print(f"|{'-' * 9}|{'-' * 8}|{'-' * 9}|{'-' * 11}|{'-' * 14}|")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_copies in COPIES:
+            pdb_path = tiled_structure(n_copies, os.path.join(tmp, f"crambin_x{n_copies}.pdb"))
+            for mode in modes:
+                row = benchmark(mode, pdb_path, threads)
+                print(f"| {mode:<7} | {n_copies:>6} | {row['atoms']:>7} | {row['setup_s']:>9.2f} | {row['minimize_s']:>12.2f} |")
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,6 @@ import os
 # Add the src directory to python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from proteintoolbox.agents.crew import run_design_task
 from proteintoolbox.registry import ToolRegistry
 
 def main():
@@ -23,6 +22,8 @@ def main():
         if choice == '1':
             request = input("Describe your design goal (e.g., 'Design an antibody for target X'): ")
             if request:
+                # Deferred so the menu appears without loading crewai and the skill stack
+                from proteintoolbox.agents.crew import run_design_task
                 result = run_design_task(request)
                 print("\n\n##################################################")
                 print("FINAL WORKFLOW PLAN:")
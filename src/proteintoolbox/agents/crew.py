@@ -4,9 +4,9 @@ from crewai.tools import BaseTool as CrewTool
 
 from proteintoolbox.registry import ToolRegistry
 from proteintoolbox.resources import ResourceManager
+# Only the modules used directly are imported; other skills load lazily via SKILL_REGISTRY
 from proteintoolbox.skills import (
-    bio_skills, sim_skills, docking_skills, 
-    analysis_skills, design_skills, search_skills, logic_skills, graph_reasoning,
+    logic_skills, graph_reasoning,
     SKILL_REGISTRY, get_skill_description_for_agents
 )
 
@@ -55,11 +55,12 @@ class RegistrySearchTool(CrewTool):
 
 class ResourceCheckTool(CrewTool):
     name: str = "Check System Resources"
-    description: str = "Check if GPU/CUDA is available for compute-intensive tasks."
+    description: str = "Check if GPU/CUDA is available and how many CPU cores and memory are free for compute-intensive tasks."
 
     def _run(self, query: str) -> str:
         status = resources.get_status()
-        return f"System Resources: GPU Available: {status['gpu_available']}, Name: {status['gpu_name']}"
+        return (f"System Resources: GPU Available: {status['gpu_available']}, Name: {status['gpu_name']}, "
+                f"CPU Cores: {status['cpu_count']}, Available Memory: {status['available_memory_mb']} MB")
 
 class LogicTool(CrewTool):
     name: str = "Workflow Logic Analyzer"
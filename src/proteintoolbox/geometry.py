@@ -0,0 +1,176 @@
+import numpy as np
+from typing import Dict, Tuple
+
+def kabsch(mobile: np.ndarray, reference: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Optimal rotation superposing `mobile` onto `reference` (both N x 3).
+
+    Returns:
+        (rotation, mobile_centroid, reference_centroid) such that
+        `(mobile - mobile_centroid) @ rotation + reference_centroid` is superposed.
+    """
+    mobile_centroid = mobile.mean(axis=0)
+    reference_centroid = reference.mean(axis=0)
+    covariance = (mobile - mobile_centroid).T @ (reference - reference_centroid)
+    u, _, vt = np.linalg.svd(covariance)
+    # Flip the last axis if needed so the result is a proper rotation (no reflection)
+    d = np.sign(np.linalg.det(u @ vt))
+    u[:, -1] *= d
+    return u @ vt, mobile_centroid, reference_centroid
+
+def superpose(mobile: np.ndarray, reference: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Superposes `mobile` onto `reference`. Returns (superposed coordinates, RMSD)."""
+    rotation, mobile_centroid, reference_centroid = kabsch(mobile, reference)
+    fitted = (mobile - mobile_centroid) @ rotation + reference_centroid
+    return fitted, float(np.sqrt(((fitted - reference) ** 2).sum(axis=1).mean()))
+
+def kabsch_batch(mobile: np.ndarray, reference: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized `kabsch` for a stack of coordinate sets: `mobile` is B x N x 3 and `reference`
+    is N x 3 (shared) or B x N x 3. All B 3x3 SVDs run in one LAPACK call.
+
+    Returns:
+        (rotations B x 3 x 3, mobile_centroids B x 3, reference_centroids B x 3 or 3).
+    """
+    mobile_centroids = mobile.mean(axis=-2)
+    reference_centroids = reference.mean(axis=-2)
+    centered = mobile - mobile_centroids[:, None, :]
+    covariance = centered.transpose(0, 2, 1) @ (reference - reference_centroids[..., None, :])
+    u, _, vt = np.linalg.svd(covariance)
+    d = np.sign(np.linalg.det(u @ vt))
+    u[:, :, -1] *= d[:, None]
+    return u @ vt, mobile_centroids, reference_centroids
+
+def superpose_batch(mobile: np.ndarray, reference: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Superposes every set in `mobile` (B x N x 3) onto `reference` (N x 3 or B x N x 3).
+    Returns (superposed coordinates B x N x 3, RMSDs of length B).
+    """
+    rotations, mobile_centroids, reference_centroids = kabsch_batch(mobile, reference)
+    fitted = (mobile - mobile_centroids[:, None, :]) @ rotations + reference_centroids[..., None, :]
+    return fitted, np.sqrt(((fitted - reference) ** 2).sum(axis=-1).mean(axis=-1))
+
+def pairwise_rmsd(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Optimal-superposition RMSD between every set in `a` (I x N x 3) and every set in `b`
+    (J x N x 3), as an I x J matrix.
+
+    All I x J covariances come from one matrix product, and each RMSD from the largest root
+    of the QCP quartic (Theobald 2005), found by Newton iterations vectorized over all pairs.
+    No rotations or superposed coordinates are formed, except for pairs where Newton does not
+    converge (degenerate, e.g. collinear, sets), which fall back to an SVD superposition.
+    """
+    a = a - a.mean(axis=1, keepdims=True)
+    b = b - b.mean(axis=1, keepdims=True)
+    n = a.shape[1]
+    s = (a.transpose(0, 2, 1).reshape(-1, n) @ b.transpose(1, 0, 2).reshape(n, -1))
+    s = s.reshape(len(a), 3, len(b), 3).transpose(0, 2, 1, 3)
+    (sxx, sxy, sxz), (syx, syy, syz), (szx, szy, szz) = [[s[..., i, j] for j in range(3)] for i in range(3)]
+    key = np.stack([
+        np.stack([sxx + syy + szz, syz - szy, szx - sxz, sxy - syx], axis=-1),
+        np.stack([syz - szy, sxx - syy - szz, sxy + syx, szx + sxz], axis=-1),
+        np.stack([szx - sxz, sxy + syx, -sxx + syy - szz, syz + szy], axis=-1),
+        np.stack([sxy - syx, szx + sxz, syz + szy, -sxx - syy + szz], axis=-1),
+    ], axis=-2)
+    # Characteristic polynomial of the key matrix: x^4 + c2 x^2 + c1 x + c0
+    c2 = -2.0 * (s ** 2).sum(axis=(-1, -2))
+    c1 = -8.0 * np.linalg.det(s)
+    c0 = np.linalg.det(key)
+    e0 = (a ** 2).sum(axis=(1, 2))[:, None] + (b ** 2).sum(axis=(1, 2))[None, :]
+    # Newton from the upper bound E0 / 2 converges monotonically to the largest root
+    root = e0 / 2.0
+    converged = np.zeros(root.shape, dtype=bool)
+    for _ in range(50):
+        x2 = root * root
+        value = x2 * x2 + c2 * x2 + c1 * root + c0
+        derivative = 4.0 * x2 * root + 2.0 * c2 * root + c1
+        # Degenerate sets (e.g. collinear coordinates) can zero the derivative: leave those
+        # pairs unconverged instead of stepping to inf/NaN
+        step = np.divide(value, derivative, out=np.full_like(root, np.nan), where=derivative != 0)
+        converged = np.abs(step) <= 1e-11 * np.abs(root)
+        root = np.where(np.isfinite(step), root - step, root)
+        if converged.all():
+            break
+    rmsd = np.sqrt(np.maximum(e0 - 2.0 * root, 0) / n)
+    # SVD superposition for the (rare) pairs Newton could not settle
+    ii, jj = np.nonzero(~converged | ~np.isfinite(rmsd))
+    if len(ii):
+        rmsd[ii, jj] = superpose_batch(a[ii], b[jj])[1]
+    return rmsd
+
+def dihedrals(p0: np.ndarray, p1: np.ndarray, p2: np.ndarray, p3: np.ndarray) -> np.ndarray:
+    """
+    Dihedral angles in degrees (-180, 180] for stacked quadruplets of points (each ... x 3),
+    from batched cross products: atan2(|b2| b1 . (b2 x b3), (b1 x b2) . (b2 x b3)).
+    """
+    b1, b2, b3 = p1 - p0, p2 - p1, p3 - p2
+    n1 = np.cross(b1, b2)
+    n2 = np.cross(b2, b3)
+    y = np.linalg.norm(b2, axis=-1) * (b1 * n2).sum(axis=-1)
+    x = (n1 * n2).sum(axis=-1)
+    return np.degrees(np.arctan2(y, x))
+
+def radius_of_gyration(coords: np.ndarray, masses: np.ndarray = None):
+    """
+    (Mass-weighted) radius of gyration of an N x 3 coordinate set, or of each set in a
+    B x N x 3 stack (returns an array of length B).
+    """
+    weights = np.ones(coords.shape[-2]) if masses is None else np.asarray(masses, dtype=float)
+    center = (coords * weights[:, None]).sum(axis=-2) / weights.sum()
+    squared = ((coords - center[..., None, :]) ** 2).sum(axis=-1)
+    rg = np.sqrt((squared * weights).sum(axis=-1) / weights.sum())
+    return float(rg) if coords.ndim == 2 else rg
+
+class RunningStats:
+    """
+    Welford accumulator for the per-element mean and variance of a stream of equally shaped
+    arrays (e.g. superposed frames), in constant memory.
+    """
+
+    def __init__(self, shape: Tuple[int, ...] = None):
+        self.count = 0
+        self.mean = np.zeros(shape) if shape is not None else None
+        self.m2 = np.zeros(shape) if shape is not None else None
+
+    def update(self, values: np.ndarray):
+        if self.mean is None:
+            self.mean = np.zeros(values.shape)
+            self.m2 = np.zeros(values.shape)
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (values - self.mean)
+
+    def update_batch(self, values: np.ndarray):
+        """Adds a stack of arrays at once (first axis = samples)."""
+        if len(values):
+            mean = values.mean(axis=0)
+            self.merge(len(values), mean, ((values - mean) ** 2).sum(axis=0))
+
+    def merge(self, count: int, mean: np.ndarray, m2: np.ndarray):
+        """Combines the statistics of another sample set (Chan et al. parallel update)."""
+        if count == 0:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2 = count, np.array(mean, dtype=float), np.array(m2, dtype=float)
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + delta ** 2 * (self.count * count / total)
+        self.count = total
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self.m2 / self.count if self.count else np.zeros_like(self.mean)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"count": np.array(self.count), "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "RunningStats":
+        stats = cls()
+        stats.count = int(state["count"])
+        stats.mean = np.array(state["mean"], dtype=float)
+        stats.m2 = np.array(state["m2"], dtype=float)
+        return stats
@@ -8,8 +8,7 @@ from streamlit_molstar import st_molstar, st_molstar_rcsb
 # Add src to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from proteintoolbox.skills import bio_skills, sim_skills, design_skills, docs_skills, structure_skills, validation_skills
-from proteintoolbox.agents.crew import run_design_task
+from proteintoolbox.skills import docs_skills
 from proteintoolbox.project import ProjectManager
 from proteintoolbox.registry import ToolRegistry
 
@@ -221,6 +220,8 @@ elif mode == "Agent Workflow":
         
         with st.spinner("Agents are working..."):
             try:
+                # Deferred: crewai is slow to import and only needed here
+                from proteintoolbox.agents.crew import run_design_task
                 result = run_design_task(user_request, llm_config)
                 st.success("Workflow Complete!")
                 st.subheader("Result")
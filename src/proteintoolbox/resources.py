@@ -1,18 +1,217 @@
-import torch
+import os
+import sys
+import math
+import time
 import shutil
+import subprocess
+from functools import cached_property, lru_cache
+from typing import Dict, List, Optional
+
+class ResourceProbe:
+    """
+    Lightweight hardware probe that reads /proc, cgroup files and nvidia-smi instead of
+    importing torch. Static capacity (cores, limits, GPUs) is cached on first access;
+    `snapshot()` reports live utilization.
+    """
+
+    def __init__(self, proc_root: str = "/proc", cgroup_root: str = "/sys/fs/cgroup"):
+        self.proc_root = proc_root
+        self.cgroup_root = cgroup_root
+
+    @staticmethod
+    def _read(path: str) -> Optional[str]:
+        try:
+            with open(path, 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _meminfo(self) -> Dict[str, int]:
+        """Parses /proc/meminfo into bytes."""
+        info = {}
+        text = self._read(os.path.join(self.proc_root, "meminfo")) or ""
+        for line in text.splitlines():
+            key, _, value = line.partition(":")
+            parts = value.split()
+            if parts and parts[0].isdigit():
+                info[key] = int(parts[0]) * 1024
+        return info
+
+    @cached_property
+    def cgroup_cpu_limit(self) -> Optional[float]:
+        """CPU quota in cores from cgroup v2 (cpu.max) or v1 (cfs quota), or None if unlimited."""
+        cpu_max = self._read(os.path.join(self.cgroup_root, "cpu.max"))
+        if cpu_max:
+            quota, _, period = cpu_max.partition(" ")
+            if quota != "max" and period:
+                return int(quota) / int(period)
+            return None
+
+        quota = self._read(os.path.join(self.cgroup_root, "cpu", "cpu.cfs_quota_us"))
+        period = self._read(os.path.join(self.cgroup_root, "cpu", "cpu.cfs_period_us"))
+        if quota and period and int(quota) > 0:
+            return int(quota) / int(period)
+        return None
+
+    @cached_property
+    def cgroup_memory_limit(self) -> Optional[int]:
+        """Memory limit in bytes from cgroup v2 (memory.max) or v1, or None if unlimited."""
+        limit = self._read(os.path.join(self.cgroup_root, "memory.max"))
+        if limit is None:
+            limit = self._read(os.path.join(self.cgroup_root, "memory", "memory.limit_in_bytes"))
+        if not limit or limit == "max":
+            return None
+        limit = int(limit)
+        # cgroup v1 reports "unlimited" as a huge page-aligned number
+        return limit if limit < 2 ** 60 else None
+
+    @cached_property
+    def cpu_count(self) -> int:
+        """Usable cores: CPU affinity capped by the cgroup quota."""
+        try:
+            count = len(os.sched_getaffinity(0))
+        except AttributeError:
+            count = os.cpu_count() or 1
+        if self.cgroup_cpu_limit:
+            count = min(count, max(1, math.ceil(self.cgroup_cpu_limit)))
+        return count
+
+    @cached_property
+    def total_memory(self) -> int:
+        """Usable memory in bytes: physical RAM capped by the cgroup limit."""
+        total = self._meminfo().get("MemTotal", 0)
+        if self.cgroup_memory_limit:
+            total = min(total, self.cgroup_memory_limit) if total else self.cgroup_memory_limit
+        return total
+
+    @cached_property
+    def gpus(self) -> List[Dict]:
+        """NVIDIA GPUs visible to this process (respects CUDA_VISIBLE_DEVICES)."""
+        visible = os.environ.get("CUDA_VISIBLE_DEVICES")
+        if visible is not None and visible.strip() in ("", "-1"):
+            return []
+
+        gpus = []
+        if shutil.which("nvidia-smi"):
+            try:
+                out = subprocess.run(
+                    ["nvidia-smi", "--query-gpu=index,name,memory.total", "--format=csv,noheader,nounits"],
+                    capture_output=True, text=True, timeout=10, check=True
+                ).stdout
+                for line in out.strip().splitlines():
+                    index, name, memory = [p.strip() for p in line.split(",")]
+                    gpus.append({"index": int(index), "name": name, "memory_mb": int(memory)})
+            except (OSError, subprocess.SubprocessError, ValueError):
+                gpus = []
+        elif os.path.isdir(os.path.join(self.proc_root, "driver", "nvidia", "gpus")):
+            for i, _ in enumerate(sorted(os.listdir(os.path.join(self.proc_root, "driver", "nvidia", "gpus")))):
+                gpus.append({"index": i, "name": "NVIDIA GPU", "memory_mb": None})
+
+        if visible:
+            allowed = {v.strip() for v in visible.split(",")}
+            gpus = [g for g in gpus if str(g["index"]) in allowed]
+        return gpus
+
+    def get_capacity(self) -> Dict:
+        """Static capacity (cached)."""
+        return {
+            "cpu_count": self.cpu_count,
+            "cgroup_cpu_limit": self.cgroup_cpu_limit,
+            "total_memory_mb": self.total_memory // 2 ** 20,
+            "cgroup_memory_limit_mb": self.cgroup_memory_limit // 2 ** 20 if self.cgroup_memory_limit else None,
+            "gpu_count": len(self.gpus),
+            "gpus": self.gpus,
+        }
+
+    def _cpu_times(self):
+        text = self._read(os.path.join(self.proc_root, "stat")) or ""
+        for line in text.splitlines():
+            if line.startswith("cpu "):
+                values = [int(v) for v in line.split()[1:]]
+                idle = values[3] + (values[4] if len(values) > 4 else 0)
+                return sum(values), idle
+        return None
+
+    def available_memory(self) -> int:
+        """Currently available memory in bytes (MemAvailable, capped by cgroup headroom)."""
+        available = self._meminfo().get("MemAvailable", 0)
+        if self.cgroup_memory_limit:
+            current = self._read(os.path.join(self.cgroup_root, "memory.current"))
+            if current is None:
+                current = self._read(os.path.join(self.cgroup_root, "memory", "memory.usage_in_bytes"))
+            if current is not None:
+                headroom = max(0, self.cgroup_memory_limit - int(current))
+                available = min(available, headroom) if available else headroom
+        return available
+
+    def snapshot(self, interval: float = 0.1) -> Dict:
+        """
+        Live utilization: CPU busy fraction over `interval` seconds, load average and free memory.
+        """
+        before = self._cpu_times()
+        if before and interval > 0:
+            time.sleep(interval)
+        after = self._cpu_times()
+
+        cpu_percent = None
+        if before and after and after[0] > before[0]:
+            total, idle = after[0] - before[0], after[1] - before[1]
+            cpu_percent = 100.0 * (1 - idle / total)
+
+        try:
+            load = os.getloadavg()
+        except OSError:
+            load = (None, None, None)
+
+        return {
+            "timestamp": time.time(),
+            "cpu_percent": cpu_percent,
+            "load_average": load,
+            "available_memory_mb": self.available_memory() // 2 ** 20,
+            "cpu_count": self.cpu_count,
+        }
+
+    def recommend_workers(self, threads_per_worker: int = 1, memory_per_worker_mb: int = None,
+                          max_workers: int = None) -> int:
+        """
+        Sizes a worker pool so that workers x threads fits the usable cores (and memory, if given).
+        """
+        workers = max(1, self.cpu_count // max(1, threads_per_worker))
+        if memory_per_worker_mb:
+            workers = min(workers, max(1, self.available_memory() // (memory_per_worker_mb * 2 ** 20)))
+        if max_workers:
+            workers = min(workers, max_workers)
+        return workers
+
+    def threads_per_worker(self, n_workers: int) -> int:
+        """Splits the usable cores evenly across `n_workers` workers."""
+        return max(1, self.cpu_count // max(1, n_workers))
+
+@lru_cache(maxsize=1)
+def get_probe() -> ResourceProbe:
+    """Shared, cached probe instance."""
+    return ResourceProbe()
 
 class ResourceManager:
     def __init__(self):
-        self.gpu_available = torch.cuda.is_available()
-        self.gpu_count = torch.cuda.device_count() if self.gpu_available else 0
-        self.gpu_name = torch.cuda.get_device_name(0) if self.gpu_available else "None"
+        self.probe = get_probe()
+        gpus = self.probe.gpus
+        self.gpu_available = len(gpus) > 0
+        self.gpu_count = len(gpus)
+        self.gpu_name = gpus[0]["name"] if gpus else "None"
 
     def get_status(self):
+        # Only report the CUDA runtime version if torch has already been loaded elsewhere
+        torch = sys.modules.get("torch")
+        cuda_version = torch.version.cuda if (torch and self.gpu_available) else None
         return {
             "gpu_available": self.gpu_available,
             "gpu_count": self.gpu_count,
             "gpu_name": self.gpu_name,
-            "cuda_version": torch.version.cuda if self.gpu_available else None
+            "cuda_version": cuda_version,
+            "cpu_count": self.probe.cpu_count,
+            "total_memory_mb": self.probe.total_memory // 2 ** 20,
+            "available_memory_mb": self.probe.available_memory() // 2 ** 20,
         }
 
     def check_tool_requirements(self, tool_name: str) -> bool:
@@ -0,0 +1,13 @@
+from typing import Dict, List, Tuple, Union
+from Bio import SeqIO
+
+def read_sequence_records(sequences: Union[str, List[str], Dict[str, str]]) -> List[Tuple[str, str]]:
+    """
+    (id, sequence) pairs from a FASTA path, a dict of id -> sequence, or a list of sequences
+    (named seq_1, seq_2, ... in order).
+    """
+    if isinstance(sequences, str):
+        return [(record.id, str(record.seq)) for record in SeqIO.parse(sequences, "fasta")]
+    if isinstance(sequences, dict):
+        return list(sequences.items())
+    return [(f"seq_{i + 1}", seq) for i, seq in enumerate(sequences)]
@@ -1,68 +1,212 @@
 """
 Central Skill Registry for ProteinToolbox
 
-This file dynamically discovers and registers all functions from skill modules.
+This file discovers and registers all functions from skill modules.
 It creates a SKILL_REGISTRY that can be imported by the GUI and agents.
+
+A skill is a top-level function listed in its module's `__all__`; other functions are
+helpers. Discovery is driven by a static manifest (skill_manifest.json) holding each
+skill's name, signature and docstring. Modules whose source changed since the manifest
+was written are re-scanned in memory by parsing the source (never importing it), and a
+skill module is only imported the first time one of its functions is called. Importing
+this package therefore stays fast and does not require torch, openmm, vina, etc. to be
+installed. The manifest file is only written by `write_manifest()`
+(`python -m proteintoolbox.skills`).
 """
-import inspect
-from . import (
-    bio_skills,
-    sim_skills,
-    docking_skills,
-    analysis_skills,
-    design_skills,
-    docs_skills,
-    logic_skills,
-    search_skills,
-    structure_skills,
-    validation_skills,
-    graph_reasoning,
-)
-
-# List of all skill modules to be introspected
+import ast
+import hashlib
+import importlib
+import json
+import os
+import tempfile
+
+# Skill modules (in this package) to be registered
 SKILL_MODULES = [
-    bio_skills,
-    sim_skills,
-    docking_skills,
-    analysis_skills,
-    design_skills,
-    docs_skills,
-    logic_skills,
-    search_skills,
-    structure_skills,
-    validation_skills,
-    graph_reasoning,
+    "bio_skills",
+    "sim_skills",
+    "docking_skills",
+    "analysis_skills",
+    "design_skills",
+    "docs_skills",
+    "logic_skills",
+    "search_skills",
+    "structure_skills",
+    "validation_skills",
+    "graph_reasoning",
+    "similarity_skills",
+    "esm_skills",
+    "pocket_skills",
+    "trajectory_skills",
+    "superposition_skills",
+    "clustering_skills",
+    "interface_skills",
+    "secondary_structure_skills",
+    "interaction_skills",
 ]
 
+MANIFEST_PATH = os.path.join(os.path.dirname(__file__), "skill_manifest.json")
+
 SKILL_REGISTRY = {}
 
+class LazySkill:
+    """
+    Callable stand-in for a skill function that imports its module on first call.
+    """
+    def __init__(self, name: str, module: str, description: str = None):
+        self.__name__ = name
+        self.__module__ = module
+        self.__doc__ = description
+        self._func = None
+
+    def resolve(self):
+        """Imports the skill module (once) and returns the real function."""
+        if self._func is None:
+            self._func = getattr(importlib.import_module(self.__module__), self.__name__)
+        return self._func
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<LazySkill {self.__module__}.{self.__name__}>"
+
+def _format_signature(node: ast.FunctionDef) -> str:
+    """
+    Renders a function signature from its AST in the style of `inspect.signature`.
+    """
+    args = node.args
+    params = []
+
+    def fmt(arg: ast.arg, default: ast.expr = None) -> str:
+        text = arg.arg
+        if arg.annotation is not None:
+            text += f": {ast.unparse(arg.annotation)}"
+        if default is not None:
+            text += f" = {ast.unparse(default)}" if arg.annotation is not None else f"={ast.unparse(default)}"
+        return text
+
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    for i, (arg, default) in enumerate(zip(positional, defaults)):
+        params.append(fmt(arg, default))
+        if args.posonlyargs and i == len(args.posonlyargs) - 1:
+            params.append("/")
+
+    if args.vararg:
+        params.append("*" + fmt(args.vararg))
+    elif args.kwonlyargs:
+        params.append("*")
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        params.append(fmt(arg, default))
+    if args.kwarg:
+        params.append("**" + fmt(args.kwarg))
+
+    signature = f"({', '.join(params)})"
+    if node.returns is not None:
+        signature += f" -> {ast.unparse(node.returns)}"
+    return signature
+
+def _exported_names(module_name: str, tree: ast.Module) -> list:
+    """The literal `__all__` list of a skill module."""
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets):
+            return list(ast.literal_eval(node.value))
+    raise ValueError(f"Skill module '{module_name}' must list its skills in __all__")
+
+def _scan_module(module_name: str, source: bytes) -> dict:
+    """
+    Extracts the top-level functions listed in a skill module's `__all__` from its source
+    without importing it.
+    """
+    tree = ast.parse(source)
+    exported = set(_exported_names(module_name, tree))
+    skills = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name in exported:
+            skills.append({
+                "name": node.name,
+                "description": ast.get_docstring(node) or "No description provided.",
+                "signature": _format_signature(node),
+            })
+    return {
+        "source_hash": hashlib.sha1(source).hexdigest(),
+        "skills": sorted(skills, key=lambda s: s["name"]),
+    }
+
+def load_manifest(rebuild: bool = False) -> dict:
+    """
+    Loads the committed skill manifest, re-scanning in memory any module whose source has
+    changed (every module with `rebuild=True`). Never writes the manifest file.
+    """
+    manifest = {}
+    if not rebuild and os.path.exists(MANIFEST_PATH):
+        try:
+            with open(MANIFEST_PATH, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+
+    package_dir = os.path.dirname(__file__)
+    for module_name in SKILL_MODULES:
+        with open(os.path.join(package_dir, f"{module_name}.py"), 'rb') as f:
+            source = f.read()
+        entry = manifest.get(module_name)
+        if entry is None or entry.get("source_hash") != hashlib.sha1(source).hexdigest():
+            manifest[module_name] = _scan_module(module_name, source)
+
+    return {name: manifest[name] for name in SKILL_MODULES}
+
+def write_manifest(path: str = MANIFEST_PATH) -> dict:
+    """
+    Rebuilds the manifest from the module sources and writes it atomically (temporary file
+    in the same directory, then `os.replace`), so concurrent readers never see a partial file.
+    Run after changing a skill module and commit the result.
+    """
+    manifest = load_manifest(rebuild=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2)
+            f.write("\n")
+        os.chmod(tmp_path, 0o644) # mkstemp creates owner-only files
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return manifest
+
 def register_skills():
     """
-    Inspects skill modules and populates the SKILL_REGISTRY.
+    Populates the SKILL_REGISTRY from the skill manifest.
     """
-    for module in SKILL_MODULES:
-        # Find all functions in the module
-        for name, func in inspect.getmembers(module, inspect.isfunction):
-            # Exclude private functions and imported functions
-            if not name.startswith('_') and func.__module__ == module.__name__:
-                # Use the function's docstring as its description
-                description = inspect.getdoc(func) or "No description provided."
-                
-                # Simplified description for brevity in some displays
-                short_desc = description.split('\n')[0]
-                
-                SKILL_REGISTRY[name] = {
-                    "name": name,
-                    "module": module.__name__,
-                    "function": func,
-                    "description": description,
-                    "short_description": short_desc,
-                    "signature": str(inspect.signature(func)),
-                }
+    manifest = load_manifest()
+    for module_name in SKILL_MODULES:
+        full_module = f"{__name__}.{module_name}"
+        for skill in manifest[module_name]["skills"]:
+            name = skill["name"]
+            description = skill["description"]
+
+            # Simplified description for brevity in some displays
+            short_desc = description.split('\n')[0]
+
+            SKILL_REGISTRY[name] = {
+                "name": name,
+                "module": full_module,
+                "function": LazySkill(name, full_module, description),
+                "description": description,
+                "short_description": short_desc,
+                "signature": skill["signature"],
+            }
 
 # Automatically register skills upon import
 register_skills()
 
+def __getattr__(name: str):
+    # Allow `proteintoolbox.skills.<module>` attribute access without eager imports
+    if name in SKILL_MODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def get_skill_description_for_agents():
     """
     Generates a simplified, context-efficient string of available skills for the LLM.
@@ -0,0 +1,5 @@
+"""Rebuilds skill_manifest.json: `python -m proteintoolbox.skills`."""
+from proteintoolbox.skills import MANIFEST_PATH, write_manifest
+
+manifest = write_manifest()
+print(f"Wrote {sum(len(m['skills']) for m in manifest.values())} skills from {len(manifest)} modules to {MANIFEST_PATH}")
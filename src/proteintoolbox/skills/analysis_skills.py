@@ -1,5 +1,30 @@
-from Bio import SeqIO
+import os
+import numpy as np
 from Bio.SeqUtils.ProtParam import ProteinAnalysis
+from typing import Dict, List, Union
+from proteintoolbox.sequence_io import read_sequence_records
+
+__all__ = ["analyze_sequence", "get_amino_acid_percentages", "scan_aggregation", "scan_aggregation_batch"]
+
+# AGGRESCAN a3v intrinsic aggregation propensities (Conchillo-Sole et al. 2007)
+AGGREGATION_SCALE = {
+    "I": 1.822, "F": 1.754, "V": 1.594, "L": 1.380, "Y": 1.159, "W": 1.037, "M": 0.910, "C": 0.604,
+    "A": -0.036, "T": -0.159, "S": -0.294, "P": -0.334, "G": -0.535, "K": -0.931, "H": -1.033,
+    "Q": -1.231, "R": -1.240, "N": -1.302, "E": -1.412, "D": -1.836,
+}
+# Kyte-Doolittle hydropathy
+HYDROPATHY_SCALE = {
+    "I": 4.5, "V": 4.2, "L": 3.8, "F": 2.8, "C": 2.5, "M": 1.9, "A": 1.8, "G": -0.4, "T": -0.7,
+    "S": -0.8, "W": -0.9, "Y": -1.3, "P": -1.6, "H": -3.2, "E": -3.5, "Q": -3.5, "D": -3.5,
+    "N": -3.5, "K": -3.9, "R": -4.5,
+}
+_ALPHABET = "ACDEFGHIKLMNPQRSTVWY"
+# Byte -> alphabet index; unknown letters (X, B, Z, ...) get index 20, which scores 0 on both scales
+_CODES = np.full(256, 20, dtype=np.int8)
+for _i, _aa in enumerate(_ALPHABET):
+    _CODES[ord(_aa)] = _CODES[ord(_aa.lower())] = _i
+_SCALES = np.array([[AGGREGATION_SCALE[aa] for aa in _ALPHABET] + [0.0],
+                    [HYDROPATHY_SCALE[aa] for aa in _ALPHABET] + [0.0]])
 
 def analyze_sequence(sequence: str) -> dict:
     """
@@ -31,3 +56,146 @@ def get_amino_acid_percentages(sequence: str) -> dict:
     """
     analysed_seq = ProteinAnalysis(sequence)
     return analysed_seq.get_amino_acids_percent()
+
+def _encode(sequences: List[str]):
+    """Pads a list of sequences into an (N, L_max) matrix of alphabet indices plus their lengths."""
+    lengths = np.array([len(s) for s in sequences], dtype=np.int64)
+    codes = np.full((len(sequences), max(lengths.max(initial=0), 1)), 20, dtype=np.int8)
+    for row, seq in enumerate(sequences):
+        codes[row, :len(seq)] = _CODES[np.frombuffer(seq.encode("ascii", "replace"), dtype=np.uint8)]
+    return codes, lengths
+
+def _window_mean(values: np.ndarray, lengths: np.ndarray, window: int) -> np.ndarray:
+    """
+    Centred sliding-window mean of every row, from one cumulative sum over the matrix. Windows
+    are truncated at the sequence ends; positions past a row's length are NaN.
+    """
+    n, width = values.shape
+    cumulative = np.zeros((n, width + 1))
+    np.cumsum(values, axis=1, out=cumulative[:, 1:])
+    half = window // 2
+    position = np.arange(width)
+    lo = np.broadcast_to(np.maximum(position - half, 0), (n, width))
+    hi = np.minimum(position + half + 1, lengths[:, None])
+    count = hi - lo
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (np.take_along_axis(cumulative, np.maximum(hi, lo), axis=1)
+                - np.take_along_axis(cumulative, lo, axis=1)) / count
+    mean[count <= 0] = np.nan
+    return mean
+
+def _runs(flags: np.ndarray, min_length: int):
+    """(row, start, end) of every run of True at least `min_length` long; `end` is exclusive."""
+    padded = np.zeros((flags.shape[0], flags.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = flags
+    rows, starts = np.nonzero(np.diff(padded, axis=1) == 1)
+    _, ends = np.nonzero(np.diff(padded, axis=1) == -1)
+    keep = ends - starts >= min_length
+    return rows[keep], starts[keep], ends[keep]
+
+def _scan(sequences: List[str], window: int, hydrophobicity_window: int, aggregation_threshold: float,
+          hydrophobicity_threshold: float, min_region_length: int, profiles: bool) -> List[Dict]:
+    """Aggregation and hydropathy scan of a list of sequences in one padded matrix."""
+    codes, lengths = _encode(sequences)
+    values = _SCALES[:, codes]
+    inside = np.arange(codes.shape[1]) < lengths[:, None]
+    values[:, ~inside] = 0.0
+    aggregation = _window_mean(values[0], lengths, window)
+    hydropathy = _window_mean(values[1], lengths, hydrophobicity_window)
+    prone = (aggregation > aggregation_threshold) & inside
+    results = [{"length": int(n), "regions": [], "n_aggregation_regions": 0, "n_hydrophobic_regions": 0}
+               for n in lengths]
+    for kind, flags, profile in (("aggregation", prone, aggregation),
+                                 ("hydrophobic", (hydropathy > hydrophobicity_threshold) & inside, hydropathy)):
+        for row, start, end in zip(*_runs(flags, min_region_length)):
+            segment = profile[row, start:end]
+            results[row]["regions"].append({
+                "type": kind,
+                "start": int(start) + 1,
+                "end": int(end),
+                "sequence": sequences[row][start:end],
+                "mean_score": round(float(segment.mean()), 3),
+                "max_score": round(float(segment.max()), 3),
+            })
+            results[row][f"n_{kind}_regions"] += 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_propensity = values[0].sum(axis=1) / lengths
+    for row, result in enumerate(results):
+        result["regions"].sort(key=lambda r: (r["start"], r["type"]))
+        n = lengths[row]
+        covered = sum(r["end"] - r["start"] + 1 for r in result["regions"] if r["type"] == "aggregation")
+        result["aggregation_fraction"] = round(float(covered / n), 3) if n else 0.0
+        result["mean_propensity"] = round(float(mean_propensity[row]), 3) if n else 0.0
+        if profiles:
+            result["aggregation_profile"] = np.round(aggregation[row, :n], 3).tolist()
+            result["hydrophobicity_profile"] = np.round(hydropathy[row, :n], 3).tolist()
+    return results
+
+def scan_aggregation(sequence: str, window: int = 7, hydrophobicity_window: int = 9,
+                     aggregation_threshold: float = -0.02, hydrophobicity_threshold: float = 1.6,
+                     min_region_length: int = 5) -> Dict:
+    """
+    Sliding-window aggregation propensity (AGGRESCAN a3v scale) and Kyte-Doolittle hydropathy
+    profiles, with flagged aggregation-prone and hydrophobic regions.
+
+    Args:
+        sequence: Amino acid string.
+        window: Window for the aggregation profile (AGGRESCAN uses 5-11 depending on length).
+        hydrophobicity_window: Window for the hydropathy profile.
+        aggregation_threshold: Window score above which a residue is aggregation-prone (AGGRESCAN hot-spot threshold).
+        hydrophobicity_threshold: Window hydropathy above which a residue is in a hydrophobic stretch.
+        min_region_length: Shortest run of flagged residues reported as a region.
+
+    Returns:
+        Dict: Per-residue 'aggregation_profile' and 'hydrophobicity_profile', 'regions' (1-based
+        inclusive start/end, type, mean and max window score), region counts, the fraction of
+        residues in aggregation-prone regions and the mean a3v propensity.
+    """
+    return _scan([sequence], window, hydrophobicity_window, aggregation_threshold, hydrophobicity_threshold,
+                 min_region_length, profiles=True)[0]
+
+def scan_aggregation_batch(sequences: Union[str, List[str], Dict[str, str]], window: int = 7,
+                           hydrophobicity_window: int = 9, aggregation_threshold: float = -0.02,
+                           hydrophobicity_threshold: float = 1.6, min_region_length: int = 5,
+                           profiles: bool = True, output_path: str = None, batch_size: int = 4096) -> Dict:
+    """
+    `scan_aggregation` for a whole library. Sequences are sorted by length and scanned in padded
+    (batch_size, L_max) matrices, so every profile in a batch comes from the same array operations.
+
+    Args:
+        sequences: FASTA path, list of sequences, or dict of id -> sequence.
+        profiles: Include per-residue profiles in the results (off for very large libraries).
+        output_path: Optional TSV (id, length, n_aggregation_regions, n_hydrophobic_regions,
+            aggregation_fraction, mean_propensity, regions).
+        batch_size: Sequences per padded matrix.
+        Other arguments as for `scan_aggregation`.
+
+    Returns:
+        Dict: Sequence and flagged counts, and per-sequence results (with 'id') in input order.
+    """
+    records = read_sequence_records(sequences)
+
+    results = [None] * len(records)
+    order = np.argsort([len(seq) for _, seq in records], kind="stable")
+    for begin in range(0, len(order), batch_size):
+        batch = order[begin:begin + batch_size]
+        scanned = _scan([records[i][1] for i in batch], window, hydrophobicity_window, aggregation_threshold,
+                        hydrophobicity_threshold, min_region_length, profiles)
+        for i, result in zip(batch, scanned):
+            results[i] = {"id": records[i][0], **result}
+
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w") as f:
+            f.write("id\tlength\tn_aggregation_regions\tn_hydrophobic_regions\taggregation_fraction\t"
+                    "mean_propensity\tregions\n")
+            for r in results:
+                regions = ",".join(f"{x['type'][0]}:{x['start']}-{x['end']}" for x in r["regions"])
+                f.write(f"{r['id']}\t{r['length']}\t{r['n_aggregation_regions']}\t{r['n_hydrophobic_regions']}\t"
+                        f"{r['aggregation_fraction']}\t{r['mean_propensity']}\t{regions}\n")
+
+    return {
+        "n_sequences": len(results),
+        "n_flagged": sum(1 for r in results if r["n_aggregation_regions"]),
+        "results": results,
+    }
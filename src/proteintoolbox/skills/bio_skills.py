@@ -4,6 +4,13 @@ from typing import Optional
 from proteintoolbox.utils.robustness import network_retry
 from proteintoolbox.models import PDBDownloadRequest, ProteinSequenceRequest
 
+__all__ = [
+    "fetch_pdb_structure",
+    "get_sequence_from_pdb",
+    "clean_and_validate_sequence",
+    "validate_sequence_robust",
+]
+
 @network_retry
 def fetch_pdb_structure(pdb_id: str, output_dir: str = "data/pdb") -> str:
     """
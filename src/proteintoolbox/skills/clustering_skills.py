@@ -0,0 +1,252 @@
+import os
+import json
+import shutil
+import time
+import numpy as np
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from scipy.cluster import hierarchy
+from scipy.spatial.distance import squareform
+from typing import Dict, List, Tuple, Union
+from proteintoolbox.geometry import pairwise_rmsd
+from proteintoolbox.resources import get_probe
+from proteintoolbox.structure_io import ATOM_SETS, iter_structures, read_residue_atoms
+
+__all__ = ["cluster_structures"]
+
+_METRICS = ("rmsd", "tm")
+_METHODS = ("greedy", "hierarchical")
+# Default distance thresholds: 2 A RMSD, or TM-score 0.5 (same fold) for the TM distance
+_DEFAULT_THRESHOLDS = {"rmsd": 2.0, "tm": 0.5}
+
+def _tm_distance(a: np.ndarray, b: np.ndarray, atom_names: Tuple[str, ...] = ("CA",)) -> np.ndarray:
+    """
+    1 - TM-score for every pair of equal-length sets in `a` (I x N x 3) and `b` (J x N x 3),
+    scored at the RMSD-optimal superposition (a lower bound on the TM-align optimum). Sets hold
+    `atom_names` for each residue in turn; the fit uses every atom, while d0 and the score come
+    from one CA per residue, as TM-score is defined.
+    """
+    a = a - a.mean(axis=1, keepdims=True)
+    b = b - b.mean(axis=1, keepdims=True)
+    n = a.shape[1]
+    step, ca = len(atom_names), atom_names.index("CA")
+    d0 = max(0.5, 1.24 * np.cbrt(max(n // step - 15, 1)) - 1.8)
+    covariance = (a.transpose(0, 2, 1).reshape(-1, n) @ b.transpose(1, 0, 2).reshape(n, -1))
+    covariance = covariance.reshape(len(a), 3, len(b), 3).transpose(0, 2, 1, 3)
+    u, _, vt = np.linalg.svd(covariance)
+    u[..., -1] *= np.sign(np.linalg.det(u @ vt))[..., None]
+    # Per-residue CA deviations of every fitted pair (I x J x residues)
+    fitted = a[:, None, ca::step] @ (u @ vt)
+    deviation = ((fitted - b[None, :, ca::step]) ** 2).sum(axis=-1)
+    return 1.0 - (1.0 / (1.0 + deviation / d0 ** 2)).mean(axis=-1)
+
+# Per-process views of the coordinate stack and distance matrix (set by _init_block_worker)
+_worker_arrays = None
+
+def _init_block_worker(coords_path: str, matrix_path: str):
+    global _worker_arrays
+    _worker_arrays = (np.load(coords_path, mmap_mode="r"), np.load(matrix_path, mmap_mode="r+"))
+
+def _compute_block(i0: int, i1: int, j0: int, j1: int, metric: str, atom_names: Tuple[str, ...]) -> Tuple[int, int]:
+    """Fills rows i0:i1 x columns j0:j1 of the distance matrix (and the mirrored block)."""
+    coords, matrix = _worker_arrays
+    a = np.asarray(coords[i0:i1], dtype=np.float64)
+    b = np.asarray(coords[j0:j1], dtype=np.float64)
+    block = pairwise_rmsd(a, b) if metric == "rmsd" else _tm_distance(a, b, atom_names)
+    if i0 == j0:
+        np.fill_diagonal(block, 0.0)
+    matrix[i0:i1, j0:j1] = block
+    matrix[j0:j1, i0:i1] = block.T
+    matrix.flush()
+    return i0, j0
+
+def _greedy_clusters(matrix: np.ndarray, threshold: float, block_size: int) -> Tuple[np.ndarray, List[int]]:
+    """
+    Taylor-Butina clustering: structures with the most neighbours within `threshold` become
+    centroids in turn and take all their still unassigned neighbours. Reads the matrix one
+    row block (or row) at a time.
+    """
+    m = len(matrix)
+    counts = np.zeros(m, dtype=np.int64)
+    for start in range(0, m, block_size):
+        counts[start:start + block_size] = (np.asarray(matrix[start:start + block_size]) <= threshold).sum(axis=1)
+    labels = np.full(m, -1, dtype=np.int64)
+    centroids = []
+    for index in np.argsort(-counts, kind="stable"):
+        if labels[index] >= 0:
+            continue
+        members = (np.asarray(matrix[index]) <= threshold) & (labels < 0)
+        members[index] = True
+        labels[members] = len(centroids)
+        centroids.append(int(index))
+    return labels, centroids
+
+def _hierarchical_clusters(matrix: np.ndarray, threshold: float, linkage: str) -> Tuple[np.ndarray, List[int]]:
+    """Agglomerative clustering cut at `threshold`; each cluster is represented by its medoid."""
+    if len(matrix) == 1:
+        return np.zeros(1, dtype=np.int64), [0]
+    tree = hierarchy.linkage(squareform(np.asarray(matrix), checks=False), method=linkage)
+    labels = hierarchy.fcluster(tree, t=threshold, criterion="distance") - 1
+    # Number clusters by decreasing size, like the greedy method
+    order = [label for label, _ in Counter(labels).most_common()]
+    labels = np.argsort(order)[labels]
+    centroids = []
+    for label in range(len(order)):
+        members = np.flatnonzero(labels == label)
+        within = np.asarray(matrix[np.ix_(members, members)]).sum(axis=1)
+        centroids.append(int(members[np.argmin(within)]))
+    return labels, centroids
+
+def cluster_structures(structures: Union[str, List[str]], output_dir: str = "output/clusters",
+                       metric: str = "rmsd", method: str = "greedy", threshold: float = None,
+                       atoms: str = "ca", linkage: str = "average", block_size: int = 64,
+                       n_workers: int = None, project_name: str = None) -> Dict:
+    """
+    Clusters many models of one protein (e.g. a backbone generation campaign) by all-vs-all
+    structural distance and picks one representative per cluster.
+
+    The distance matrix is computed in square blocks by a process pool; every block is a single
+    vectorized batch (one matrix product, then QCP roots for RMSD or stacked 3x3 SVDs for TM) and is written straight into a
+    memory-mapped `distances.npy`. Finished blocks are logged, so an interrupted run resumes
+    where it stopped. Greedy (Taylor-Butina) clustering streams over the matrix; hierarchical
+    clustering uses SciPy linkage.
+
+    Args:
+        structures: Directory of PDB files, a text file of paths, or a list of paths.
+        output_dir: Directory for the matrix, `clusters.tsv` and `representatives/`.
+        metric: "rmsd" (Angstroms) or "tm" (1 - TM-score over residue CAs at the optimal RMSD
+            superposition of the selected atoms).
+        method: "greedy" or "hierarchical".
+        threshold: Cluster radius / cut height (defaults: 2.0 A RMSD, 0.5 TM distance).
+        atoms: "ca" or "backbone".
+        linkage: Linkage for hierarchical clustering ("average", "complete", "single", ...).
+        block_size: Structures per block side.
+        n_workers: Worker processes (defaults to the usable cores; 1 runs in-process).
+        project_name: Write into `<project>/clusters` instead of output_dir.
+
+    Returns:
+        Dict: Structure and cluster counts, cluster sizes, representative paths and output paths.
+    """
+    if metric not in _METRICS:
+        raise ValueError(f"Unknown metric '{metric}'. Choose from: {', '.join(_METRICS)}")
+    if method not in _METHODS:
+        raise ValueError(f"Unknown method '{method}'. Choose from: {', '.join(_METHODS)}")
+    atom_names = ATOM_SETS[atoms] if isinstance(atoms, str) else tuple(atoms)
+    if metric == "tm" and "CA" not in atom_names:
+        raise ValueError("metric 'tm' scores residues by their CA atom; include CA in atoms")
+    threshold = _DEFAULT_THRESHOLDS[metric] if threshold is None else threshold
+    if project_name:
+        from proteintoolbox.project import Project
+        output_dir = os.path.join(Project(project_name).path, "clusters")
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    # Models must share one residue count to be compared atom by atom; others are skipped
+    paths, coords, skipped = [], [], {}
+    for path in iter_structures(structures):
+        try:
+            coords.append(read_residue_atoms(path, atoms)["coords"].reshape(-1, 3))
+            paths.append(path)
+        except Exception as e:
+            skipped[path] = str(e)
+    if not paths:
+        raise ValueError("No readable structures to cluster")
+    size = Counter(len(c) for c in coords).most_common(1)[0][0]
+    for path, c in zip(paths, coords):
+        if len(c) != size:
+            skipped[path] = f"{len(c)} atoms selected, most models have {size}"
+    keep = [i for i, c in enumerate(coords) if len(c) == size]
+    paths = [paths[i] for i in keep]
+    m = len(paths)
+
+    coords_path = os.path.join(output_dir, "coords.npy")
+    matrix_path = os.path.join(output_dir, "distances.npy")
+    done_path = os.path.join(output_dir, "blocks.done")
+    meta_path = os.path.join(output_dir, "matrix.json")
+    meta = {"paths": paths, "metric": metric, "atoms": atoms, "block_size": block_size}
+    previous = None
+    if os.path.exists(meta_path) and os.path.exists(matrix_path):
+        with open(meta_path) as f:
+            previous = json.load(f)
+    done = set()
+    if previous == meta and os.path.exists(done_path):
+        with open(done_path) as f:
+            done = {tuple(map(int, line.split())) for line in f if line.strip()}
+    else:
+        stack = np.lib.format.open_memmap(coords_path, mode="w+", dtype=np.float32, shape=(m, size, 3))
+        for slot, i in enumerate(keep):
+            stack[slot] = coords[i]
+        stack.flush()
+        del stack
+        np.lib.format.open_memmap(matrix_path, mode="w+", dtype=np.float32, shape=(m, m)).flush()
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+        open(done_path, "w").close()
+    del coords
+
+    edges = list(range(0, m, block_size))
+    blocks = [(i0, min(i0 + block_size, m), j0, min(j0 + block_size, m))
+              for i0 in edges for j0 in edges if j0 >= i0 and (i0, j0) not in done]
+    if n_workers is None:
+        n_workers = get_probe().recommend_workers(max_workers=max(1, len(blocks)))
+    with open(done_path, "a") as log:
+        if n_workers <= 1:
+            _init_block_worker(coords_path, matrix_path)
+            for block in blocks:
+                log.write("%d %d\n" % _compute_block(*block, metric, atom_names))
+                log.flush()
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_block_worker,
+                                     initargs=(coords_path, matrix_path)) as pool:
+                pending = set()
+                for block in blocks:
+                    pending.add(pool.submit(_compute_block, *block, metric, atom_names))
+                    if len(pending) >= n_workers * 4:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            log.write("%d %d\n" % future.result())
+                        log.flush()
+                for future in wait(pending).done:
+                    log.write("%d %d\n" % future.result())
+
+    matrix = np.load(matrix_path, mmap_mode="r")
+    if method == "greedy":
+        labels, centroids = _greedy_clusters(matrix, threshold, block_size)
+    else:
+        labels, centroids = _hierarchical_clusters(matrix, threshold, linkage)
+
+    rep_dir = os.path.join(output_dir, "representatives")
+    if os.path.isdir(rep_dir):
+        shutil.rmtree(rep_dir)
+    os.makedirs(rep_dir)
+    representatives = []
+    for label, index in enumerate(centroids):
+        destination = os.path.join(rep_dir, f"cluster_{label + 1:04d}_{os.path.basename(paths[index])}")
+        shutil.copy2(paths[index], destination)
+        representatives.append(destination)
+
+    table_path = os.path.join(output_dir, "clusters.tsv")
+    with open(table_path, "w") as f:
+        f.write("path\tcluster\tis_representative\tdistance_to_representative\terror\n")
+        for index, path in enumerate(paths):
+            centroid = centroids[labels[index]]
+            f.write(f"{path}\t{labels[index] + 1}\t{int(index == centroid)}\t{matrix[index, centroid]:.4f}\t\n")
+        for path, error in skipped.items():
+            f.write(f"{path}\t\t\t\t{error}\n")
+
+    sizes = np.bincount(labels, minlength=len(centroids))
+    return {
+        "n_structures": m,
+        "n_skipped": len(skipped),
+        "n_clusters": len(centroids),
+        "cluster_sizes": sizes.tolist()[:20],
+        "metric": metric,
+        "method": method,
+        "threshold": threshold,
+        "representatives": representatives,
+        "n_workers": n_workers,
+        "elapsed_s": round(time.perf_counter() - start, 2),
+        "clusters_path": table_path,
+        "matrix_path": matrix_path,
+        "output_dir": output_dir,
+    }
@@ -2,6 +2,8 @@ import os
 import subprocess
 import shutil
 
+__all__ = ["generate_backbone", "design_sequence", "generate_alanine_scan", "generate_saturation_library"]
+
 class DesignSkills:
     def __init__(self):
         self.rfdiffusion_path = os.getenv("RFDIFFUSION_PATH")
@@ -1,7 +1,350 @@
 import os
+import gzip
+import json
+import time
+import shutil
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+import numpy as np
+import pandas as pd
 from vina import Vina
 from meeko import MoleculePreparation
 from rdkit import Chem
+from rdkit.Chem import AllChem
+from proteintoolbox.resources import get_probe
+
+try:
+    import fcntl
+except ImportError: # Windows: stats updates are not cross-process locked
+    fcntl = None
+
+__all__ = [
+    "prepare_ligand",
+    "run_docking",
+    "compute_grid_maps",
+    "get_map_cache_stats",
+    "screen_ligands",
+    "query_docking_results",
+    "extract_docking_pose",
+    "prepare_ligand_library",
+]
+
+DEFAULT_MAP_CACHE = os.environ.get("PROTEINTOOLBOX_MAP_CACHE", "data/map_cache")
+
+class GridMapCache:
+    """
+    On-disk cache of Vina affinity maps shared across processes and sessions.
+
+    Entries are keyed on the receptor file hash, box center/size, grid spacing and scoring
+    function. Least recently used entries are evicted once the cache exceeds `max_bytes`.
+    Hit/miss/eviction counters are persisted in `stats.json`.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_MAP_CACHE, max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(receptor_pdbqt: str, center: list, size: list, spacing: float = 0.375, scoring: str = "vina") -> str:
+        digest = hashlib.sha256()
+        with open(receptor_pdbqt, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        box = json.dumps({
+            "center": [round(float(c), 3) for c in center],
+            "size": [round(float(x), 3) for x in size],
+            "spacing": round(float(spacing), 4),
+            "scoring": scoring,
+        }, sort_keys=True)
+        digest.update(box.encode())
+        return digest.hexdigest()[:32]
+
+    def _update_stats(self, **increments) -> Dict:
+        """Atomically increments the persisted counters and returns them."""
+        stats_path = os.path.join(self.cache_dir, "stats.json")
+        with open(os.path.join(self.cache_dir, ".lock"), 'a') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            stats = {"hits": 0, "misses": 0, "evictions": 0}
+            if os.path.exists(stats_path):
+                with open(stats_path) as f:
+                    stats.update(json.load(f))
+            for name, value in increments.items():
+                stats[name] += value
+            with open(stats_path, 'w') as f:
+                json.dump(stats, f)
+        return stats
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(last_used, size_bytes, path) of every complete entry."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            meta_path = os.path.join(entry.path, "meta.json")
+            if entry.is_dir() and os.path.exists(meta_path):
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                entries.append((os.path.getmtime(meta_path), size, entry.path))
+        return entries
+
+    def _evict(self, keep: str = None) -> int:
+        """Removes least recently used entries until the cache fits `max_bytes`, never `keep`."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if keep and os.path.abspath(path) == os.path.abspath(keep):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def get_maps(self, receptor_pdbqt: str, center: list, size: list, spacing: float = 0.375, scoring: str = "vina") -> str:
+        """
+        Returns a map prefix for `Vina.load_maps`, computing and storing the maps on a miss.
+        """
+        key = self.make_key(receptor_pdbqt, center, size, spacing, scoring)
+        entry_dir = os.path.join(self.cache_dir, key)
+        meta_path = os.path.join(entry_dir, "meta.json")
+
+        if os.path.exists(meta_path):
+            os.utime(meta_path) # Mark as recently used
+            self._update_stats(hits=1)
+            return os.path.join(entry_dir, "receptor")
+
+        # Build in a private directory and rename into place so readers never see partial maps
+        tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+        compute_grid_maps(receptor_pdbqt, center, size, os.path.join(tmp_dir, "receptor"), spacing=spacing, scoring=scoring)
+        with open(os.path.join(tmp_dir, "meta.json"), 'w') as f:
+            json.dump({"receptor": os.path.abspath(receptor_pdbqt), "center": list(center), "size": list(size),
+                       "spacing": spacing, "scoring": scoring}, f)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        # The entry just stored is always kept, even if it alone exceeds the budget
+        self._update_stats(misses=1, evictions=self._evict(keep=entry_dir))
+        return os.path.join(entry_dir, "receptor")
+
+    def stats(self) -> Dict:
+        stats = self._update_stats()
+        entries = self._entries()
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "hit_rate": stats["hits"] / lookups if lookups else None,
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+class DockingResultsStore:
+    """
+    Append-only columnar table of docking poses.
+
+    Each numeric column (ligand index, pose rank, affinity, RMSD lower/upper bound, pose
+    byte offset/length) is a flat little-endian array file, ligand IDs are listed once in
+    `ligands.txt`, and the pose blocks themselves are concatenated into `poses.pdbqt`.
+    `meta.json` records how many rows are committed; anything written past that (e.g. by a
+    crashed run) is truncated when the store is reopened. Queries memory-map the columns,
+    so ranking a large screen never touches the pose text. Single writer only.
+    """
+    COLUMNS = {
+        "ligand_index": "<i4",
+        "pose_rank": "<i4",
+        "affinity": "<f4",
+        "rmsd_lb": "<f4",
+        "rmsd_ub": "<f4",
+        "pose_offset": "<i8",
+        "pose_length": "<i4",
+    }
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, "meta.json")
+        self._poses_path = os.path.join(path, "poses.pdbqt")
+        self._ligands_path = os.path.join(path, "ligands.txt")
+        self.meta = {"rows": 0, "ligands": 0, "pose_bytes": 0}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.meta.update(json.load(f))
+        self._ligand_ids = None
+        self._repair()
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _repair(self):
+        """Drops uncommitted tails left behind by an interrupted append."""
+        for name, dtype in self.COLUMNS.items():
+            path = self._column_path(name)
+            if not os.path.exists(path):
+                open(path, "wb").close()
+            expected = self.meta["rows"] * np.dtype(dtype).itemsize
+            if os.path.getsize(path) > expected:
+                os.truncate(path, expected)
+        if not os.path.exists(self._poses_path):
+            open(self._poses_path, "wb").close()
+        if os.path.getsize(self._poses_path) > self.meta["pose_bytes"]:
+            os.truncate(self._poses_path, self.meta["pose_bytes"])
+
+        ids = self.ligand_ids()
+        if len(ids) > self.meta["ligands"]:
+            self._ligand_ids = ids[:self.meta["ligands"]]
+            with open(self._ligands_path, "w") as f:
+                f.writelines(f"{ligand_id}\n" for ligand_id in self._ligand_ids)
+
+    def __len__(self) -> int:
+        return self.meta["rows"]
+
+    @staticmethod
+    def parse_poses(poses: str) -> List[Tuple[float, float, float, str]]:
+        """Splits Vina PDBQT output into (affinity, rmsd_lb, rmsd_ub, model_block) per pose."""
+        parsed, block, scores = [], [], None
+        for line in poses.splitlines(keepends=True):
+            if line.startswith("MODEL"):
+                block, scores = [], None
+            block.append(line)
+            if line.startswith("REMARK VINA RESULT:"):
+                scores = [float(v) for v in line.split(":", 1)[1].split()[:3]]
+            elif line.startswith("ENDMDL") and scores is not None:
+                parsed.append((*scores, "".join(block)))
+        return parsed
+
+    def append(self, ligand_id: str, poses: str) -> int:
+        """Appends all poses of one ligand (Vina PDBQT text). Returns the number of rows added."""
+        parsed = self.parse_poses(poses)
+        if not parsed:
+            return 0
+
+        offset = self.meta["pose_bytes"]
+        blocks = [block.encode() for *_, block in parsed]
+        offsets = offset + np.concatenate([[0], np.cumsum([len(b) for b in blocks[:-1]])])
+        ligand_index = self.meta["ligands"]
+        values = {
+            "ligand_index": np.full(len(parsed), ligand_index),
+            "pose_rank": np.arange(1, len(parsed) + 1),
+            "affinity": [p[0] for p in parsed],
+            "rmsd_lb": [p[1] for p in parsed],
+            "rmsd_ub": [p[2] for p in parsed],
+            "pose_offset": offsets,
+            "pose_length": [len(b) for b in blocks],
+        }
+
+        with open(self._poses_path, "ab") as f:
+            for block in blocks:
+                f.write(block)
+        for name, dtype in self.COLUMNS.items():
+            with open(self._column_path(name), "ab") as f:
+                f.write(np.asarray(values[name], dtype=dtype).tobytes())
+        with open(self._ligands_path, "a") as f:
+            f.write(f"{ligand_id}\n")
+        if self._ligand_ids is not None:
+            self._ligand_ids.append(ligand_id)
+
+        # Committing the new row count last makes the append atomic for readers
+        self.meta = {"rows": self.meta["rows"] + len(parsed), "ligands": ligand_index + 1,
+                     "pose_bytes": offset + sum(len(b) for b in blocks)}
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self._meta_path)
+        return len(parsed)
+
+    def ligand_ids(self) -> List[str]:
+        """Ligand IDs in insertion order (indexed by the `ligand_index` column)."""
+        if self._ligand_ids is None:
+            self._ligand_ids = []
+            if os.path.exists(self._ligands_path):
+                with open(self._ligands_path) as f:
+                    self._ligand_ids = [line.rstrip("\n") for line in f]
+        return self._ligand_ids
+
+    def column(self, name: str) -> np.ndarray:
+        """Memory-mapped view of one committed column."""
+        if not self.meta["rows"]:
+            return np.empty(0, dtype=self.COLUMNS[name])
+        return np.memmap(self._column_path(name), dtype=self.COLUMNS[name], mode="r", shape=(self.meta["rows"],))
+
+    def to_frame(self, rows: np.ndarray = None) -> pd.DataFrame:
+        """Materializes the table (or the given row indices) as a DataFrame."""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        frame = pd.DataFrame({name: np.asarray(self.column(name)[rows]) for name in self.COLUMNS}, index=rows)
+        frame.index.name = "row"
+        ids = np.asarray(self.ligand_ids(), dtype=object)
+        frame.insert(0, "ligand_id", ids[frame.pop("ligand_index").to_numpy()])
+        return frame
+
+    def top_k(self, k: int = 10, best_pose_only: bool = True) -> pd.DataFrame:
+        """Lowest-affinity rows, by default one (the top-ranked pose) per ligand."""
+        affinity = np.asarray(self.column("affinity"))
+        candidates = np.flatnonzero(self.column("pose_rank") == 1) if best_pose_only else np.arange(len(affinity))
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(affinity[candidates], k)[:k]]
+        candidates = candidates[np.argsort(affinity[candidates], kind="stable")]
+        return self.to_frame(candidates)
+
+    def filter(self, max_affinity: float = None, min_affinity: float = None, max_pose_rank: int = None,
+               max_rmsd_lb: float = None, ligand_ids: Iterable[str] = None) -> pd.DataFrame:
+        """Rows matching all given conditions, in insertion order."""
+        mask = np.ones(len(self), dtype=bool)
+        if max_affinity is not None:
+            mask &= self.column("affinity") <= max_affinity
+        if min_affinity is not None:
+            mask &= self.column("affinity") >= min_affinity
+        if max_pose_rank is not None:
+            mask &= self.column("pose_rank") <= max_pose_rank
+        if max_rmsd_lb is not None:
+            mask &= self.column("rmsd_lb") <= max_rmsd_lb
+        if ligand_ids is not None:
+            wanted = set(ligand_ids)
+            indices = [i for i, ligand_id in enumerate(self.ligand_ids()) if ligand_id in wanted]
+            mask &= np.isin(self.column("ligand_index"), indices)
+        return self.to_frame(np.flatnonzero(mask))
+
+    def join(self, other: pd.DataFrame, on: str = "ligand_id", how: str = "inner",
+             best_pose_only: bool = True) -> pd.DataFrame:
+        """Joins docking rows with another table (e.g. ligand properties) on `on`."""
+        frame = self.filter(max_pose_rank=1 if best_pose_only else None)
+        return frame.reset_index().merge(other, on=on, how=how)
+
+    def get_pose(self, row: int) -> str:
+        """Reads one pose block from `poses.pdbqt` using its stored offset."""
+        offset, length = int(self.column("pose_offset")[row]), int(self.column("pose_length")[row])
+        with open(self._poses_path, "rb") as f:
+            f.seek(offset)
+            return f.read(length).decode()
+
+    def find_row(self, ligand_id: str, pose_rank: int = 1) -> int:
+        """Row index of a ligand's pose, or -1 if absent."""
+        try:
+            ligand_index = self.ligand_ids().index(ligand_id)
+        except ValueError:
+            return -1
+        rows = np.flatnonzero((self.column("ligand_index") == ligand_index) & (self.column("pose_rank") == pose_rank))
+        return int(rows[0]) if len(rows) else -1
+
+def _mol_to_pdbqt(mol) -> str:
+    """Runs Meeko on an RDKit molecule with explicit hydrogens and 3D coordinates."""
+    preparator = MoleculePreparation()
+    setups = preparator.prepare(mol)
+    try:
+        from meeko import PDBQTWriterLegacy
+    except ImportError:
+        # Meeko < 0.5
+        return preparator.write_pdbqt_string()
+
+    pdbqt_string, is_ok, error = PDBQTWriterLegacy.write_string(setups[0])
+    if not is_ok:
+        raise ValueError(error)
+    return pdbqt_string
 
 def prepare_ligand(ligand_path: str, output_path: str = None) -> str:
     """
@@ -20,26 +363,26 @@ def prepare_ligand(ligand_path: str, output_path: str = None) -> str:
     # Read molecule with RDKit (assumes SDF or Mol2)
     # Simple case: usually requires 3D coordinates generated beforehand
     if ligand_path.endswith(".sdf"):
-        suppl = Chem.SDMolSupplier(ligand_path)
+        suppl = Chem.SDMolSupplier(ligand_path, removeHs=False) # Meeko needs explicit hydrogens
         mol = suppl[0]
     elif ligand_path.endswith(".mol2"):
-        mol = Chem.MolFromMol2File(ligand_path)
+        mol = Chem.MolFromMol2File(ligand_path, removeHs=False)
     else:
         return "Error: Unsupported ligand format. Use SDF or MOL2."
 
     if not mol:
         return "Error: Could not read molecule."
 
-    preparator = MoleculePreparation()
-    preparator.prepare(mol)
-    pdbqt_string = preparator.write_pdbqt_string()
+    pdbqt_string = _mol_to_pdbqt(mol)
     
     with open(output_path, 'w') as f:
         f.write(pdbqt_string)
         
     return output_path
 
-def run_docking(receptor_pdbqt: str, ligand_pdbqt: str, center: list, size: list = [20, 20, 20], output_path: str = "docked.pdbqt") -> str:
+def run_docking(receptor_pdbqt: str, ligand_pdbqt: str, center: list, size: list = [20, 20, 20], output_path: str = "docked.pdbqt",
+                exhaustiveness: int = 8, n_poses: int = 5, map_cache_dir: str = None,
+                results_dir: str = None) -> str:
     """
     Runs AutoDock Vina.
     
@@ -49,18 +392,554 @@ def run_docking(receptor_pdbqt: str, ligand_pdbqt: str, center: list, size: list
         center: [x, y, z] coordinates of box center.
         size: [x, y, z] size of box (Angstroms).
         output_path: Output file.
+        exhaustiveness: Search effort (Vina default 8).
+        n_poses: Number of poses to write.
+        map_cache_dir: Optional grid map cache directory, e.g. DEFAULT_MAP_CACHE (None recomputes the maps every call).
+        results_dir: Optional DockingResultsStore directory the poses are appended to.
         
     Returns:
         Status string.
     """
     v = Vina(sf_name='vina')
-    v.set_receptor(receptor_pdbqt)
+    if map_cache_dir:
+        v.load_maps(GridMapCache(map_cache_dir).get_maps(receptor_pdbqt, center, size))
+    else:
+        v.set_receptor(receptor_pdbqt)
+        # Same box as cached maps (see compute_grid_maps), so results do not depend on the cache
+        v.compute_vina_maps(center=center, box_size=size, force_even_voxels=True)
     v.set_ligand_from_file(ligand_pdbqt)
     
-    v.compute_vina_maps(center=center, box_size=size)
-    
     # Dock
-    v.dock(exhaustiveness=8, n_poses=5)
-    v.write_poses(output_path, n_poses=5, overwrite=True)
+    v.dock(exhaustiveness=exhaustiveness, n_poses=n_poses)
+    v.write_poses(output_path, n_poses=n_poses, overwrite=True)
+
+    if results_dir:
+        ligand_id = os.path.splitext(os.path.basename(ligand_pdbqt))[0]
+        DockingResultsStore(results_dir).append(ligand_id, v.poses(n_poses=n_poses))
+        return f"Docking complete. Saved to {output_path} (results appended to {results_dir})"
     
     return f"Docking complete. Saved to {output_path}"
+
+def compute_grid_maps(receptor_pdbqt: str, center: list, size: list, map_prefix: str, spacing: float = 0.375,
+                      scoring: str = "vina") -> str:
+    """
+    Computes Vina affinity maps for a receptor and box once and writes them to disk.
+
+    Args:
+        receptor_pdbqt: Prepared receptor.
+        center: [x, y, z] box center.
+        size: [x, y, z] box size (Angstroms).
+        map_prefix: Path prefix for the map files (e.g. "maps/receptor").
+        spacing: Grid spacing in Angstroms.
+        scoring: Vina scoring function ("vina" or "vinardo").
+
+    Returns:
+        The map prefix, loadable with `Vina.load_maps`.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(map_prefix)), exist_ok=True)
+    v = Vina(sf_name=scoring, verbosity=0)
+    v.set_receptor(receptor_pdbqt)
+    # Map files can only be written for an even number of voxels per axis
+    v.compute_vina_maps(center=center, box_size=size, spacing=spacing, force_even_voxels=True)
+    v.write_maps(map_prefix, overwrite=True)
+    return map_prefix
+
+def get_map_cache_stats(cache_dir: str = DEFAULT_MAP_CACHE) -> Dict:
+    """
+    Reports grid map cache usage: hits, misses, evictions, hit rate, entries and size on disk.
+    """
+    return GridMapCache(cache_dir).stats()
+
+def _iter_ligands(ligands: Union[str, Iterable[str]]) -> Iterator[str]:
+    """
+    Yields PDBQT paths from a directory of PDBQT files, a text file listing one path per
+    line, or an iterable of paths.
+    """
+    if isinstance(ligands, str) and os.path.isdir(ligands):
+        yield from (e.path for e in sorted(os.scandir(ligands), key=lambda e: e.name) if e.name.endswith(".pdbqt"))
+    elif isinstance(ligands, str):
+        with open(ligands) as f:
+            yield from (line.strip() for line in f if line.strip())
+    else:
+        yield from ligands
+
+def _assign_ligand_id(path: str, owners: Dict[str, str]) -> str:
+    """
+    File name without extension, suffixed with a hash of the absolute path when a different
+    file already owns that ID. `owners` maps IDs to absolute paths (None for rows written
+    before paths were recorded, which the first matching file claims).
+    """
+    path = os.path.abspath(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for ligand_id in (stem, f"{stem}_{hashlib.sha1(path.encode()).hexdigest()[:8]}"):
+        if owners.get(ligand_id) in (None, path):
+            owners[ligand_id] = path
+            return ligand_id
+    raise ValueError(f"Could not assign a unique ligand ID to {path}")
+
+def _read_screen_scores(scores_path: str) -> Tuple[Dict[str, str], set]:
+    """
+    Reads a scores table into (ligand_id -> path, IDs whose latest row docked). Older tables
+    without status/path columns count rows without an error as docked.
+    """
+    owners, docked = {}, set()
+    if not os.path.exists(scores_path):
+        return owners, docked
+    with open(scores_path) as f:
+        header = next(f, "").rstrip("\n").split("\t")
+        for line in f:
+            if not line.strip():
+                continue
+            row = dict(zip(header, line.rstrip("\n").split("\t")))
+            ligand_id = row["ligand_id"]
+            owners[ligand_id] = row.get("path") or owners.get(ligand_id)
+            if row.get("status", "failed" if row.get("error") else "docked") == "docked":
+                docked.add(ligand_id)
+            else:
+                docked.discard(ligand_id)
+    return owners, docked
+
+# Per-process Vina instance holding the preloaded maps (set by _init_screen_worker)
+_worker_vina = None
+
+def _init_screen_worker(map_prefix: str, scoring: str, cpu: int, seed: int):
+    global _worker_vina
+    _worker_vina = Vina(sf_name=scoring, cpu=cpu, seed=seed, verbosity=0)
+    _worker_vina.load_maps(map_prefix)
+
+def _dock_in_worker(ligand_id: str, ligand_pdbqt: str, exhaustiveness: int, n_poses: int) -> Tuple[str, list, str, str]:
+    """Docks one ligand against the worker's maps. Returns (id, energies, poses, error)."""
+    try:
+        _worker_vina.set_ligand_from_file(ligand_pdbqt)
+        _worker_vina.dock(exhaustiveness=exhaustiveness, n_poses=n_poses)
+        energies = _worker_vina.energies(n_poses=n_poses).tolist()
+        return ligand_id, energies, _worker_vina.poses(n_poses=n_poses), ""
+    except Exception as e:
+        return ligand_id, [], "", str(e).replace("\t", " ").replace("\n", " ")
+
+def screen_ligands(receptor_pdbqt: str, ligands: Union[str, List[str]], center: list, size: list = [20, 20, 20],
+                   output_dir: str = "output/screen", exhaustiveness: int = 8, n_poses: int = 5,
+                   n_workers: int = None, cpu_per_worker: int = 1, scoring: str = "vina", seed: int = 0,
+                   map_cache_dir: str = None) -> Dict:
+    """
+    Virtual screening of a ligand library against one receptor and box with AutoDock Vina.
+
+    Grid maps are computed once and loaded by every worker of a process pool, so each
+    ligand only pays for its own search. Ligands are streamed from the library; as they
+    complete, every pose is appended to a DockingResultsStore in `output_dir/results` and
+    a per-ligand summary to `scores.tsv` with status "docked" or "failed" and the ligand's
+    path. Ligand IDs are file names without extension; a file whose name is already taken
+    by a different path gets a path hash suffix. If a worker crashes (e.g. Vina segfaults),
+    the pool is rebuilt and the ligands that were in flight are re-docked one at a time,
+    so only the ligand that kills its worker is marked failed. Rerunning the same call
+    resumes: docked ligands are skipped and failed ones are retried.
+
+    Args:
+        receptor_pdbqt: Prepared receptor.
+        ligands: Directory of PDBQT files, a text file of paths, or a list of paths.
+        center: [x, y, z] box center.
+        size: [x, y, z] box size (Angstroms).
+        output_dir: Directory for maps, the results store and the scores table.
+        exhaustiveness: Vina search effort per ligand.
+        n_poses: Poses kept per ligand.
+        n_workers: Worker processes (defaults to usable cores / cpu_per_worker).
+        cpu_per_worker: Vina threads per worker.
+        scoring: Vina scoring function.
+        seed: Random seed for reproducible searches.
+        map_cache_dir: Optional grid map cache directory, e.g. DEFAULT_MAP_CACHE (None writes the maps into output_dir).
+
+    Returns:
+        Dict: Counts of docked/failed/skipped ligands, throughput and output paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    scores_path = os.path.join(output_dir, "scores.tsv")
+    store = DockingResultsStore(os.path.join(output_dir, "results"))
+
+    # Resume support: ligands already stored or docked are skipped, failed ones are retried
+    owners, done = _read_screen_scores(scores_path)
+    for ligand_id in store.ligand_ids():
+        owners.setdefault(ligand_id, None)
+        done.add(ligand_id)
+
+    if map_cache_dir:
+        map_prefix = GridMapCache(map_cache_dir).get_maps(receptor_pdbqt, center, size, scoring=scoring)
+    else:
+        map_prefix = compute_grid_maps(receptor_pdbqt, center, size, os.path.join(output_dir, "maps", "receptor"), scoring=scoring)
+
+    n_workers = n_workers or get_probe().recommend_workers(threads_per_worker=cpu_per_worker)
+    max_pending = n_workers * 4
+    counts = {"docked": 0, "failed": 0, "skipped": 0}
+    start = time.perf_counter()
+
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=n_workers, initializer=_init_screen_worker,
+                                   initargs=(map_prefix, scoring, cpu_per_worker, seed))
+
+    new_file = not os.path.exists(scores_path)
+    pool = new_pool()
+    pending = {}
+    try:
+        with open(scores_path, "a") as scores_file:
+            if new_file:
+                scores_file.write("ligand_id\tbest_affinity\tn_poses\tstatus\tpath\terror\n")
+
+            def record(ligand_id, energies, poses, error):
+                if error:
+                    counts["failed"] += 1
+                    scores_file.write(f"{ligand_id}\t\t0\tfailed\t{owners[ligand_id]}\t{error}\n")
+                else:
+                    try:
+                        n_stored = store.append(ligand_id, poses)
+                    except Exception as e:
+                        # Not stored, so not docked: logged as failed and retried on resume
+                        return record(ligand_id, [], "", f"results store: {e}".replace("\t", " ").replace("\n", " "))
+                    counts["docked"] += 1
+                    scores_file.write(f"{ligand_id}\t{energies[0][0]:.3f}\t{n_stored}\tdocked\t{owners[ligand_id]}\t\n")
+                scores_file.flush()
+
+            def collect(futures):
+                """Records finished futures; returns the ligands lost to a crashed worker."""
+                lost = []
+                for future in futures:
+                    ligand_id, path = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        lost.append((ligand_id, path))
+                        continue
+                    except Exception as e:
+                        result = ligand_id, [], "", f"{type(e).__name__}: {e}".replace("\t", " ").replace("\n", " ")
+                    record(*result)
+                return lost
+
+            def restart_pool():
+                nonlocal pool
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = new_pool()
+
+            def recover(lost):
+                """Re-docks ligands lost to a crashed worker one at a time, so only the culprit fails."""
+                # A broken pool fails every other in-flight future as well
+                lost += collect(wait(list(pending)).done)
+                restart_pool()
+                for ligand_id, path in lost:
+                    future = pool.submit(_dock_in_worker, ligand_id, path, exhaustiveness, n_poses)
+                    pending[future] = (ligand_id, path)
+                    if collect([future]):
+                        record(ligand_id, [], "", "worker process crashed")
+                        restart_pool()
+
+            for path in _iter_ligands(ligands):
+                ligand_id = _assign_ligand_id(path, owners)
+                if ligand_id in done:
+                    counts["skipped"] += 1
+                    continue
+                done.add(ligand_id)
+                pending[pool.submit(_dock_in_worker, ligand_id, path, exhaustiveness, n_poses)] = (ligand_id, path)
+                # Bounded in-flight queue keeps memory flat for very large libraries
+                if len(pending) >= max_pending:
+                    finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                    lost = collect(finished)
+                    if lost:
+                        recover(lost)
+
+            lost = collect(wait(list(pending)).done)
+            if lost:
+                recover(lost)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    processed = counts["docked"] + counts["failed"]
+    return {
+        **counts,
+        "n_workers": n_workers,
+        "elapsed_s": round(elapsed, 2),
+        "ligands_per_hour": round(3600 * processed / elapsed, 1) if elapsed > 0 else None,
+        "scores_path": scores_path,
+        "results_dir": store.path,
+    }
+
+def query_docking_results(results_dir: str, top_k: int = 10, max_affinity: float = None,
+                          all_poses: bool = False) -> List[Dict]:
+    """
+    Ranks a docking results store without re-reading any pose files.
+
+    Args:
+        results_dir: DockingResultsStore directory (e.g. "output/screen/results").
+        top_k: Number of best-scoring rows to return.
+        max_affinity: Only keep rows at or below this affinity (kcal/mol).
+        all_poses: Rank every pose instead of only each ligand's top pose.
+
+    Returns:
+        List[Dict]: Rows with ligand_id, pose_rank, affinity, rmsd_lb, rmsd_ub and row index.
+    """
+    store = DockingResultsStore(results_dir)
+    frame = store.top_k(top_k if max_affinity is None else len(store), best_pose_only=not all_poses)
+    if max_affinity is not None:
+        frame = frame[frame["affinity"] <= max_affinity].head(top_k)
+    frame = frame.drop(columns=["pose_offset", "pose_length"]).reset_index()
+    # float32 columns -> plain rounded floats for display
+    for name in ("affinity", "rmsd_lb", "rmsd_ub"):
+        frame[name] = frame[name].astype(float).round(3)
+    return frame.to_dict(orient="records")
+
+def extract_docking_pose(results_dir: str, ligand_id: str, pose_rank: int = 1, output_path: str = None) -> str:
+    """
+    Pulls a single pose out of a docking results store by seeking to its stored offset.
+
+    Args:
+        results_dir: DockingResultsStore directory.
+        ligand_id: Ligand to extract.
+        pose_rank: 1 for the best pose.
+        output_path: Optional PDBQT path to write the pose to.
+
+    Returns:
+        The PDBQT text of the pose, or the output path if one was given.
+    """
+    store = DockingResultsStore(results_dir)
+    row = store.find_row(ligand_id, pose_rank)
+    if row < 0:
+        raise KeyError(f"No pose {pose_rank} for ligand '{ligand_id}' in {results_dir}")
+    pose = store.get_pose(row)
+    if output_path:
+        with open(output_path, "w") as f:
+            f.write(pose)
+        return output_path
+    return pose
+
+
+def _open_library(path: str):
+    return gzip.open(path, 'rt') if path.endswith(".gz") else open(path, 'r')
+
+def _iter_library_records(library_path: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    Streams raw (name, format, text) records from an SDF, SMILES or MOL2 library (optionally
+    gzipped) without parsing them, so RDKit work happens in the worker processes.
+    """
+    base = library_path[:-3] if library_path.endswith(".gz") else library_path
+    ext = os.path.splitext(base)[1].lower()
+
+    with _open_library(library_path) as f:
+        if ext in (".smi", ".smiles"):
+            for i, line in enumerate(f):
+                parts = line.split()
+                if parts and not parts[0].startswith("#"):
+                    yield (parts[1] if len(parts) > 1 else f"mol{i+1}"), "smiles", parts[0]
+
+        elif ext == ".sdf":
+            lines = []
+            for line in f:
+                if line.startswith("$$$$"):
+                    yield lines[0].strip() if lines else "", "sdf", "".join(lines)
+                    lines = []
+                else:
+                    lines.append(line)
+            if any(l.strip() for l in lines):
+                yield lines[0].strip(), "sdf", "".join(lines)
+
+        elif ext == ".mol2":
+            lines = []
+            for line in f:
+                if line.startswith("@<TRIPOS>MOLECULE") and lines:
+                    yield lines[1].strip(), "mol2", "".join(lines)
+                    lines = []
+                lines.append(line)
+            if lines:
+                yield lines[1].strip() if len(lines) > 1 else "", "mol2", "".join(lines)
+
+        else:
+            raise ValueError(f"Unsupported ligand library format '{ext}'. Use SDF, SMILES or MOL2 (optionally .gz).")
+
+def _needs_embedding(mol) -> bool:
+    """True if a molecule has no conformer or only flat (2D) coordinates."""
+    if mol.GetNumConformers() == 0:
+        return True
+    return not mol.GetConformer().Is3D()
+
+def _parse_record(fmt: str, text: str):
+    if fmt == "smiles":
+        return Chem.MolFromSmiles(text)
+    if fmt == "sdf":
+        return Chem.MolFromMolBlock(text, removeHs=False)
+    return Chem.MolFromMol2Block(text, removeHs=False)
+
+def _record_inchikey(fmt: str, text: str) -> str:
+    """InChIKey of a raw record, or "" if it does not parse (the worker then reports why)."""
+    try:
+        mol = _parse_record(fmt, text)
+        return Chem.MolToInchiKey(mol) if mol is not None else ""
+    except Exception:
+        return ""
+
+def _prepare_record(name: str, fmt: str, text: str, output_dir: str, seed: int) -> Tuple[str, str, str, str]:
+    """
+    Worker: parses one record, reuses a cached PDBQT if its InChIKey was prepared before,
+    otherwise adds hydrogens / 3D coordinates and runs Meeko.
+    Returns (name, inchikey, pdbqt_path or "", status or error message).
+    """
+    try:
+        mol = _parse_record(fmt, text)
+        if mol is None:
+            return name, "", "", "error: RDKit could not parse molecule"
+
+        inchikey = Chem.MolToInchiKey(mol)
+        if not inchikey:
+            return name, "", "", "error: could not compute InChIKey"
+
+        # Shard by InChIKey prefix to keep directories small
+        shard_dir = os.path.join(output_dir, inchikey[:2])
+        pdbqt_path = os.path.join(shard_dir, f"{inchikey}.pdbqt")
+        if os.path.exists(pdbqt_path):
+            return name, inchikey, pdbqt_path, "cached"
+
+        if _needs_embedding(mol):
+            mol = Chem.AddHs(mol)
+            params = AllChem.ETKDGv3()
+            params.randomSeed = seed
+            if AllChem.EmbedMolecule(mol, params) != 0:
+                return name, inchikey, "", "error: 3D embedding failed"
+            if AllChem.MMFFHasAllMoleculeParams(mol):
+                AllChem.MMFFOptimizeMolecule(mol)
+        else:
+            mol = Chem.AddHs(mol, addCoords=True)
+
+        pdbqt_string = _mol_to_pdbqt(mol)
+
+        os.makedirs(shard_dir, exist_ok=True)
+        # Write atomically so an interrupted run never leaves a truncated cache entry
+        tmp_path = f"{pdbqt_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(pdbqt_string)
+        os.replace(tmp_path, pdbqt_path)
+        return name, inchikey, pdbqt_path, "prepared"
+    except Exception as e:
+        return name, "", "", f"error: {str(e).splitlines()[0] if str(e) else type(e).__name__}"
+
+def prepare_ligand_library(library_path: str, output_dir: str = "output/ligands", n_workers: int = None,
+                           seed: int = 42) -> Dict:
+    """
+    Prepares every molecule of a ligand library for docking, streaming records through a process pool.
+
+    Supports SDF, SMILES (.smi) and MOL2 files, optionally gzipped. Molecules without 3D
+    coordinates are embedded (ETKDG + MMFF), converted with Meeko, and written to
+    `output_dir/<InChIKey[:2]>/<InChIKey>.pdbqt`. A molecule whose InChIKey already has a
+    PDBQT is never prepared again, and duplicates within the library are recognized before
+    they are submitted, so each molecule is prepared by one worker only. Failed molecules are
+    logged to `failures.tsv` and the stream continues; if a worker crashes (e.g. an RDKit
+    segfault) the pool is rebuilt and the records in flight are prepared again one at a time,
+    so only the molecule that kills its worker fails. `ligands.txt` lists the PDBQT paths for
+    `screen_ligands`.
+
+    Args:
+        library_path: Input library.
+        output_dir: Root directory of the sharded PDBQT cache.
+        n_workers: Worker processes (defaults to usable cores).
+        seed: Random seed for 3D embedding.
+
+    Returns:
+        Dict: Counts of prepared, cached and failed molecules and output paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n_workers = n_workers or get_probe().recommend_workers()
+    max_pending = n_workers * 8
+    counts = {"prepared": 0, "cached": 0, "failed": 0}
+
+    index_path = os.path.join(output_dir, "index.tsv")
+    list_path = os.path.join(output_dir, "ligands.txt")
+    failures_path = os.path.join(output_dir, "failures.tsv")
+    # InChIKey -> PDBQT path of finished molecules, and -> names of duplicates of in-flight ones
+    finished_paths, waiting = {}, {}
+
+    pool = ProcessPoolExecutor(max_workers=n_workers)
+    pending = {}
+    try:
+        with open(index_path, "w") as index_file, open(list_path, "w") as list_file, \
+                open(failures_path, "w") as failures_file:
+            index_file.write("name\tinchikey\tpdbqt_path\tstatus\n")
+            failures_file.write("name\terror\n")
+
+            def record(name, inchikey, path, status):
+                duplicates = waiting.pop(inchikey, []) if inchikey else []
+                if status.startswith("error"):
+                    counts["failed"] += 1 + len(duplicates)
+                    failures_file.writelines(f"{n}\t{status[7:]}\n" for n in [name] + duplicates)
+                    return
+                counts[status] += 1
+                index_file.write(f"{name}\t{inchikey}\t{path}\t{status}\n")
+                # Duplicate molecules in one library are listed once for screening
+                if inchikey not in finished_paths:
+                    finished_paths[inchikey] = path
+                    list_file.write(path + "\n")
+                for duplicate in duplicates:
+                    record_duplicate(duplicate, inchikey)
+
+            def record_duplicate(name, inchikey):
+                counts["cached"] += 1
+                index_file.write(f"{name}\t{inchikey}\t{finished_paths[inchikey]}\tcached\n")
+
+            def submit(name, fmt, text, inchikey):
+                future = pool.submit(_prepare_record, name, fmt, text, output_dir, seed)
+                pending[future] = (name, fmt, text, inchikey)
+
+            def collect(futures):
+                """Records finished futures; returns the records lost to a crashed worker."""
+                lost = []
+                for future in futures:
+                    name, fmt, text, inchikey = pending.pop(future)
+                    try:
+                        _, key, path, status = future.result()
+                    except BrokenProcessPool:
+                        lost.append((name, fmt, text, inchikey))
+                        continue
+                    except Exception as e:
+                        key, path, status = "", "", f"error: {type(e).__name__}: {e}".replace("\t", " ").replace("\n", " ")
+                    record(name, key or inchikey, path, status)
+                return lost
+
+            def restart_pool():
+                nonlocal pool
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=n_workers)
+
+            def recover(lost):
+                """Re-prepares records lost to a crashed worker one at a time, so only the culprit fails."""
+                # A broken pool fails every other in-flight future as well
+                lost += collect(wait(list(pending)).done)
+                restart_pool()
+                for name, fmt, text, inchikey in lost:
+                    submit(name, fmt, text, inchikey)
+                    if collect(wait(list(pending)).done):
+                        record(name, inchikey, "", "error: worker process crashed")
+                        restart_pool()
+
+            for name, fmt, text in _iter_library_records(library_path):
+                # Duplicates are resolved here rather than prepared again by another worker
+                inchikey = _record_inchikey(fmt, text)
+                if inchikey in finished_paths:
+                    record_duplicate(name, inchikey)
+                    continue
+                if inchikey in waiting:
+                    waiting[inchikey].append(name)
+                    continue
+                if inchikey:
+                    waiting[inchikey] = []
+                submit(name, fmt, text, inchikey)
+                if len(pending) >= max_pending:
+                    finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                    lost = collect(finished)
+                    if lost:
+                        recover(lost)
+
+            lost = collect(wait(list(pending)).done)
+            if lost:
+                recover(lost)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    return {
+        **counts,
+        "index_path": index_path,
+        "ligand_list": list_path,
+        "failures_path": failures_path,
+    }
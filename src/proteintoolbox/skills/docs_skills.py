@@ -3,6 +3,8 @@ import datetime
 from typing import List, Dict
 from proteintoolbox.skills.bio_skills import get_sequence_from_pdb
 
+__all__ = ["generate_project_report"]
+
 def generate_project_report(project_path: str, output_filename: str = "REPORT.md") -> str:
     """
     Generates a Markdown summary report for a project directory.
@@ -1,67 +1,453 @@
+import os
+import json
+import numpy as np
 import torch
-from transformers import AutoTokenizer, EsmModel
+from Bio import SeqIO
+from transformers import AutoTokenizer, EsmModel, EsmForMaskedLM
+from proteintoolbox.resources import get_probe
+
+__all__ = [
+    "configure_backend",
+    "get_embedding",
+    "score_mutations",
+    "export_residue_embeddings",
+    "load_residue_embeddings",
+]
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
 
 class ESMSkills:
-    def __init__(self, model_name: str = "facebook/esm2_t6_8M_UR50D"):
+    def __init__(self, model_name: str = "facebook/esm2_t6_8M_UR50D", device: str = None, dtype: str = "float32",
+                 quantize: bool = False, num_threads: int = None, num_interop_threads: int = None, compile_model: bool = False):
         """
         Initializes the ESM model wrapper.
         
         Args:
             model_name (str): The Hugging Face model ID. Defaults to the smallest ESM2 model (8M params)
                               for efficiency in this toolbox environment.
+            device (str): "cuda" or "cpu". Defaults to CUDA when available.
+            dtype (str): "float32" or "bfloat16" weights and activations.
+            quantize (bool): Apply dynamic int8 quantization to the linear layers (CPU only).
+            num_threads (int): Intra-op threads used by torch on the CPU. Defaults to the usable
+                               cores reported by the resource probe (respects cgroup quotas).
+            num_interop_threads (int): Inter-op threads (only settable before torch starts any work).
+            compile_model (bool): Wrap the model with `torch.compile`.
         """
+        if dtype not in ("float32", "bfloat16"):
+            raise ValueError(f"Unsupported dtype '{dtype}'. Use 'float32' or 'bfloat16'.")
+        if quantize and dtype != "float32":
+            raise ValueError("Dynamic int8 quantization requires float32 weights.")
+
         self.model_name = model_name
         self.tokenizer = None
         self.model = None
-        self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.mlm_model = None
+        self._device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        if quantize and self._device != "cpu":
+            raise ValueError("Dynamic int8 quantization is only supported on the CPU.")
+        self.dtype = dtype
+        self.quantize = quantize
+        self.num_threads = num_threads
+        self.num_interop_threads = num_interop_threads
+        self.compile_model = compile_model
+
+    def _configure_threads(self):
+        """Applies the requested torch thread pools."""
+        if self._device == "cpu":
+            torch.set_num_threads(self.num_threads or get_probe().cpu_count)
+        if self.num_interop_threads:
+            try:
+                torch.set_num_interop_threads(self.num_interop_threads)
+            except RuntimeError:
+                # torch only allows this before the first parallel region has run.
+                pass
 
     def _load_model(self):
         """Lazy loads the model and tokenizer."""
         if self.model is None:
             # print(f"Loading ESM model: {self.model_name} on {self._device}...") 
             # (Silence output for CLI tool unless debug)
+            self._configure_threads()
             try:
                 self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-                self.model = EsmModel.from_pretrained(self.model_name).to(self._device)
-                self.model.eval()
+                model = EsmModel.from_pretrained(self.model_name)
             except Exception as e:
                 raise RuntimeError(f"Failed to load ESM model {self.model_name}: {e}")
 
-    def get_embedding(self, sequence: str) -> list[float]:
+            self.model = self._prepare_model(model)
+
+    def _prepare_model(self, model):
+        """Applies the configured precision, device and compilation to a freshly loaded model."""
+        model.eval()
+        if self.quantize:
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif self.dtype == "bfloat16":
+            model = model.to(torch.bfloat16)
+        model = model.to(self._device)
+        if self.compile_model:
+            model = torch.compile(model, dynamic=True)
+        return model
+
+    def _load_mlm_model(self):
+        """
+        Lazy loads the model with its masked-language-model head (used for mutation scoring).
+        Embeddings then run on the masked LM's own encoder, so only one copy of the weights is
+        held in memory.
+        """
+        if self.mlm_model is None:
+            self._configure_threads()
+            try:
+                if self.tokenizer is None:
+                    self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                model = EsmForMaskedLM.from_pretrained(self.model_name)
+            except Exception as e:
+                raise RuntimeError(f"Failed to load ESM masked LM {self.model_name}: {e}")
+            self.mlm_model = self._prepare_model(model)
+            # Replaces any separately loaded EsmModel; torch.compile wraps the model in `_orig_mod`
+            encoder = getattr(self.mlm_model, "_orig_mod", self.mlm_model).esm
+            self.model = torch.compile(encoder, dynamic=True) if self.compile_model else encoder
+
+    @property
+    def max_residues(self) -> int:
+        """Longest sequence the model was trained on (1022 residues for ESM-2)."""
+        self._load_model()
+        # Positional table covers [CLS], [EOS] and the padding offset.
+        return self.model.config.max_position_embeddings - 4
+
+    @staticmethod
+    def _window_spans(length: int, window: int, overlap: int) -> list[tuple[int, int]]:
+        """
+        Splits [0, length) into overlapping windows of at most `window` residues.
+        The last window is aligned to the end of the sequence so every window is full length.
+        """
+        if overlap < 0 or overlap >= window:
+            raise ValueError(f"Overlap must be in [0, {window}), got {overlap}.")
+        if length <= window:
+            return [(0, length)]
+
+        stride = window - overlap
+        starts = list(range(0, length - window, stride)) + [length - window]
+        return [(start, start + window) for start in starts]
+
+    def _embed_batch(self, sequences: list[str], layer: int = -1) -> list[torch.Tensor]:
+        """Runs one padded forward pass and returns the per-residue states of each sequence."""
+        inputs = self.tokenizer(sequences, return_tensors="pt", padding=True).to(self._device)
+
+        with torch.no_grad():
+            if layer == -1:
+                hidden = self.model(**inputs).last_hidden_state
+            else:
+                # hidden_states[0] is the embedding layer, [i] the output of block i.
+                hidden = self.model(**inputs, output_hidden_states=True).hidden_states[layer]
+
+        # Position 0 is [CLS]; residues follow, then [EOS] and padding.
+        return [hidden[i, 1:len(seq) + 1] for i, seq in enumerate(sequences)]
+
+    def get_residue_embeddings(self, sequence: str, window_size: int = None, overlap: int = 128, batch_size: int = 8,
+                               layer: int = -1) -> torch.Tensor:
+        """
+        Computes per-residue representations, chunking sequences longer than the model limit.
+
+        Long sequences are split into overlapping windows that are embedded `batch_size` at a time.
+        Residues covered by several windows get the average of their window representations.
+
+        Args:
+            sequence (str): Amino acid sequence.
+            window_size (int): Residues per window. Defaults to (and is capped at) the model limit.
+            overlap (int): Residues shared by neighbouring windows.
+            batch_size (int): Windows per forward pass; bounds peak memory.
+            layer (int): Hidden layer to return (-1 is the final layer).
+
+        Returns:
+            torch.Tensor: Tensor of shape (len(sequence), hidden_size) on the CPU.
+        """
+        self._load_model()
+        # The ESM vocabulary is upper-case; lower-case letters would all become <unk>
+        sequence = sequence.upper()
+
+        window = min(window_size or self.max_residues, self.max_residues)
+        spans = self._window_spans(len(sequence), window, min(overlap, window - 1))
+
+        hidden_size = self.model.config.hidden_size
+        totals = torch.zeros(len(sequence), hidden_size)
+        counts = torch.zeros(len(sequence), 1)
+
+        for i in range(0, len(spans), batch_size):
+            batch = spans[i:i + batch_size]
+            residue_states = self._embed_batch([sequence[start:end] for start, end in batch], layer)
+            for (start, end), states in zip(batch, residue_states):
+                totals[start:end] += states.float().cpu()
+                counts[start:end] += 1
+
+        return totals / counts
+
+    def get_embedding(self, sequence: str, window_size: int = None, overlap: int = 128, batch_size: int = 8) -> list[float]:
         """
         Computes the mean representation (embedding) for a protein sequence using ESM.
         
+        Sequences longer than the model limit are embedded in overlapping windows
+        (see `get_residue_embeddings`) before pooling.
+
         Args:
             sequence (str): Amino acid sequence (e.g., "MKTVRQ...").
+            window_size (int): Optional window length for chunked embedding.
+            overlap (int): Residues shared by neighbouring windows.
+            batch_size (int): Windows per forward pass.
             
         Returns:
             list[float]: The mean embedding vector (size 320 for esm2_t6_8M).
         """
+        residue_embeddings = self.get_residue_embeddings(sequence, window_size, overlap, batch_size)
+
+        # Compute mean over residues
+        mean_embedding = torch.mean(residue_embeddings, dim=0)
+            
+        return mean_embedding.tolist()
+
+    def export_residue_embeddings(self, fasta_path: str, output_dir: str, layer: int = -1, dtype: str = "float16",
+                                  batch_size: int = 8) -> dict:
+        """
+        Streams per-residue embeddings for every record of a FASTA file to disk.
+
+        Residue rows of all sequences are appended to a single flat array file
+        (`embeddings.bin`, shape (total_residues, hidden_size)) as each batch completes,
+        so memory stays bounded by one batch. `index.tsv` maps each record ID to its
+        row offset and length; `metadata.json` records the dtype, layer and width.
+
+        Args:
+            fasta_path (str): Input FASTA.
+            output_dir (str): Directory for the export (overwritten).
+            layer (int): Hidden layer to export (-1 is the final layer).
+            dtype (str): "float16" or "float32" storage.
+            batch_size (int): Sequences (or windows of long sequences) per forward pass.
+
+        Returns:
+            dict: Summary with the number of sequences and residues written.
+        """
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported export dtype '{dtype}'. Use 'float16' or 'float32'.")
+
         self._load_model()
-        
-        # ESM tokenizer expects standard amino acids.
-        inputs = self.tokenizer(sequence, return_tensors="pt").to(self._device)
-        
+        os.makedirs(output_dir, exist_ok=True)
+
+        offset = 0
+        num_sequences = 0
+        with open(os.path.join(output_dir, "embeddings.bin"), "wb") as data_file, \
+                open(os.path.join(output_dir, "index.tsv"), "w") as index_file:
+            index_file.write("id\toffset\tlength\n")
+
+            def flush(records, arrays):
+                nonlocal offset, num_sequences
+                for (seq_id, sequence), array in zip(records, arrays):
+                    data_file.write(array.astype(dtype).tobytes())
+                    index_file.write(f"{seq_id}\t{offset}\t{len(sequence)}\n")
+                    offset += len(sequence)
+                    num_sequences += 1
+                data_file.flush()
+                index_file.flush()
+
+            batch = []
+            for record in SeqIO.parse(fasta_path, "fasta"):
+                # Upper-case like get_residue_embeddings: lower-case/soft-masked residues would be <unk>
+                sequence = str(record.seq).upper()
+                if len(sequence) > self.max_residues:
+                    # Long records are windowed on their own.
+                    states = self.get_residue_embeddings(sequence, batch_size=batch_size, layer=layer)
+                    flush([(record.id, sequence)], [states.numpy()])
+                    continue
+
+                batch.append((record.id, sequence))
+                if len(batch) == batch_size:
+                    states = self._embed_batch([seq for _, seq in batch], layer)
+                    flush(batch, [st.float().cpu().numpy() for st in states])
+                    batch = []
+
+            if batch:
+                states = self._embed_batch([seq for _, seq in batch], layer)
+                flush(batch, [st.float().cpu().numpy() for st in states])
+
+        metadata = {
+            "model_name": self.model_name,
+            "layer": layer,
+            "dtype": dtype,
+            "hidden_size": self.model.config.hidden_size,
+            "num_sequences": num_sequences,
+            "num_residues": offset,
+        }
+        with open(os.path.join(output_dir, "metadata.json"), "w") as f:
+            json.dump(metadata, f, indent=2)
+
+        return metadata
+
+    def _log_probs(self, input_ids: torch.Tensor) -> torch.Tensor:
+        """Amino-acid log-probabilities, shape (batch, tokens, 20)."""
         with torch.no_grad():
-            outputs = self.model(**inputs)
-            # last_hidden_state shape: (batch_size, sequence_length, hidden_size)
-            # sequence_length includes [CLS] and [EOS] tokens.
-            last_hidden_state = outputs.last_hidden_state[0]
-            
-            # Exclude the [CLS] (first) and [EOS] (last) tokens to get residue embeddings
-            # The input sequence length is len(sequence), tensor is len(sequence)+2
-            residue_embeddings = last_hidden_state[1:-1]
-            
-            # Compute mean over residues
-            mean_embedding = torch.mean(residue_embeddings, dim=0)
-            
-        return mean_embedding.cpu().tolist()
+            logits = self.mlm_model(input_ids=input_ids.to(self._device)).logits
+        aa_ids = self.tokenizer.convert_tokens_to_ids(list(AMINO_ACIDS))
+        return torch.log_softmax(logits.float(), dim=-1)[..., aa_ids].cpu()
+
+    def score_mutations(self, sequence: str, method: str = "masked_marginal", batch_size: int = 16) -> dict:
+        """
+        Scores every single substitution of a sequence with the ESM masked-language model.
+
+        Scores are log-likelihood ratios log p(mutant) - log p(wild type) at each position.
+        "masked_marginal" masks each position in turn; the masked copies are batched so the
+        full L x 20 matrix costs about L / batch_size forward passes. "wildtype_marginal"
+        reads all positions from a single unmasked forward pass.
+        Sequences beyond the model limit are scored in overlapping windows.
+
+        Args:
+            sequence (str): Wild-type amino acid sequence (case-insensitive; the 20 standard
+                            amino acids only, since mutations are scored against the wild type).
+            method (str): "masked_marginal" or "wildtype_marginal".
+            batch_size (int): Masked copies per forward pass.
+
+        Returns:
+            dict: 'alphabet', 'scores' (L x 20 nested list) and 'mutations' mapping names such as
+                  "M1A" (as produced by generate_saturation_library) to their score.
+        """
+        if method not in ("masked_marginal", "wildtype_marginal"):
+            raise ValueError(f"Unknown scoring method '{method}'. Use 'masked_marginal' or 'wildtype_marginal'.")
+        sequence = sequence.upper()
+        unknown = sorted({aa for aa in sequence if aa not in AMINO_ACIDS})
+        if unknown:
+            position = next(i for i, aa in enumerate(sequence) if aa not in AMINO_ACIDS) + 1
+            raise ValueError(f"Cannot score mutations of non-standard residue(s) {', '.join(unknown)} "
+                             f"(first at position {position}); use the 20 standard amino acids {AMINO_ACIDS}.")
+
+        self._load_mlm_model()
+        window = self.max_residues
+        spans = self._window_spans(len(sequence), window, min(128, window - 1))
+        log_probs = torch.zeros(len(sequence), len(AMINO_ACIDS))
+
+        # Score each residue in the window where it sits furthest from an edge.
+        owner = [max(range(len(spans)), key=lambda j: min(i - spans[j][0], spans[j][1] - 1 - i)) for i in range(len(sequence))]
+
+        for j, (start, end) in enumerate(spans):
+            positions = [i for i in range(start, end) if owner[i] == j]
+            input_ids = self.tokenizer(sequence[start:end], return_tensors="pt")["input_ids"]
+
+            if method == "wildtype_marginal":
+                window_log_probs = self._log_probs(input_ids)[0]
+                for i in positions:
+                    log_probs[i] = window_log_probs[i - start + 1]
+                continue
+
+            for b in range(0, len(positions), batch_size):
+                chunk = positions[b:b + batch_size]
+                masked = input_ids.repeat(len(chunk), 1)
+                # +1 skips the [CLS] token
+                token_positions = torch.tensor([i - start + 1 for i in chunk])
+                masked[torch.arange(len(chunk)), token_positions] = self.tokenizer.mask_token_id
+                batch_log_probs = self._log_probs(masked)
+                log_probs[chunk] = batch_log_probs[torch.arange(len(chunk)), token_positions]
+
+        wt_index = torch.tensor([AMINO_ACIDS.index(aa) for aa in sequence])
+        scores = log_probs - log_probs[torch.arange(len(sequence)), wt_index][:, None]
+
+        mutations = {}
+        for i, wt in enumerate(sequence):
+            for a, aa in enumerate(AMINO_ACIDS):
+                if aa != wt:
+                    mutations[f"{wt}{i+1}{aa}"] = scores[i, a].item()
+
+        return {
+            "alphabet": AMINO_ACIDS,
+            "scores": scores.tolist(),
+            "mutations": mutations,
+        }
+
+    def compare_to_reference(self, sequences: list[str], reference: "ESMSkills" = None) -> dict:
+        """
+        Measures how closely this backend reproduces full-precision embeddings.
+
+        Args:
+            sequences (list[str]): Sequences to embed with both backends.
+            reference (ESMSkills): Reference backend. Defaults to a float32 CPU model of the same name.
+
+        Returns:
+            dict: Per-sequence cosine similarities and their minimum and mean.
+        """
+        if reference is None:
+            reference = ESMSkills(self.model_name, device="cpu")
+
+        similarities = []
+        for sequence in sequences:
+            candidate = torch.tensor(self.get_embedding(sequence))
+            expected = torch.tensor(reference.get_embedding(sequence))
+            similarities.append(torch.nn.functional.cosine_similarity(candidate, expected, dim=0).item())
+
+        return {
+            "cosine_similarity": similarities,
+            "min_cosine_similarity": min(similarities),
+            "mean_cosine_similarity": sum(similarities) / len(similarities),
+        }
 
 # Singleton instance
 _esm_skills = ESMSkills()
 
-def get_embedding(sequence: str) -> list[float]:
+def configure_backend(model_name: str = "facebook/esm2_t6_8M_UR50D", device: str = None, dtype: str = "float32",
+                      quantize: bool = False, num_threads: int = None, num_interop_threads: int = None,
+                      compile_model: bool = False) -> dict:
+    """
+    Replaces the shared ESM backend, e.g. with a quantized, thread-tuned CPU model.
+
+    Returns:
+        dict: The active backend settings.
+    """
+    global _esm_skills
+    _esm_skills = ESMSkills(model_name, device=device, dtype=dtype, quantize=quantize, num_threads=num_threads,
+                            num_interop_threads=num_interop_threads, compile_model=compile_model)
+    return {
+        "model_name": model_name,
+        "device": _esm_skills._device,
+        "dtype": dtype,
+        "quantize": quantize,
+        "num_threads": num_threads,
+        "num_interop_threads": num_interop_threads,
+        "compile_model": compile_model,
+    }
+
+def get_embedding(sequence: str, window_size: int = None, overlap: int = 128) -> list[float]:
     """
     Public API to get protein embedding.
+    Long sequences are chunked into overlapping windows automatically.
     """
-    return _esm_skills.get_embedding(sequence)
+    return _esm_skills.get_embedding(sequence, window_size=window_size, overlap=overlap)
+
+def score_mutations(sequence: str, method: str = "masked_marginal", batch_size: int = 16) -> dict:
+    """
+    Public API for ESM log-likelihood-ratio scores of all single substitutions (L x 20).
+    """
+    return _esm_skills.score_mutations(sequence, method=method, batch_size=batch_size)
+
+def export_residue_embeddings(fasta_path: str, output_dir: str, layer: int = -1, dtype: str = "float16",
+                              batch_size: int = 8) -> dict:
+    """
+    Writes per-residue ESM embeddings for a whole FASTA file to a chunked on-disk array.
+    Use `load_residue_embeddings` to read single records back without loading the file.
+    """
+    return _esm_skills.export_residue_embeddings(fasta_path, output_dir, layer=layer, dtype=dtype, batch_size=batch_size)
+
+def load_residue_embeddings(export_dir: str, seq_id: str) -> np.ndarray:
+    """
+    Memory-maps the per-residue embeddings of one record from an export directory.
+
+    Returns:
+        np.ndarray: Array of shape (sequence_length, hidden_size).
+    """
+    with open(os.path.join(export_dir, "metadata.json")) as f:
+        metadata = json.load(f)
+
+    with open(os.path.join(export_dir, "index.tsv")) as f:
+        next(f)
+        for line in f:
+            record_id, offset, length = line.rstrip("\n").split("\t")
+            if record_id == seq_id:
+                break
+        else:
+            raise KeyError(f"Sequence '{seq_id}' not found in {export_dir}.")
+
+    data = np.memmap(os.path.join(export_dir, "embeddings.bin"), dtype=metadata["dtype"], mode="r",
+                     shape=(metadata["num_residues"], metadata["hidden_size"]))
+    return data[int(offset):int(offset) + int(length)]
@@ -1,6 +1,8 @@
 import networkx as nx
 from typing import List, Dict, Any
 
+__all__ = ["create_standard_workflow"]
+
 class ReasoningGraph:
     """
     A Graph-of-Thought (GoT) engine for structuring scientific reasoning.
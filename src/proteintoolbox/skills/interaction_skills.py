@@ -0,0 +1,218 @@
+import numpy as np
+import networkx as nx
+from scipy.spatial import cKDTree
+from typing import Dict, Tuple
+from proteintoolbox.structure_io import THREE_TO_ONE, WATERS, atom_index, read_atoms
+
+__all__ = ["find_interaction_networks"]
+
+_BACKBONE = ("N", "CA", "C", "O", "OXT")
+# Side-chain polar atoms: (residue, atom) -> (donor, acceptor, antecedent heavy atom)
+_SIDE_CHAIN_POLAR = {
+    ("ARG", "NE"): (True, False, "CD"), ("ARG", "NH1"): (True, False, "CZ"), ("ARG", "NH2"): (True, False, "CZ"),
+    ("ASN", "ND2"): (True, False, "CG"), ("ASN", "OD1"): (False, True, "CG"),
+    ("ASP", "OD1"): (False, True, "CG"), ("ASP", "OD2"): (False, True, "CG"),
+    ("GLN", "NE2"): (True, False, "CD"), ("GLN", "OE1"): (False, True, "CD"),
+    ("GLU", "OE1"): (False, True, "CD"), ("GLU", "OE2"): (False, True, "CD"),
+    ("HIS", "ND1"): (True, True, "CG"), ("HIS", "NE2"): (True, True, "CD2"),
+    ("LYS", "NZ"): (True, False, "CE"),
+    ("SER", "OG"): (True, True, "CB"), ("THR", "OG1"): (True, True, "CB"),
+    ("TYR", "OH"): (True, True, "CZ"), ("TRP", "NE1"): (True, False, "CD1"),
+}
+_CATIONS = {("ARG", "NE"), ("ARG", "NH1"), ("ARG", "NH2"), ("LYS", "NZ")}
+_HISTIDINE_CATIONS = {("HIS", "ND1"), ("HIS", "NE2")}
+_ANIONS = {("ASP", "OD1"), ("ASP", "OD2"), ("GLU", "OE1"), ("GLU", "OE2")}
+# Minimum donor-acceptor distance and antecedent angles (degrees) for heavy-atom H-bond geometry
+_MIN_HBOND_DISTANCE = 2.5
+_MIN_HBOND_ANGLE = 90.0
+
+def _polar_atoms(atoms: Dict, charged_histidine: bool) -> Dict[str, np.ndarray]:
+    """
+    Per-atom donor/acceptor flags, formal charge sign and antecedent atom (-1 if none), found
+    by looking up each distinct (residue, atom) name once.
+    """
+    amino = np.isin(atoms["res_names"], list(THREE_TO_ONE))
+    keys, inverse = np.unique(np.char.add(np.char.add(atoms["res_names"], "."), atoms["names"]), return_inverse=True)
+    cations = _CATIONS | (_HISTIDINE_CATIONS if charged_histidine else set())
+    table = np.zeros((len(keys), 4), dtype=object)
+    for k, key in enumerate(keys.tolist()):
+        res_name, name = key.split(".", 1)
+        donor, acceptor, antecedent = _SIDE_CHAIN_POLAR.get((res_name, name), (False, False, ""))
+        charge = 1 if (res_name, name) in cations else -1 if (res_name, name) in _ANIONS else 0
+        if res_name in THREE_TO_ONE:
+            if name == "N":
+                donor, antecedent = res_name != "PRO", "CA"
+            elif name in ("O", "OXT"):
+                acceptor, antecedent = True, "C"
+                charge = -1 if name == "OXT" else charge
+        elif res_name in WATERS and name.startswith("O"):
+            donor = acceptor = True
+        table[k] = (donor, acceptor, charge, antecedent)
+    table = table[inverse]
+    donor, acceptor = table[:, 0].astype(bool), table[:, 1].astype(bool)
+    antecedent = np.full(len(donor), -1, dtype=np.int64)
+    residue = atoms["residue_index"]
+    for name in set(table[:, 3].tolist()) - {""}:
+        rows = table[:, 3] == name
+        antecedent[rows] = atom_index(atoms, name)[residue[rows]]
+    return {
+        "donor": donor,
+        "acceptor": acceptor,
+        "charge": table[:, 2].astype(np.int8),
+        "antecedent": antecedent,
+        "backbone": amino & np.isin(atoms["names"], _BACKBONE),
+    }
+
+def _angle_ok(coords: np.ndarray, center: np.ndarray, other: np.ndarray, antecedent: np.ndarray) -> np.ndarray:
+    """Angle antecedent-center-other >= _MIN_HBOND_ANGLE (True where there is no antecedent)."""
+    ok = np.ones(len(center), dtype=bool)
+    has = antecedent >= 0
+    u = coords[antecedent[has]] - coords[center[has]]
+    v = coords[other[has]] - coords[center[has]]
+    cos = (u * v).sum(axis=1) / (np.linalg.norm(u, axis=1) * np.linalg.norm(v, axis=1))
+    ok[has] = cos <= np.cos(np.radians(_MIN_HBOND_ANGLE))
+    return ok
+
+def _find_interactions(atoms: Dict, hbond_distance: float, salt_bridge_distance: float, backbone_hbonds: bool,
+                       charged_histidine: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    H-bonds (donor, acceptor, distance) and salt-bridge atom pairs (cation, anion, distance),
+    from one KD-tree pair search over polar atoms and vectorized geometric filters.
+
+    Returns:
+        (hbond_atoms H x 2, hbond_distances, salt_atoms S x 2, salt_distances).
+    """
+    polar = _polar_atoms(atoms, charged_histidine)
+    coords = atoms["coords"]
+    candidates = np.flatnonzero(polar["donor"] | polar["acceptor"] | (polar["charge"] != 0))
+    pairs = cKDTree(coords[candidates]).query_pairs(max(hbond_distance, salt_bridge_distance), output_type="ndarray")
+    a, b = candidates[pairs[:, 0]], candidates[pairs[:, 1]]
+    residue = atoms["residue_index"]
+    keep = residue[a] != residue[b]
+    a, b = a[keep], b[keep]
+    distance = np.linalg.norm(coords[a] - coords[b], axis=1)
+
+    in_range = (distance <= hbond_distance) & (distance >= _MIN_HBOND_DISTANCE)
+    if not backbone_hbonds:
+        in_range &= ~(polar["backbone"][a] & polar["backbone"][b])
+    donor, acceptor, antecedent = polar["donor"], polar["acceptor"], polar["antecedent"]
+    # Each atom pair is tested in both directions; the a -> b direction wins when both pass
+    forward = in_range & donor[a] & acceptor[b]
+    forward[forward] = (_angle_ok(coords, a[forward], b[forward], antecedent[a[forward]])
+                        & _angle_ok(coords, b[forward], a[forward], antecedent[b[forward]]))
+    backward = in_range & ~forward & donor[b] & acceptor[a]
+    backward[backward] = (_angle_ok(coords, b[backward], a[backward], antecedent[b[backward]])
+                          & _angle_ok(coords, a[backward], b[backward], antecedent[a[backward]]))
+    hbonds = np.concatenate([np.stack([a[forward], b[forward]], axis=1), np.stack([b[backward], a[backward]], axis=1)])
+    hbond_distances = np.concatenate([distance[forward], distance[backward]])
+
+    charge = polar["charge"]
+    salt = (charge[a] * charge[b] == -1) & (distance <= salt_bridge_distance)
+    cation = np.where(charge[a] > 0, a, b)[salt]
+    anion = np.where(charge[a] > 0, b, a)[salt]
+    return hbonds, hbond_distances, np.stack([cation, anion], axis=1), distance[salt]
+
+def _residue_pairs(atoms: Dict, pairs: np.ndarray, distances: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Collapses atom pairs onto unordered residue pairs: (residue_i, residue_j, count, min distance)."""
+    n = len(atoms["residue_starts"])
+    ri, rj = atoms["residue_index"][pairs[:, 0]], atoms["residue_index"][pairs[:, 1]]
+    codes = np.minimum(ri, rj).astype(np.int64) * n + np.maximum(ri, rj)
+    unique, inverse, counts = np.unique(codes, return_inverse=True, return_counts=True)
+    closest = np.full(len(unique), np.inf)
+    np.minimum.at(closest, inverse, distances)
+    return unique // n, unique % n, counts, closest
+
+def find_interaction_networks(pdb_path: str, hbond_distance: float = 3.5, salt_bridge_distance: float = 4.0,
+                              backbone_hbonds: bool = False, waters: bool = False, charged_histidine: bool = False,
+                              min_network_size: int = 3, graph_path: str = None) -> Dict:
+    """
+    Hydrogen bonds and salt bridges of a structure, assembled into residue interaction
+    networks (networkx), with per-residue counts and the interactions crossing chains.
+
+    Candidate atom pairs come from a single KD-tree search over polar atoms; H-bonds then need
+    a donor-acceptor distance of 2.5 A to `hbond_distance` and angles of at least 90 degrees at
+    the donor and acceptor (measured from their bonded heavy atoms, so explicit hydrogens are
+    not required). Salt bridges are Arg/Lys (optionally His) nitrogens within
+    `salt_bridge_distance` of Asp/Glu/C-terminal oxygens. Every filter is vectorized, so 100k
+    atom assemblies take about a second.
+
+    Args:
+        pdb_path: Structure (first model).
+        hbond_distance: Maximum donor-acceptor distance in Angstroms.
+        salt_bridge_distance: Maximum N-O distance in Angstroms.
+        backbone_hbonds: Include backbone-backbone H-bonds (secondary structure); off by
+            default so networks reflect side-chain interactions.
+        waters: Include waters as bridging nodes.
+        charged_histidine: Treat histidine as a cation in salt bridges.
+        min_network_size: Smallest connected network (in residues) reported.
+        graph_path: Optional GraphML file for the residue graph.
+
+    Returns:
+        Dict: Counts, the H-bond and salt-bridge lists, per-residue counts, networks (largest
+        first), cross-chain interactions and the residue graph (nodes and edges with attributes).
+    """
+    atoms = read_atoms(pdb_path, waters=waters)
+    hbonds, hbond_distances, salts, salt_distances = _find_interactions(
+        atoms, hbond_distance, salt_bridge_distance, backbone_hbonds, charged_histidine)
+
+    labels = atoms["residue_labels"]
+    names = atoms["names"]
+    residue = atoms["residue_index"]
+    chains = atoms["residue_chains"]
+    n_res = len(labels)
+    hbond_counts = np.bincount(residue[hbonds].ravel(), minlength=n_res)
+    salt_pairs = _residue_pairs(atoms, salts, salt_distances)
+    salt_counts = np.bincount(np.concatenate(salt_pairs[:2]), minlength=n_res)
+
+    graph = nx.Graph()
+    for r in np.flatnonzero((hbond_counts > 0) | (salt_counts > 0)):
+        graph.add_node(labels[r], chain=str(chains[r]), hbonds=int(hbond_counts[r]), salt_bridges=int(salt_counts[r]))
+    for ri, rj, count, closest in zip(*_residue_pairs(atoms, hbonds, hbond_distances)):
+        graph.add_edge(labels[ri], labels[rj], hbonds=int(count), salt_bridge=False, distance=round(float(closest), 2))
+    for ri, rj, _, closest in zip(*salt_pairs):
+        if graph.has_edge(labels[ri], labels[rj]):
+            edge = graph.edges[labels[ri], labels[rj]]
+            edge["salt_bridge"] = True
+            edge["distance"] = min(edge["distance"], round(float(closest), 2))
+        else:
+            graph.add_edge(labels[ri], labels[rj], hbonds=0, salt_bridge=True, distance=round(float(closest), 2))
+
+    networks = []
+    for component in sorted(nx.connected_components(graph), key=len, reverse=True):
+        if len(component) < min_network_size:
+            break
+        sub = graph.subgraph(component)
+        networks.append({
+            "residues": sorted(component),
+            "n_hbonds": sum(d["hbonds"] for _, _, d in sub.edges(data=True)),
+            "n_salt_bridges": sum(d["salt_bridge"] for _, _, d in sub.edges(data=True)),
+            "chains": sorted({graph.nodes[r]["chain"] for r in component}),
+        })
+
+    def atom_label(i):
+        return f"{labels[residue[i]]}.{names[i]}"
+
+    cross = lambda pairs: chains[residue[pairs[:, 0]]] != chains[residue[pairs[:, 1]]]
+    if graph_path:
+        nx.write_graphml(graph, graph_path)
+    result = {
+        "n_hbonds": len(hbonds),
+        "n_salt_bridges": len(salt_pairs[0]),
+        "hbonds": [(atom_label(d), atom_label(a), round(float(x), 2)) for (d, a), x in zip(hbonds, hbond_distances)],
+        "salt_bridges": [(labels[i], labels[j], round(float(x), 2)) for i, j, _, x in zip(*salt_pairs)],
+        "per_residue": {node: {"hbonds": data["hbonds"], "salt_bridges": data["salt_bridges"]}
+                        for node, data in graph.nodes(data=True)},
+        "networks": networks,
+        "interface": {
+            "hbonds": [(atom_label(d), atom_label(a)) for d, a in hbonds[cross(hbonds)]],
+            "salt_bridges": [(labels[i], labels[j]) for i, j in zip(salt_pairs[0], salt_pairs[1])
+                             if chains[i] != chains[j]],
+        },
+        "graph": {
+            "nodes": [dict(data, id=node) for node, data in graph.nodes(data=True)],
+            "edges": [dict(data, source=u, target=v) for u, v, data in graph.edges(data=True)],
+        },
+    }
+    if graph_path:
+        result["graph_path"] = graph_path
+    return result
@@ -1,5 +1,32 @@
+import os
+from typing import Dict, List, Union
+from proteintoolbox.sequence_io import read_sequence_records
 from proteintoolbox.skills import analysis_skills
 
+__all__ = [
+    "check_design_constraints",
+    "screen_designs",
+    "infer_functionality_issues",
+    "validate_workflow_logic",
+    "propose_refinements",
+    "get_reasoning_template",
+    "decompose_request",
+]
+
+# Constraint keys answered by the windowed aggregation scan rather than ProtParam
+_AGGREGATION_KEYS = ('max_aggregation_regions', 'max_aggregation_fraction')
+
+def _aggregation_violations(scan: dict, constraints: dict) -> list:
+    violations = []
+    if 'max_aggregation_regions' in constraints:
+        if scan['n_aggregation_regions'] > constraints['max_aggregation_regions']:
+            regions = ", ".join(f"{r['sequence']} {r['start']}-{r['end']}" for r in scan['regions'] if r['type'] == 'aggregation')
+            violations.append(f"Aggregation: {scan['n_aggregation_regions']} prone region(s) > {constraints['max_aggregation_regions']} ({regions})")
+    if 'max_aggregation_fraction' in constraints:
+        if scan['aggregation_fraction'] > constraints['max_aggregation_fraction']:
+            violations.append(f"Aggregation: {scan['aggregation_fraction']:.2f} of residues in prone regions > {constraints['max_aggregation_fraction']}")
+    return violations
+
 def check_design_constraints(sequence: str, constraints: dict) -> dict:
     """
     Evaluates a protein sequence against a set of logical constraints.
@@ -8,6 +35,8 @@ def check_design_constraints(sequence: str, constraints: dict) -> dict:
         sequence: The amino acid sequence.
         constraints: A dictionary of constraints, e.g., 
                      {'max_molecular_weight': 50000, 'min_instability_index': 40}
+                     'max_aggregation_regions' / 'max_aggregation_fraction' limit the
+                     aggregation-prone regions found by analysis_skills.scan_aggregation.
     
     Returns:
         dict: A report with 'pass' (bool), 'violations' (list), and 'metrics' (dict).
@@ -45,12 +74,71 @@ def check_design_constraints(sequence: str, constraints: dict) -> dict:
         elif pref == 'hydrophobic' and props['gravy'] < 0:
              violations.append(f"GRAVY {props['gravy']:.2f} is negative (Hydrophilic) but 'hydrophobic' requested")
 
+    # 5. Aggregation-prone regions (AGGRESCAN sliding window)
+    if any(key in constraints for key in _AGGREGATION_KEYS):
+        scan = analysis_skills.scan_aggregation(sequence)
+        props['aggregation_regions'] = scan['n_aggregation_regions']
+        props['aggregation_fraction'] = scan['aggregation_fraction']
+        violations.extend(_aggregation_violations(scan, constraints))
+
     return {
         "pass": len(violations) == 0,
         "violations": violations,
         "metrics": props
     }
 
+def screen_designs(sequences: Union[str, List[str], Dict[str, str]], constraints: dict, output_path: str = None) -> dict:
+    """
+    Applies `check_design_constraints` to a whole design library. Aggregation constraints are
+    checked first for every design at once (scan_aggregation_batch), and aggregation-prone designs
+    are rejected before the per-sequence property checks or any later folding/docking step.
+
+    Args:
+        sequences: FASTA path, list of sequences, or dict of id -> sequence.
+        constraints: As for `check_design_constraints`.
+        output_path: Optional TSV (id, pass, stage, violations).
+
+    Returns:
+        dict: Counts, ids of passing designs and per-design reports in input order; 'stage' is
+        'aggregation' for designs rejected by the scan, otherwise 'properties'.
+    """
+    records = read_sequence_records(sequences)
+
+    if any(key in constraints for key in _AGGREGATION_KEYS):
+        scans = analysis_skills.scan_aggregation_batch([seq for _, seq in records], profiles=False)['results']
+    else:
+        scans = [None] * len(records)
+    property_constraints = {k: v for k, v in constraints.items() if k not in _AGGREGATION_KEYS}
+
+    results = []
+    for (seq_id, sequence), scan in zip(records, scans):
+        violations = _aggregation_violations(scan, constraints) if scan else []
+        if violations:
+            results.append({"id": seq_id, "pass": False, "stage": "aggregation", "violations": violations,
+                            "metrics": {'aggregation_regions': scan['n_aggregation_regions'],
+                                        'aggregation_fraction': scan['aggregation_fraction']}})
+            continue
+        report = check_design_constraints(sequence, property_constraints)
+        if scan:
+            report['metrics']['aggregation_regions'] = scan['n_aggregation_regions']
+            report['metrics']['aggregation_fraction'] = scan['aggregation_fraction']
+        results.append({"id": seq_id, "stage": "properties", **report})
+
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w") as f:
+            f.write("id\tpass\tstage\tviolations\n")
+            for r in results:
+                f.write(f"{r['id']}\t{r['pass']}\t{r['stage']}\t{'; '.join(r['violations'])}\n")
+
+    return {
+        "n_designs": len(results),
+        "n_passed": sum(1 for r in results if r['pass']),
+        "n_rejected_aggregation": sum(1 for r in results if r['stage'] == 'aggregation'),
+        "passed": [r['id'] for r in results if r['pass']],
+        "results": results,
+    }
+
 def infer_functionality_issues(sequence: str) -> list:
     """
     Uses heuristic reasoning to infer potential functionality issues based on sequence composition.
@@ -148,7 +236,7 @@ def propose_refinements(steps: list[str]) -> list[str]:
         
     # 3. Aggregation Check for heavy design
     if 'design' in text and 'aggregation' not in text:
-        suggestions.append("For protein design, it is recommended to check for 'aggregation' prone regions.")
+        suggestions.append("For protein design, it is recommended to check for 'aggregation' prone regions (scan_aggregation, or screen_designs with 'max_aggregation_regions').")
 
     return suggestions
 
@@ -229,6 +317,8 @@ def decompose_request(request: str) -> dict:
         constraints.append("min_instability_index")
     if "soluble" in request_lower:
         constraints.append("solubility_preference")
+    if "aggregat" in request_lower:
+        constraints.append("max_aggregation_regions")
     if "binder" in request_lower:
         constraints.append("high_affinity")
 
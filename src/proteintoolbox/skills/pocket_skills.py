@@ -0,0 +1,172 @@
+import numpy as np
+from scipy import ndimage
+from scipy.spatial import cKDTree
+from typing import Dict, List, Tuple
+
+__all__ = ["detect_pockets", "suggest_docking_box"]
+
+# Half-ray directions used for buriedness: the 3 axes and 4 cube diagonals, both senses
+_DIRECTIONS = np.array([
+    (1, 0, 0), (0, 1, 0), (0, 0, 1),
+    (1, 1, 1), (1, 1, -1), (1, -1, 1), (-1, 1, 1),
+])
+_DIRECTIONS = np.concatenate([_DIRECTIONS, -_DIRECTIONS])
+
+def _read_heavy_atoms(structure_path: str, include_hetatm: bool = False) -> Tuple[np.ndarray, List[str]]:
+    """
+    Reads heavy-atom coordinates and residue labels ("A:45_LYS") from a PDB or PDBQT file.
+    Waters and hydrogens are always skipped; other HETATM records only if requested.
+    """
+    coords, residues = [], []
+    records = ("ATOM", "HETATM") if include_hetatm else ("ATOM",)
+    with open(structure_path) as f:
+        for line in f:
+            if not line.startswith(records):
+                continue
+            res_name = line[17:20].strip()
+            if res_name in ("HOH", "WAT"):
+                continue
+            # PDB element column, or the AutoDock type in PDBQT files
+            element = line[76:79].strip() or line[12:16].strip()[:1]
+            if element.upper().startswith("H") and element.upper() not in ("HG",):
+                continue
+            coords.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+            residues.append(f"{line[21]}:{line[22:26].strip()}_{res_name}")
+    if not coords:
+        raise ValueError(f"No heavy atoms found in {structure_path}")
+    return np.array(coords), residues
+
+def _occupancy(coords: np.ndarray, origin: np.ndarray, shape: np.ndarray, spacing: float,
+               radius: float) -> np.ndarray:
+    """
+    Marks grid points closer than `radius` to any atom. Loops over the few cell offsets an
+    atom can reach and tests all atoms at once per offset, so the cost is O(offsets x atoms)
+    NumPy work with no per-atom Python loop.
+    """
+    reach = int(np.ceil(radius / spacing))
+    padded = np.asarray(shape) + 2 * reach
+    strides = np.array([padded[1] * padded[2], padded[2], 1])
+    occupied = np.zeros(int(padded.prod()), dtype=bool)
+
+    cells = np.floor((coords - origin) / spacing).astype(np.int64)
+    frac = (coords - origin - cells * spacing).astype(np.float32)
+    base = (cells + reach) @ strides
+
+    for offset in np.ndindex(*(2 * reach + 1,) * 3):
+        offset = np.array(offset) - reach
+        # Closest any point of the atom's cell can get to this neighbour cell
+        nearest = spacing * np.maximum(0, np.maximum(offset - 1, -offset))
+        if (nearest ** 2).sum() >= radius ** 2:
+            continue
+        delta = offset.astype(np.float32) * spacing - frac
+        hit = np.einsum("ij,ij->i", delta, delta) < radius ** 2
+        occupied[base[hit] + offset @ strides] = True
+
+    occupied = occupied.reshape(padded)
+    return occupied[reach:reach + shape[0], reach:reach + shape[1], reach:reach + shape[2]]
+
+def _buriedness(occupied: np.ndarray, max_steps: int) -> np.ndarray:
+    """
+    Counts, for every grid point, how many of the 14 half-rays hit protein within
+    `max_steps` grid cells (LIGSITE-style enclosure), using shifted boolean slices.
+    """
+    counts = np.zeros(occupied.shape, dtype=np.uint8)
+    for direction in _DIRECTIONS:
+        hit = np.zeros(occupied.shape, dtype=bool)
+        for step in range(1, max_steps + 1):
+            shift = direction * step
+            src = tuple(slice(max(s, 0), n + min(s, 0)) for s, n in zip(shift, occupied.shape))
+            dst = tuple(slice(max(-s, 0), n + min(-s, 0)) for s, n in zip(shift, occupied.shape))
+            hit[dst] |= occupied[src]
+        counts += hit
+    return counts
+
+def detect_pockets(structure_path: str, spacing: float = 1.0, probe_radius: float = 3.0,
+                   ray_length: float = 10.0, min_buriedness: int = 10, min_volume: float = 50.0,
+                   box_padding: float = 4.0, max_pockets: int = 10, include_hetatm: bool = False) -> List[Dict]:
+    """
+    Finds buried solvent-accessible voids on a grid and ranks them as candidate binding pockets.
+
+    Grid points farther than `probe_radius` from every heavy atom are empty. An empty point's
+    buriedness is the number of 14 rays (axes and diagonals, both ways) that meet protein
+    within `ray_length`. Connected sets of buried points form pockets, ranked by
+    volume x mean buriedness. Each pocket carries a docking box (`center`, `size`) that can be
+    passed straight to `run_docking` or `screen_ligands`.
+
+    Args:
+        structure_path: Receptor PDB or PDBQT.
+        spacing: Grid spacing in Angstroms.
+        probe_radius: Minimum distance from any atom centre for a point to count as empty.
+        ray_length: Maximum ray length (Angstroms) for the buriedness test.
+        min_buriedness: Rays (out of 14) that must hit protein for a point to be in a pocket.
+        min_volume: Smallest reported pocket, in cubic Angstroms.
+        box_padding: Margin added around the pocket on each side of the docking box.
+        max_pockets: Number of ranked pockets returned.
+        include_hetatm: Treat ligands/cofactors as part of the receptor.
+
+    Returns:
+        List[Dict]: Pockets with rank, score, volume, buriedness, center, size and lining residues.
+    """
+    coords, residues = _read_heavy_atoms(structure_path, include_hetatm)
+
+    # Points outside the atoms' bounding box see open space along at least 5 rays, so they
+    # can never reach min_buriedness >= 10; the grid only needs to cover the box itself.
+    origin = coords.min(axis=0) - probe_radius
+    shape = np.ceil((coords.max(axis=0) + probe_radius - origin) / spacing).astype(int) + 1
+    occupied = _occupancy(coords, origin, shape, spacing, probe_radius)
+    counts = _buriedness(occupied, max(1, int(round(ray_length / spacing))))
+
+    labels, n_labels = ndimage.label(~occupied & (counts >= min_buriedness), structure=np.ones((3, 3, 3)))
+    if n_labels == 0:
+        return []
+
+    # Per-pocket volume and buriedness in one pass over the labelled grid
+    flat = labels.ravel()
+    keep = flat > 0
+    n_points = np.bincount(flat[keep], minlength=n_labels + 1)
+    buried_sum = np.bincount(flat[keep], weights=counts.ravel()[keep], minlength=n_labels + 1)
+    voxel = spacing ** 3
+    volume = n_points * voxel
+    buriedness = buried_sum / np.maximum(n_points, 1) / len(_DIRECTIONS)
+    score = volume * buriedness
+    candidates = np.flatnonzero(volume >= min_volume)
+    ranked = candidates[np.argsort(-score[candidates], kind="stable")][:max_pockets]
+
+    tree = cKDTree(coords)
+    lining_radius = probe_radius + 1.0
+    pockets = []
+    for rank, label in enumerate(ranked, start=1):
+        member = origin + spacing * np.argwhere(labels == label)
+        lo, hi = member.min(axis=0), member.max(axis=0)
+        # Lining atoms: within lining_radius of any pocket point
+        pairs = cKDTree(member).query_ball_tree(tree, lining_radius)
+        lining = {residues[i] for i in set().union(*pairs)}
+        pockets.append({
+            "rank": rank,
+            "score": round(float(score[label]), 1),
+            "volume": round(float(volume[label]), 1),
+            "buriedness": round(float(buriedness[label]), 3),
+            "n_points": int(n_points[label]),
+            "center": [round(float(c), 3) for c in (lo + hi) / 2],
+            "size": [round(float(s), 1) for s in (hi - lo) + 2 * box_padding],
+            "residues": sorted(lining, key=lambda r: (r.split(":")[0], int(r.split(":")[1].split("_")[0]))),
+        })
+    return pockets
+
+def suggest_docking_box(structure_path: str, pocket_rank: int = 1, **kwargs) -> Dict:
+    """
+    Docking box for one detected pocket, as keyword arguments for `run_docking`/`screen_ligands`.
+
+    Args:
+        structure_path: Receptor PDB or PDBQT.
+        pocket_rank: 1 for the top-ranked pocket.
+        **kwargs: Passed on to `detect_pockets`.
+
+    Returns:
+        Dict: {"center": [x, y, z], "size": [x, y, z]}.
+    """
+    pockets = detect_pockets(structure_path, max_pockets=pocket_rank, **kwargs)
+    if len(pockets) < pocket_rank:
+        raise ValueError(f"Only {len(pockets)} pocket(s) found in {structure_path}")
+    pocket = pockets[pocket_rank - 1]
+    return {"center": pocket["center"], "size": pocket["size"]}
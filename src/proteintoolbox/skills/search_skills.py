@@ -1,6 +1,8 @@
 from Bio import Entrez
 import os
 
+__all__ = ["search_pubmed"]
+
 # Set email if available, otherwise use dummy
 Entrez.email = os.environ.get("ENTREZ_EMAIL", "proteintoolbox@example.com")
 
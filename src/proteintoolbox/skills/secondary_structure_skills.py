@@ -0,0 +1,307 @@
+import os
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Tuple, Union
+from proteintoolbox.structure_io import iter_structures, read_residue_atoms
+
+__all__ = ["assign_secondary_structure", "assign_secondary_structure_batch"]
+
+# DSSP states; " " is loop/irregular
+DSSP_STATES = "HBEGITS "
+# 3-state reduction: helix (H, G, I), strand (E, B), coil (everything else)
+_THREE_STATE = {"H": "H", "G": "H", "I": "H", "E": "E", "B": "E"}
+
+# Kabsch & Sander electrostatic H-bond model, in the constants used by mkdssp
+_COUPLING = -27.888  # -0.42 * 0.20 * 332 kcal/mol
+_MIN_ENERGY = -9.9
+_MAX_HBOND_ENERGY = -0.5
+_MIN_DISTANCE = 0.5
+_MAX_CA_DISTANCE = 9.0
+_MAX_PEPTIDE_BOND = 2.5
+# Elements of the (structures x donors x acceptors) energy block computed at once
+_BLOCK_ELEMENTS = 1 << 20
+
+def _hbond_matrix(backbone: np.ndarray, proline: np.ndarray, breaks: np.ndarray) -> np.ndarray:
+    """
+    Backbone H-bonds of a batch: `hbond[b, d, a]` is True when the NH of residue d donates to
+    the CO of residue a with E < -0.5 kcal/mol and a is one of d's two best acceptors (as in
+    DSSP). Energies are computed in blocks of donor rows, all structures at once.
+
+    Args:
+        backbone: B x L x 4 x 3 (N, CA, C, O).
+        proline: B x L, no amide H.
+        breaks: B x L, chain break before residue i (no amide H either).
+    """
+    n, ca, c, o = (backbone[:, :, k] for k in range(4))
+    b_count, length = backbone.shape[:2]
+    # Amide H placed 1 A from N, opposite the previous carbonyl
+    co = c[:, :-1] - o[:, :-1]
+    h = n.copy()
+    h[:, 1:] += co / np.linalg.norm(co, axis=-1, keepdims=True)
+    has_h = ~proline & ~breaks
+    has_h[:, 0] = False
+
+    hbond = np.zeros((b_count, length, length), dtype=bool)
+    index = np.arange(length)
+    rows = max(1, _BLOCK_ELEMENTS // max(1, b_count * length))
+    for start in range(0, length, rows):
+        d = slice(start, min(start + rows, length))
+
+        def distance(x, y):
+            return np.linalg.norm(x[:, d, None, :] - y[:, None, :, :], axis=-1)
+
+        d_on, d_ch, d_oh, d_cn = distance(n, o), distance(h, c), distance(h, o), distance(n, c)
+        with np.errstate(divide="ignore"):
+            energy = _COUPLING * (1.0 / d_oh - 1.0 / d_ch + 1.0 / d_cn - 1.0 / d_on)
+        energy = np.round(energy, 3)
+        energy[np.minimum(np.minimum(d_on, d_ch), np.minimum(d_oh, d_cn)) < _MIN_DISTANCE] = _MIN_ENERGY
+        energy = np.maximum(energy, _MIN_ENERGY)
+        donors, acceptors = index[d, None], index[None, :]
+        valid = (distance(ca, ca) < _MAX_CA_DISTANCE) & has_h[:, d, None]
+        valid &= (acceptors != donors) & (acceptors != donors - 1)
+        energy = np.where(valid, energy, 0.0)
+        # Only the two lowest-energy acceptors of each donor count
+        second = np.partition(energy, 1, axis=-1)[..., 1:2] if length > 1 else energy
+        hbond[:, d] = (energy < _MAX_HBOND_ENERGY) & (energy <= second)
+    return hbond
+
+def _no_break(breaks: np.ndarray, span: int) -> np.ndarray:
+    """ok[b, i]: no chain break inside residues i..i+span (breaks[b, k] = break before k)."""
+    length = breaks.shape[1]
+    cumulative = np.concatenate([np.zeros((len(breaks), 1), dtype=int), np.cumsum(breaks, axis=1)], axis=1)
+    ok = np.zeros(breaks.shape, dtype=bool)
+    if span < length:
+        # Breaks before residues i+1..i+span
+        ok[:, :length - span] = (cumulative[:, span + 1:length + 1] - cumulative[:, 1:length - span + 1]) == 0
+    return ok
+
+def _ladders(bridges: List[Tuple[int, int, bool]], breaks: np.ndarray) -> List[Dict]:
+    """Groups bridges into ladders and joins ladders separated by a beta bulge (as mkdssp)."""
+    ladders = []
+    for i, j, parallel in sorted(bridges):
+        for ladder in ladders:
+            if ladder["parallel"] == parallel and i == ladder["i"][-1] + 1 and not breaks[i]:
+                if parallel and j == ladder["j"][-1] + 1 and not breaks[j]:
+                    ladder["i"].append(i)
+                    ladder["j"].append(j)
+                    break
+                if not parallel and j == ladder["j"][0] - 1 and not breaks[j + 1]:
+                    ladder["i"].append(i)
+                    ladder["j"].insert(0, j)
+                    break
+        else:
+            ladders.append({"i": [i], "j": [j], "parallel": parallel})
+
+    merged = True
+    while merged:
+        merged = False
+        for a in range(len(ladders)):
+            for b in range(a + 1, len(ladders)):
+                first, second = sorted((ladders[a], ladders[b]), key=lambda x: x["i"][0])
+                if first["parallel"] != second["parallel"]:
+                    continue
+                ibi, iei, jbi, jei = first["i"][0], first["i"][-1], first["j"][0], first["j"][-1]
+                ibj, iej, jbj, jej = second["i"][0], second["i"][-1], second["j"][0], second["j"][-1]
+                if ibj - iei >= 6 or iei >= ibj or breaks[iei + 1:ibj + 1].any():
+                    continue
+                if first["parallel"]:
+                    bulge = jei <= jbj and ((jbj - jei < 6 and ibj - iei < 3) or jbj - jei < 3)
+                    j_span = (jei, jbj)
+                else:
+                    bulge = jej <= jbi and ((jbi - jej < 6 and ibj - iei < 3) or jbi - jej < 3)
+                    j_span = (jej, jbi)
+                if not bulge or breaks[j_span[0] + 1:j_span[1] + 1].any():
+                    continue
+                joined = {"i": first["i"] + second["i"], "parallel": first["parallel"],
+                          "j": first["j"] + second["j"] if first["parallel"] else second["j"] + first["j"]}
+                ladders = [x for k, x in enumerate(ladders) if k not in (a, b)] + [joined]
+                merged = True
+                break
+            if merged:
+                break
+    return ladders
+
+def _assign(backbone: np.ndarray, proline: np.ndarray, breaks: np.ndarray) -> np.ndarray:
+    """
+    DSSP states for a batch of equal-length chains (B x L x 4 x 3 backbones). H-bonds, turns,
+    helices, bridges and bends are whole-batch array operations; only the few bridges found
+    are walked in Python to build ladders.
+
+    Returns:
+        B x L array of one-character states (see DSSP_STATES).
+    """
+    b_count, length = backbone.shape[:2]
+    hbond = _hbond_matrix(backbone, proline, breaks)
+    ss = np.full((b_count, length), " ", dtype="<U1")
+
+    # n-turns: CO(i) -> NH(i+n), unbroken
+    turns = {}
+    for n in (3, 4, 5):
+        turn = np.zeros((b_count, length), dtype=bool)
+        if length > n:
+            turn[:, :length - n] = np.diagonal(hbond, offset=-n, axis1=1, axis2=2)
+        turns[n] = turn & _no_break(breaks, n)
+
+    # Bridges between i and j (j >= i + 3), both with unbroken neighbours
+    if length >= 5:
+        nh = hbond
+        # nh[b, d, a]: NH(d) -> CO(a). Shifted views index (i, j) over residues 1..L-2
+        parallel = ((nh[:, 2:, 1:-1] & nh[:, 1:-1, :-2].transpose(0, 2, 1))
+                    | (nh[:, 2:, 1:-1].transpose(0, 2, 1) & nh[:, 1:-1, :-2]))
+        antiparallel = ((nh[:, 2:, :-2] & nh[:, 2:, :-2].transpose(0, 2, 1))
+                        | (nh[:, 1:-1, 1:-1] & nh[:, 1:-1, 1:-1].transpose(0, 2, 1)))
+        core = np.triu(np.ones((length - 2, length - 2), dtype=bool), k=3)
+        unbroken = _no_break(breaks, 2)[:, :length - 2]
+        core = core & unbroken[:, :, None] & unbroken[:, None, :]
+        parallel &= core
+        antiparallel &= core & ~parallel
+        for b in range(b_count):
+            bridges = [(i + 1, j + 1, True) for i, j in zip(*np.nonzero(parallel[b]))]
+            bridges += [(i + 1, j + 1, False) for i, j in zip(*np.nonzero(antiparallel[b]))]
+            for ladder in _ladders(bridges, breaks[b]):
+                state = "E" if len(ladder["i"]) > 1 else "B"
+                for lo, hi in ((ladder["i"][0], ladder["i"][-1]), (ladder["j"][0], ladder["j"][-1])):
+                    span = ss[b, lo:hi + 1]
+                    span[span != "E"] = state
+
+    def starts(n):
+        # Two consecutive n-turns at i-1 and i start a minimal helix at i
+        start = np.zeros((b_count, length), dtype=bool)
+        start[:, 1:] = turns[n][:, 1:] & turns[n][:, :-1]
+        return start
+
+    # Alpha helices override strands; 3-10 and pi helices only fill residues still free
+    for n, state in ((4, "H"), (3, "G"), (5, "I")):
+        for i in zip(*np.nonzero(starts(n))):
+            b, i = i
+            span = ss[b, i:i + n]
+            if state == "H" or np.isin(span, (" ", state)).all():
+                span[:] = state
+
+    # Turns (T) and bends (S) on remaining loop residues
+    for n in (3, 4, 5):
+        for b, i in zip(*np.nonzero(turns[n])):
+            span = ss[b, i + 1:i + n]
+            span[span == " "] = "T"
+    if length >= 5:
+        ca = backbone[:, :, 1]
+        v1 = ca[:, 2:-2] - ca[:, :-4]
+        v2 = ca[:, 4:] - ca[:, 2:-2]
+        cos = (v1 * v2).sum(axis=-1) / (np.linalg.norm(v1, axis=-1) * np.linalg.norm(v2, axis=-1))
+        bend = np.zeros((b_count, length), dtype=bool)
+        bend[:, 2:-2] = (np.degrees(np.arccos(np.clip(cos, -1, 1))) > 70.0) & _no_break(breaks, 4)[:, :length - 4]
+        ss[bend & (ss == " ")] = "S"
+    return ss
+
+def _read_chain(pdb_path: str) -> Dict:
+    """Backbone (N, CA, C, O) of all residues, with chain breaks from chain ids or C-N gaps."""
+    residues = read_residue_atoms(pdb_path, ("N", "CA", "C", "O"))
+    if len(residues["labels"]) == 0:
+        raise ValueError(f"No residues with a complete backbone in {pdb_path}")
+    backbone = residues["coords"]
+    chains = np.array([label.split(":")[0] for label in residues["labels"]])
+    breaks = np.zeros(len(backbone), dtype=bool)
+    breaks[1:] = (chains[1:] != chains[:-1]) | (
+        np.linalg.norm(backbone[1:, 0] - backbone[:-1, 2], axis=-1) > _MAX_PEPTIDE_BOND)
+    return {
+        "labels": residues["labels"],
+        "sequence": residues["sequence"],
+        "backbone": backbone,
+        "proline": np.array([aa == "P" for aa in residues["sequence"]]),
+        "breaks": breaks,
+    }
+
+def _fractions(states: str) -> Dict[str, float]:
+    counts = Counter(states)
+    total = max(1, len(states))
+    fractions = {state: round(counts.get(state, 0) / total, 4) for state in DSSP_STATES.replace(" ", "-")}
+    fractions["-"] = round(counts.get(" ", 0) / total, 4)
+    three = Counter(_THREE_STATE.get(s, "C") for s in states)
+    fractions.update({name: round(three.get(code, 0) / total, 4)
+                      for name, code in (("helix", "H"), ("strand", "E"), ("coil", "C"))})
+    return fractions
+
+def assign_secondary_structure(pdb_path: str) -> Dict:
+    """
+    DSSP-style secondary structure from coordinates (pure NumPy, no external DSSP binary):
+    Kabsch & Sander H-bond energies, then turns, helices (H, G, I), bridges and ladders (B, E),
+    turns (T) and bends (S).
+
+    Args:
+        pdb_path: Structure (all chains of the first model).
+
+    Returns:
+        Dict: sequence, DSSP string ("-" for loop), per-residue (label, state) pairs and the
+        8-state and 3-state (helix/strand/coil) fractions.
+    """
+    chain = _read_chain(pdb_path)
+    states = "".join(_assign(chain["backbone"][None], chain["proline"][None], chain["breaks"][None])[0])
+    return {
+        "sequence": chain["sequence"],
+        "dssp": states.replace(" ", "-"),
+        "residues": [(label, state.replace(" ", "-")) for label, state in zip(chain["labels"], states)],
+        "fractions": _fractions(states),
+    }
+
+def assign_secondary_structure_batch(structures: Union[str, List[str]], output_path: str = None,
+                                     batch_size: int = 64) -> Dict:
+    """
+    Secondary structure for many structures (e.g. a design campaign). Structures with the same
+    residue count are stacked and assigned together, so H-bond energies for a whole batch come
+    from one set of array operations.
+
+    Args:
+        structures: Directory of PDB files, a text file of paths, or a list of paths.
+        output_path: Optional TSV (path, n_residues, dssp, helix, strand, coil, error).
+        batch_size: Structures assigned per stacked batch.
+
+    Returns:
+        Dict: Counts, mean 3-state fractions and per-structure results in input order.
+    """
+    results = []
+    groups = {}
+
+    def flush(length):
+        members = groups.pop(length)
+        states = _assign(np.stack([m[1]["backbone"] for m in members]), np.stack([m[1]["proline"] for m in members]),
+                         np.stack([m[1]["breaks"] for m in members]))
+        for (slot, _), row in zip(members, states):
+            string = "".join(row)
+            results[slot].update({"n_residues": length, "dssp": string.replace(" ", "-"), "fractions": _fractions(string)})
+
+    for path in iter_structures(structures):
+        results.append({"path": path})
+        try:
+            chain = _read_chain(path)
+        except Exception as e:
+            results[-1]["error"] = str(e)
+            continue
+        length = len(chain["labels"])
+        groups.setdefault(length, []).append((len(results) - 1, chain))
+        if len(groups[length]) >= batch_size:
+            flush(length)
+    for length in list(groups):
+        flush(length)
+
+    assigned = [r for r in results if "dssp" in r]
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w") as f:
+            f.write("path\tn_residues\tdssp\thelix\tstrand\tcoil\terror\n")
+            for r in results:
+                if "dssp" in r:
+                    fr = r["fractions"]
+                    f.write(f"{r['path']}\t{r['n_residues']}\t{r['dssp']}\t{fr['helix']}\t{fr['strand']}\t{fr['coil']}\t\n")
+                else:
+                    f.write(f"{r['path']}\t\t\t\t\t\t{r['error']}\n")
+
+    summary = {
+        "n_structures": len(results),
+        "n_failed": len(results) - len(assigned),
+        "mean_fractions": {name: round(float(np.mean([r["fractions"][name] for r in assigned])), 4) if assigned else None
+                           for name in ("helix", "strand", "coil")},
+        "results": results,
+    }
+    if output_path:
+        summary["output_path"] = output_path
+    return summary
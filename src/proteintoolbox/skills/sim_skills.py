@@ -1,38 +1,665 @@
 import os
+import time
+import struct
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache
+from typing import Dict, List, Tuple, Union
+import numpy as np
+from proteintoolbox.geometry import RunningStats, radius_of_gyration, superpose
+from proteintoolbox.resources import get_probe
+from proteintoolbox.structure_io import THREE_TO_ONE, iter_structures
 try:
     import openmm as mm
     from openmm import app, unit
 except ImportError:
     mm = None
 
-def run_minimization(pdb_path: str, output_path: str = "minimized.pdb"):
+__all__ = ["minimize_structure", "run_minimization", "minimize_batch", "run_md"]
+
+DEFAULT_FORCEFIELD = ('amber14-all.xml', 'amber14/tip3pfb.xml')
+
+# Force field files per solvent mode. The water file also carries the ion templates, so
+# structures with bound ions (e.g. Ca2+) can be parameterized in every mode.
+SOLVENT_FORCEFIELDS = {
+    "vacuum": DEFAULT_FORCEFIELD,
+    "cutoff": DEFAULT_FORCEFIELD,
+    "gbn2": DEFAULT_FORCEFIELD + ('implicit/gbn2.xml',),
+    "obc2": DEFAULT_FORCEFIELD + ('implicit/obc2.xml',),
+    "pme": DEFAULT_FORCEFIELD,
+}
+
+# Systems above this many atoms switch from NoCutoff (O(N^2)) to a cutoff
+LARGE_SYSTEM_ATOMS = 5000
+
+@lru_cache(maxsize=8)
+def _get_forcefield(*files: str) -> "app.ForceField":
+    """
+    Parsed OpenMM ForceField for the given XML files, loaded once per process.
+    """
+    if not mm:
+        raise ImportError("OpenMM not installed. Cannot run minimization.")
+    return app.ForceField(*(files or DEFAULT_FORCEFIELD))
+
+def _resolve_solvent(solvent: str, n_atoms: int = 0) -> str:
+    """
+    Validates a solvent mode and resolves "auto" to the cheapest mode for the system size:
+    vacuum without a cutoff up to LARGE_SYSTEM_ATOMS, and the O(N) vacuum cutoff mode above
+    that. Implicit and explicit solvent are opt-in.
+    """
+    if solvent == "auto":
+        solvent = "vacuum" if n_atoms <= LARGE_SYSTEM_ATOMS else "cutoff"
+    if solvent not in SOLVENT_FORCEFIELDS:
+        raise ValueError(f"Unknown solvent mode '{solvent}'. Choose from: auto, {', '.join(SOLVENT_FORCEFIELDS)}")
+    return solvent
+
+def _nonbonded_settings(solvent: str, n_atoms: int) -> Dict:
+    """
+    createSystem keyword arguments for a solvent mode, sized to the system:
+
+    - vacuum: no cutoff (exact, O(N^2); only sensible for small structures)
+    - cutoff: vacuum with a 1 nm non-periodic cutoff (reaction field), O(N)
+    - gbn2/obc2: implicit solvent; no cutoff up to LARGE_SYSTEM_ATOMS, then a 2 nm cutoff
+      (GBn2 is only available as a CustomGBForce, which is slow on the CPU platform)
+    - pme: explicit TIP3P water box with PME electrostatics and a 1 nm cutoff
+    """
+    solvent = _resolve_solvent(solvent, n_atoms)
+    if solvent == "vacuum":
+        return {"nonbondedMethod": app.NoCutoff}
+    if solvent == "cutoff":
+        return {"nonbondedMethod": app.CutoffNonPeriodic, "nonbondedCutoff": 1.0*unit.nanometer}
+    if solvent == "pme":
+        return {"nonbondedMethod": app.PME, "nonbondedCutoff": 1.0*unit.nanometer}
+    if n_atoms <= LARGE_SYSTEM_ATOMS:
+        return {"nonbondedMethod": app.NoCutoff}
+    return {"nonbondedMethod": app.CutoffNonPeriodic, "nonbondedCutoff": 2.0*unit.nanometer}
+
+def _use_native_obc2(system) -> None:
+    """
+    Swaps the CustomGBForce generated from implicit/obc2.xml for the equivalent built-in
+    GBSAOBCForce (same OBC2 functional form and surface term), which is several times
+    faster on every platform.
+    """
+    for index, force in enumerate(system.getForces()):
+        if isinstance(force, mm.CustomGBForce):
+            break
+    else:
+        return
+    nonbonded = next(f for f in system.getForces() if isinstance(f, mm.NonbondedForce))
+    obc = mm.GBSAOBCForce()
+    for i in range(force.getNumParticles()):
+        charge, offset_radius, scaled_radius = force.getParticleParameters(i)
+        # The XML stores radius - 0.009 nm and scale * (radius - 0.009 nm)
+        obc.addParticle(charge, offset_radius + 0.009, scaled_radius / offset_radius)
+    if nonbonded.getNonbondedMethod() == mm.NonbondedForce.CutoffNonPeriodic:
+        obc.setNonbondedMethod(mm.GBSAOBCForce.CutoffNonPeriodic)
+        obc.setCutoffDistance(nonbonded.getCutoffDistance())
+    else:
+        obc.setNonbondedMethod(mm.GBSAOBCForce.NoCutoff)
+    obc.setForceGroup(force.getForceGroup())
+    system.removeForce(index)
+    system.addForce(obc)
+
+def _topology_key(topology) -> str:
+    """
+    Hash of chains, residues, atom names and bonds. Two structures with the same key can
+    share one OpenMM System; only their coordinates differ.
+    """
+    h = hashlib.sha1()
+    for chain in topology.chains():
+        h.update(b"|")
+        for residue in chain.residues():
+            h.update(f"{residue.name}:{','.join(a.name for a in residue.atoms())};".encode())
+    for a, b in topology.bonds():
+        h.update(f"{a.index}-{b.index},".encode())
+    return h.hexdigest()
+
+if mm:
+    class _DeadlineReporter(mm.MinimizationReporter):
+        """Stops the L-BFGS minimizer once a wall-clock deadline has passed."""
+        def __init__(self, deadline: float):
+            super().__init__()
+            self.deadline = deadline
+            self.expired = False
+
+        def report(self, iteration, x, grad, args):
+            self.expired = time.perf_counter() > self.deadline
+            return self.expired
+
+class MinimizationEngine:
+    """
+    Reusable energy minimizer.
+
+    Force fields come from the process-wide `_get_forcefield` cache. The System and Simulation
+    built for a hydrogenated topology are kept (LRU, `max_templates`) under its
+    `_topology_key`, so minimizing another structure with an identical topology (e.g. a
+    re-packed design on the same backbone) only uploads new positions.
+
+    `solvent` selects the environment ("auto", "gbn2", "obc2", "cutoff", "vacuum" or
+    "pme"; see `_resolve_solvent` and `_nonbonded_settings`). `platform` pins the OpenMM
+    platform (None lets OpenMM choose) and `threads` caps the CPU platform's thread count,
+    so several engines can share a machine without oversubscribing it.
+    """
+
+    def __init__(self, forcefield_files: Tuple[str, ...] = None, max_templates: int = 8,
+                 platform: str = None, threads: int = None, solvent: str = "auto",
+                 solvent_padding: float = 1.0):
+        if not mm:
+            raise ImportError("OpenMM not installed. Cannot run minimization.")
+        _resolve_solvent(solvent)
+        self.solvent = solvent
+        self.solvent_padding = solvent_padding
+        self.forcefield_files = tuple(forcefield_files) if forcefield_files else None
+        self.max_templates = max_templates
+        self.platform = mm.Platform.getPlatformByName(platform) if platform else None
+        self.properties = {}
+        if threads and platform == "CPU":
+            self.properties["Threads"] = str(threads)
+        self._templates = OrderedDict()
+
+    def forcefield_for(self, solvent: str) -> "app.ForceField":
+        return _get_forcefield(*(self.forcefield_files or SOLVENT_FORCEFIELDS[solvent]))
+
+    def protein_forcefield(self) -> "app.ForceField":
+        """Force field for adding hydrogens, without implicit-solvent XMLs (they slow addHydrogens down)."""
+        files = self.forcefield_files or SOLVENT_FORCEFIELDS["vacuum"]
+        return _get_forcefield(*(f for f in files if not f.startswith("implicit/")))
+
+    def create_system(self, topology, solvent: str) -> "mm.System":
+        """OpenMM System for a prepared topology in the given (resolved) solvent mode."""
+        settings = _nonbonded_settings(solvent, topology.getNumAtoms())
+        system = self.forcefield_for(solvent).createSystem(topology, constraints=app.HBonds, **settings)
+        if solvent == "obc2":
+            _use_native_obc2(system)
+        return system
+
+    def new_simulation(self, topology, system, integrator) -> "app.Simulation":
+        """Simulation on this engine's platform and thread settings."""
+        if self.platform is None:
+            return app.Simulation(topology, system, integrator)
+        return app.Simulation(topology, system, integrator, self.platform, self.properties)
+
+    def _create_simulation(self, topology, solvent: str) -> "app.Simulation":
+        system = self.create_system(topology, solvent)
+        integrator = mm.LangevinMiddleIntegrator(300*unit.kelvin, 1/unit.picosecond, 0.004*unit.picoseconds)
+        return self.new_simulation(topology, system, integrator)
+
+    def prepare(self, pdb_path: str) -> Tuple["app.Modeller", "app.Topology", str]:
+        """
+        Loads a PDB, adds hydrogens and (in "pme" mode) a water box.
+
+        Returns:
+            (modeller, solute_topology, resolved_solvent). Solute atoms come first.
+        """
+        pdb = app.PDBFile(pdb_path)
+        modeller = app.Modeller(pdb.topology, pdb.positions)
+        modeller.addHydrogens(self.protein_forcefield())
+        solute = modeller.topology
+        solvent = _resolve_solvent(self.solvent, solute.getNumAtoms())
+        if solvent == "pme":
+            modeller.addSolvent(self.forcefield_for(solvent), padding=self.solvent_padding*unit.nanometer)
+        return modeller, solute, solvent
+
+    def get_simulation(self, topology, solvent: str = None) -> Tuple["app.Simulation", bool]:
+        """Returns (simulation, reused) for a hydrogenated (or solvated) topology."""
+        solvent = solvent or _resolve_solvent(self.solvent, topology.getNumAtoms())
+        key = f"{solvent}:{_topology_key(topology)}"
+        if key in self._templates:
+            self._templates.move_to_end(key)
+            return self._templates[key], True
+
+        simulation = self._create_simulation(topology, solvent)
+        self._templates[key] = simulation
+        while len(self._templates) > self.max_templates:
+            self._templates.popitem(last=False)
+        return simulation, False
+
+    def minimize(self, pdb_path: str, output_path: str = "minimized.pdb", timeout_s: float = None,
+                 tolerance: float = 10.0, max_iterations: int = 0) -> Dict:
+        """
+        Adds hydrogens (and a water box in "pme" mode), minimizes and writes one structure.
+        Only the solute is written.
+
+        `tolerance` is the RMS force convergence criterion in kJ/mol/nm and `max_iterations`
+        caps L-BFGS iterations (0 = until converged). If `timeout_s` elapses (counted from
+        the start of the call) the minimizer is stopped early, the partially minimized
+        structure is still written and `timed_out` is set.
+
+        Returns:
+            Dict: Output path, initial/final potential energy (kJ/mol), whether a cached
+            system was reused, whether it timed out and per-phase timings in seconds.
+        """
+        timings = {}
+        start = time.perf_counter()
+        reporter = _DeadlineReporter(start + timeout_s) if timeout_s else None
+        pdb = app.PDBFile(pdb_path)
+        timings["load"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        modeller = app.Modeller(pdb.topology, pdb.positions)
+        modeller.addHydrogens(self.protein_forcefield())
+        solute = modeller.topology
+        n_solute = solute.getNumAtoms()
+        solvent = _resolve_solvent(self.solvent, n_solute)
+        timings["hydrogens"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if solvent == "pme":
+            modeller.addSolvent(self.forcefield_for(solvent), padding=self.solvent_padding*unit.nanometer)
+        simulation, reused = self.get_simulation(modeller.topology, solvent)
+        if solvent == "pme":
+            simulation.context.setPeriodicBoxVectors(*modeller.topology.getPeriodicBoxVectors())
+        simulation.context.setPositions(modeller.positions)
+        timings["create_system"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        initial = simulation.context.getState(getEnergy=True).getPotentialEnergy()
+        simulation.minimizeEnergy(tolerance=tolerance*unit.kilojoule_per_mole/unit.nanometer,
+                                  maxIterations=max_iterations, reporter=reporter)
+        state = simulation.context.getState(getPositions=True, getEnergy=True)
+        timings["minimize"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(output_path, 'w') as f:
+            app.PDBFile.writeFile(solute, state.getPositions()[:n_solute], f)
+        timings["write"] = time.perf_counter() - start
+
+        return {
+            "output_path": output_path,
+            "n_atoms": simulation.topology.getNumAtoms(),
+            "solvent": solvent,
+            "initial_energy": round(initial.value_in_unit(unit.kilojoule_per_mole), 2),
+            "final_energy": round(state.getPotentialEnergy().value_in_unit(unit.kilojoule_per_mole), 2),
+            "reused_system": reused,
+            "timed_out": bool(reporter and reporter.expired),
+            "timings": {phase: round(t, 4) for phase, t in timings.items()},
+        }
+
+# Shared engines behind the skill functions, one per solvent mode (created on first use)
+_engines = {}
+
+def _get_engine(solvent: str = "auto") -> MinimizationEngine:
+    if solvent not in _engines:
+        _engines[solvent] = MinimizationEngine(solvent=solvent)
+    return _engines[solvent]
+
+def minimize_structure(pdb_path: str, output_path: str = "minimized.pdb", solvent: str = "auto",
+                       tolerance: float = 10.0, max_iterations: int = 0) -> Dict:
+    """
+    Energy-minimizes a PDB structure with OpenMM and reports per-phase timings.
+
+    Force fields stay loaded between calls and systems are reused for identical topologies,
+    so minimizing many designs only pays the setup cost once per topology.
+
+    Args:
+        pdb_path (str): Path to input PDB.
+        output_path (str): Path to save minimized structure.
+        solvent (str): "auto" (vacuum, or cutoff for large systems), "gbn2", "obc2", "cutoff", "vacuum" or "pme".
+        tolerance (float): RMS force convergence criterion (kJ/mol/nm).
+        max_iterations (int): L-BFGS iteration cap (0 = until converged).
+
+    Returns:
+        Dict: Output path, energies before/after, system reuse flag and timings
+        (load, hydrogens, create_system, minimize, write).
+    """
+    return _get_engine(solvent).minimize(pdb_path, output_path, tolerance=tolerance, max_iterations=max_iterations)
+
+def run_minimization(pdb_path: str, output_path: str = "minimized.pdb", solvent: str = "auto"):
     """
     Runs a simple energy minimization on a PDB structure using OpenMM.
 
     Args:
         pdb_path (str): Path to input PDB.
         output_path (str): Path to save minimized structure.
+        solvent (str): Solvent/nonbonded mode (default "auto": chosen by system size).
     """
     if not mm:
         raise ImportError("OpenMM not installed. Cannot run minimization.")
 
-    pdb = app.PDBFile(pdb_path)
-    forcefield = app.ForceField('amber14-all.xml', 'amber14/tip3pfb.xml')
-    
-    # Add Hydrogens
-    modeller = app.Modeller(pdb.topology, pdb.positions)
-    modeller.addHydrogens(forcefield)
-    
-    # Create system (implicit solvent for speed in this demo skill)
-    system = forcefield.createSystem(modeller.topology, nonbondedMethod=app.NoCutoff, constraints=app.HBonds)
-    integrator = mm.LangevinMiddleIntegrator(300*unit.kelvin, 1/unit.picosecond, 0.004*unit.picoseconds)
-    simulation = app.Simulation(modeller.topology, system, integrator)
-    simulation.context.setPositions(modeller.positions)
-    
     print("Minimizing energy...")
-    simulation.minimizeEnergy()
-    
-    with open(output_path, 'w') as f:
-        app.PDBFile.writeFile(simulation.topology, simulation.context.getState(getPositions=True).getPositions(), f)
-    
-    return f"Minimization complete. Saved to {output_path}"
+    report = minimize_structure(pdb_path, output_path, solvent=solvent)
+    total = sum(report["timings"].values())
+    return f"Minimization complete. Saved to {output_path} ({total:.2f} s)"
+
+# Per-process engine holding the worker's cached systems/contexts (set by _init_minimize_worker)
+_worker_engine = None
+
+def _init_minimize_worker(platform: str, threads: int, solvent: str):
+    global _worker_engine
+    _worker_engine = MinimizationEngine(platform=platform, threads=threads, solvent=solvent)
+
+def _minimize_in_worker(pdb_path: str, output_path: str, timeout_s: float, tolerance: float,
+                        max_iterations: int) -> Tuple[str, Dict, str]:
+    """Minimizes one structure with the worker's engine. Returns (pdb_path, report, error)."""
+    try:
+        report = _worker_engine.minimize(pdb_path, output_path, timeout_s=timeout_s, tolerance=tolerance,
+                                         max_iterations=max_iterations)
+        return pdb_path, report, ""
+    except Exception as e:
+        return pdb_path, {}, str(e).replace("\t", " ").replace("\n", " ")
+
+def minimize_batch(structures: Union[str, List[str]], output_dir: str = "output/minimized",
+                   n_workers: int = None, threads_per_worker: int = None, platform: str = "CPU",
+                   timeout_s: float = 600, project_name: str = None, solvent: str = "auto",
+                   tolerance: float = 10.0, max_iterations: int = 0) -> Dict:
+    """
+    Minimizes many structures in parallel with OpenMM.
+
+    Each worker process keeps its own MinimizationEngine, so force fields and contexts persist
+    across the structures it handles. Cores are split between workers (CPU platform threads
+    per worker), so the pool never oversubscribes the machine. Minimized PDBs and a row in
+    `minimization.tsv` are written as each structure finishes. Outputs are named
+    `<name>_min.pdb`; an input whose name was already used by a file from another directory
+    gets `<name>_<path hash>_min.pdb` instead.
+
+    Args:
+        structures: Directory of PDB files, a text file of paths, or a list of paths.
+        output_dir: Directory for minimized structures and the summary table.
+        n_workers: Worker processes (defaults to usable cores / threads_per_worker).
+        threads_per_worker: OpenMM CPU threads per worker (defaults to an even split of the cores).
+        platform: OpenMM platform name ("CPU", "CUDA", "OpenCL", "Reference").
+        timeout_s: Per-structure wall-clock limit; the minimizer stops early once it passes.
+        project_name: Write into `<project>/minimized` instead of output_dir.
+        solvent: "auto" (vacuum, or cutoff for large systems), "gbn2", "obc2", "cutoff", "vacuum" or "pme".
+        tolerance: RMS force convergence criterion (kJ/mol/nm).
+        max_iterations: L-BFGS iteration cap per structure (0 = until converged).
+
+    Returns:
+        Dict: Counts of minimized/timed-out/failed structures, worker layout and output paths.
+    """
+    if not mm:
+        raise ImportError("OpenMM not installed. Cannot run minimization.")
+    if project_name:
+        from proteintoolbox.project import Project
+        output_dir = os.path.join(Project(project_name).path, "minimized")
+    os.makedirs(output_dir, exist_ok=True)
+
+    probe = get_probe()
+    if n_workers is None:
+        n_workers = probe.recommend_workers(threads_per_worker=threads_per_worker or 1)
+    threads_per_worker = threads_per_worker or probe.threads_per_worker(n_workers)
+    max_pending = n_workers * 4
+    counts = {"minimized": 0, "timed_out": 0, "failed": 0}
+    start = time.perf_counter()
+
+    summary_path = os.path.join(output_dir, "minimization.tsv")
+    new_file = not os.path.exists(summary_path)
+    with open(summary_path, "a") as summary, \
+            ProcessPoolExecutor(max_workers=n_workers, initializer=_init_minimize_worker,
+                                initargs=(platform, threads_per_worker, solvent)) as pool:
+        if new_file:
+            summary.write("input\tstatus\tinitial_energy\tfinal_energy\tseconds\toutput_path\terror\n")
+
+        def record(future):
+            pdb_path, report, error = future.result()
+            if error:
+                counts["failed"] += 1
+                summary.write(f"{pdb_path}\tfailed\t\t\t\t\t{error}\n")
+            else:
+                status = "timed_out" if report["timed_out"] else "minimized"
+                counts[status] += 1
+                summary.write(f"{pdb_path}\t{status}\t{report['initial_energy']}\t{report['final_energy']}\t"
+                              f"{sum(report['timings'].values()):.2f}\t{report['output_path']}\t\n")
+            summary.flush()
+
+        pending = set()
+        owners = {}
+        for pdb_path in iter_structures(structures):
+            # Same-named inputs from different directories get a path hash instead of overwriting each other
+            name, source = os.path.splitext(os.path.basename(pdb_path))[0], os.path.abspath(pdb_path)
+            if owners.setdefault(name, source) != source:
+                name = f"{name}_{hashlib.sha1(source.encode()).hexdigest()[:8]}"
+            output_path = os.path.join(output_dir, name + "_min.pdb")
+            pending.add(pool.submit(_minimize_in_worker, pdb_path, output_path, timeout_s, tolerance, max_iterations))
+            if len(pending) >= max_pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record(future)
+
+        for future in wait(pending).done:
+            record(future)
+
+    return {
+        **counts,
+        "n_workers": n_workers,
+        "threads_per_worker": threads_per_worker,
+        "elapsed_s": round(time.perf_counter() - start, 2),
+        "summary_path": summary_path,
+        "output_dir": output_dir,
+    }
+
+class _TrajectoryAnalyzer:
+    """
+    On-the-fly analysis of MD frames in constant memory: CA RMSD to the reference after Kabsch
+    superposition, mass-weighted radius of gyration of the solute, and a running per-atom
+    variance of the superposed CA coordinates for RMSF. Nothing is stored per frame.
+    """
+
+    def __init__(self, reference: np.ndarray, ca_indices: np.ndarray, masses: np.ndarray,
+                 stats: RunningStats = None):
+        self.reference = reference
+        self.ca_indices = ca_indices
+        self.masses = masses
+        self.stats = stats or RunningStats(reference.shape)
+
+    def update(self, solute_positions: np.ndarray) -> Tuple[float, float]:
+        """Adds one frame (solute coordinates in Angstroms). Returns (rmsd, rg)."""
+        fitted, rmsd = superpose(solute_positions[self.ca_indices], self.reference)
+        self.stats.update(fitted)
+        return rmsd, radius_of_gyration(solute_positions, self.masses)
+
+    def rmsf(self) -> np.ndarray:
+        return np.sqrt(self.stats.variance.sum(axis=1))
+
+def _write_atomic(path: str, write) -> None:
+    """Writes via `write(file)` to a temporary file, then renames it over `path`."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+def _open_trajectory(path: str, trajectory_format: str, topology, dt, first_step: int, interval: int,
+                     frames: int):
+    """
+    Opens a DCD or XTC writer, appending after `frames` existing frames. Returns (writer, file or None).
+    """
+    if trajectory_format == "xtc":
+        if frames == 0:
+            open(path, "wb").close()
+        return app.XTCFile(path, topology, dt, first_step, interval, append=frames > 0), None
+    if frames == 0:
+        handle = open(path, "wb")
+        return app.DCDFile(handle, topology, dt, first_step, interval), handle
+    handle = open(path, "r+b")
+    # Frame count in the header, so DCDFile resumes numbering after the kept frames
+    handle.seek(8)
+    handle.write(struct.pack("<i", frames))
+    return app.DCDFile(handle, topology, dt, first_step, interval, append=True), handle
+
+def run_md(pdb_path: str, output_dir: str = "output/md", production_ps: float = 100.0,
+           equilibration_ps: float = 10.0, temperature: float = 300.0, timestep_fs: float = 2.0,
+           report_interval_ps: float = 1.0, checkpoint_interval_ps: float = 10.0,
+           trajectory_format: str = "xtc", solvent: str = "auto", platform: str = None,
+           threads: int = None, seed: int = 0, resume: bool = True) -> Dict:
+    """
+    Runs a short MD simulation (minimization, equilibration, production) to check design stability.
+
+    Production frames (solute only) are streamed to a compressed XTC or a DCD trajectory, and
+    CA RMSD, radius of gyration and per-residue RMSF are computed as frames are produced, so
+    memory stays constant however long the run is. `analysis.tsv` gets one row per frame and
+    `rmsf.tsv` is written at the end.
+
+    At the first frame at or after every `checkpoint_interval_ps` the integrator state, analysis
+    accumulators and output file sizes are saved together in `checkpoint.npz`. Re-running with
+    the same output_dir resumes from the last checkpoint: trajectory and analysis rows written
+    after it are discarded, so a crashed run continues without duplicate frames. Raising
+    `production_ps` extends a finished run; a checkpoint written with a different `timestep_fs`
+    or `report_interval_ps` is refused.
+
+    Args:
+        pdb_path: Input structure (hydrogens are added).
+        output_dir: Directory for topology.pdb, the trajectory, analysis tables and checkpoint.
+        production_ps: Production length in picoseconds.
+        equilibration_ps: Equilibration length in picoseconds (no frames written).
+        temperature: Langevin thermostat temperature in Kelvin.
+        timestep_fs: Integration timestep in femtoseconds (bonds to hydrogen are constrained).
+        report_interval_ps: Interval between trajectory frames / analysis rows.
+        checkpoint_interval_ps: Interval between checkpoints.
+        trajectory_format: "xtc" or "dcd".
+        solvent: "auto" (vacuum, or cutoff for large systems), "gbn2", "obc2", "cutoff", "vacuum"
+            or "pme" (explicit water at 1 bar).
+        platform: OpenMM platform name (None lets OpenMM choose).
+        threads: CPU platform thread count.
+        seed: Seed for initial velocities and the thermostat.
+        resume: Continue from an existing checkpoint in output_dir.
+
+    Returns:
+        Dict: Frames, steps, performance (ns/day), RMSD/Rg summary and output paths.
+    """
+    if not mm:
+        raise ImportError("OpenMM not installed. Cannot run MD.")
+    if trajectory_format not in ("xtc", "dcd"):
+        raise ValueError("trajectory_format must be 'xtc' or 'dcd'")
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        "topology": os.path.join(output_dir, "topology.pdb"),
+        "trajectory": os.path.join(output_dir, f"trajectory.{trajectory_format}"),
+        "analysis": os.path.join(output_dir, "analysis.tsv"),
+        "rmsf": os.path.join(output_dir, "rmsf.tsv"),
+        "checkpoint": os.path.join(output_dir, "checkpoint.npz"),
+    }
+
+    dt_ps = timestep_fs / 1000.0
+    eq_steps = int(round(equilibration_ps / dt_ps))
+    total_steps = eq_steps + int(round(production_ps / dt_ps))
+    report_steps = max(1, int(round(report_interval_ps / dt_ps)))
+    checkpoint_steps = max(report_steps, int(round(checkpoint_interval_ps / dt_ps)))
+
+    engine = MinimizationEngine(platform=platform, threads=threads, solvent=solvent)
+    modeller, solute, solvent = engine.prepare(pdb_path)
+    n_solute = solute.getNumAtoms()
+    system = engine.create_system(modeller.topology, solvent)
+    if solvent == "pme":
+        system.addForce(mm.MonteCarloBarostat(1*unit.bar, temperature*unit.kelvin))
+    integrator = mm.LangevinMiddleIntegrator(temperature*unit.kelvin, 1/unit.picosecond, dt_ps*unit.picoseconds)
+    integrator.setRandomNumberSeed(seed)
+    simulation = engine.new_simulation(modeller.topology, system, integrator)
+
+    atoms = list(solute.atoms())
+    # Amino-acid CA atoms only: calcium ions are also named CA (residue CA)
+    ca_indices = np.array([a.index for a in atoms if a.name == "CA" and a.residue.name in THREE_TO_ONE])
+    masses = np.array([system.getParticleMass(i).value_in_unit(unit.dalton) for i in range(n_solute)])
+
+    resumed = resume and os.path.exists(paths["checkpoint"])
+    if resumed:
+        saved = np.load(paths["checkpoint"])
+        if str(saved["topology_key"]) != _topology_key(modeller.topology):
+            raise ValueError(f"Checkpoint in {output_dir} was written for a different system")
+        # Frame times and step counts in the outputs depend on these, so they cannot change mid-run
+        for name, value in (("timestep_fs", timestep_fs), ("report_interval_ps", report_interval_ps)):
+            if not np.isclose(float(saved[name]), value):
+                raise ValueError(f"Checkpoint in {output_dir} was written with {name}={float(saved[name])}, "
+                                 f"not {value}; use the original value or resume=False")
+        simulation.context.loadCheckpoint(saved["context"].tobytes())
+        frames = int(saved["frames"])
+        totals = {"rmsd": float(saved["sum_rmsd"]), "rg": float(saved["sum_rg"]), "last_rmsd": float(saved["last_rmsd"])}
+        analyzer = _TrajectoryAnalyzer(saved["reference"], ca_indices, masses,
+                                       RunningStats.from_state({k: saved[f"stats_{k}"] for k in ("count", "mean", "m2")}))
+        # Roll the outputs back to the checkpoint, dropping anything written after it
+        for name in ("trajectory", "analysis"):
+            with open(paths[name], "r+b") as f:
+                f.truncate(int(saved[f"{name}_bytes"]))
+    else:
+        for name in ("trajectory", "analysis", "rmsf", "checkpoint"):
+            if os.path.exists(paths[name]):
+                os.remove(paths[name])
+        if solvent == "pme":
+            simulation.context.setPeriodicBoxVectors(*modeller.topology.getPeriodicBoxVectors())
+        simulation.context.setPositions(modeller.positions)
+        simulation.minimizeEnergy()
+        positions = simulation.context.getState(getPositions=True).getPositions(asNumpy=True)
+        with open(paths["topology"], "w") as f:
+            app.PDBFile.writeFile(solute, positions[:n_solute], f)
+        simulation.context.setVelocitiesToTemperature(temperature*unit.kelvin, seed)
+        reference = positions[:n_solute].value_in_unit(unit.angstrom)[ca_indices]
+        analyzer = _TrajectoryAnalyzer(reference, ca_indices, masses)
+        frames = 0
+        totals = {"rmsd": 0.0, "rg": 0.0, "last_rmsd": float("nan")}
+        with open(paths["analysis"], "w") as f:
+            f.write("step\ttime_ps\trmsd\trg\tpotential_energy\n")
+
+    trajectory, handle = _open_trajectory(paths["trajectory"], trajectory_format, solute, dt_ps*unit.picoseconds,
+                                          eq_steps + report_steps, report_steps, frames)
+    analysis = open(paths["analysis"], "a")
+
+    def checkpoint():
+        if handle:
+            handle.flush()
+        analysis.flush()
+        state = analyzer.stats.state()
+        _write_atomic(paths["checkpoint"], lambda f: np.savez(
+            f, context=np.frombuffer(simulation.context.createCheckpoint(), dtype=np.uint8),
+            topology_key=_topology_key(modeller.topology), timestep_fs=timestep_fs,
+            report_interval_ps=report_interval_ps, reference=analyzer.reference, frames=frames,
+            trajectory_bytes=os.path.getsize(paths["trajectory"]), analysis_bytes=analysis.tell(),
+            sum_rmsd=totals["rmsd"], sum_rg=totals["rg"], last_rmsd=totals["last_rmsd"],
+            **{f"stats_{k}": v for k, v in state.items()}))
+
+    start_step = simulation.currentStep
+    start = time.perf_counter()
+    try:
+        # Equilibration: no frames, checkpointed in chunks
+        while simulation.currentStep < eq_steps:
+            simulation.step(min(checkpoint_steps, eq_steps - simulation.currentStep))
+            checkpoint()
+
+        # Production: one frame per report interval, streamed straight to disk. Checkpoints
+        # land on the first report step at or after each checkpoint interval.
+        def next_checkpoint(step):
+            return eq_steps + ((step - eq_steps) // checkpoint_steps + 1) * checkpoint_steps
+
+        checkpoint_at = next_checkpoint(simulation.currentStep)
+        while simulation.currentStep < total_steps:
+            simulation.step(min(report_steps, total_steps - simulation.currentStep))
+            state = simulation.context.getState(getPositions=True, getEnergy=True)
+            positions = state.getPositions(asNumpy=True)[:n_solute]
+            trajectory.writeModel(positions)
+            rmsd, rg = analyzer.update(positions.value_in_unit(unit.angstrom))
+            frames += 1
+            totals["rmsd"] += rmsd
+            totals["rg"] += rg
+            totals["last_rmsd"] = rmsd
+            step = simulation.currentStep
+            energy = state.getPotentialEnergy().value_in_unit(unit.kilojoule_per_mole)
+            analysis.write(f"{step}\t{step * dt_ps:.3f}\t{rmsd:.4f}\t{rg:.4f}\t{energy:.2f}\n")
+            if step >= checkpoint_at or step == total_steps:
+                checkpoint()
+                checkpoint_at = next_checkpoint(step)
+    finally:
+        analysis.close()
+        if handle:
+            handle.close()
+    elapsed = time.perf_counter() - start
+
+    ca_atoms = [atoms[i] for i in ca_indices]
+    with open(paths["rmsf"], "w") as f:
+        f.write("chain\tresidue\tresidue_name\trmsf\n")
+        for atom, value in zip(ca_atoms, analyzer.rmsf()):
+            f.write(f"{atom.residue.chain.id}\t{atom.residue.id}\t{atom.residue.name}\t{value:.4f}\n")
+
+    steps_run = simulation.currentStep - start_step
+    return {
+        "output_dir": output_dir,
+        "solvent": solvent,
+        "resumed": resumed,
+        "frames": frames,
+        "steps": simulation.currentStep,
+        "simulated_ps": round(max(0, simulation.currentStep - eq_steps) * dt_ps, 3),
+        "ns_per_day": round(steps_run * dt_ps / 1000 / (elapsed / 86400), 2) if steps_run and elapsed > 0 else None,
+        "mean_rmsd": round(totals["rmsd"] / frames, 3) if frames else None,
+        "final_rmsd": round(totals["last_rmsd"], 3) if frames else None,
+        "mean_rg": round(totals["rg"] / frames, 3) if frames else None,
+        "max_rmsf": round(float(analyzer.rmsf().max()), 3) if frames else None,
+        **{f"{name}_path": path for name, path in paths.items() if name != "checkpoint"},
+    }
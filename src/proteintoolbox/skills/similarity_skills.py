@@ -0,0 +1,391 @@
+import os
+import json
+import struct
+import tempfile
+import zipfile
+import numpy as np
+from typing import Dict, List, Optional
+
+__all__ = ["build_embedding_index", "search_similar_proteins"]
+
+class EmbeddingIndex:
+    """
+    Cosine-similarity index over protein embeddings.
+
+    Exact search streams the database through blocked matrix multiplies and keeps a
+    running top-k. After `train_ivfpq`, an approximate inverted-file + product-quantization
+    (IVF-PQ) mode only scores vectors in the `n_probe` closest coarse lists using
+    per-query lookup tables, which keeps latency low for millions of vectors.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.ids: List[str] = []
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._pending: List[np.ndarray] = []
+        # IVF-PQ state (populated by train_ivfpq)
+        self.centroids: Optional[np.ndarray] = None   # (n_lists, dim)
+        self.codebooks: Optional[np.ndarray] = None   # (n_subvectors, 256, dim // n_subvectors)
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.codes = np.zeros((0, 0), dtype=np.uint8)
+        self._inverted_lists: Optional[List[np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """All stored (unit-normalized) vectors."""
+        if self._pending:
+            self._vectors = np.concatenate([self._vectors] + self._pending)
+            self._pending = []
+        return self._vectors
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def add(self, vectors, ids: List[str]):
+        """
+        Adds embeddings to the index. Vectors are normalized, so scores are cosine similarities.
+        If the index is already trained, the new vectors are also encoded for approximate search.
+        """
+        vectors = self._normalize(vectors)
+        if vectors.shape != (len(ids), self.dim):
+            raise ValueError(f"Expected {len(ids)} vectors of size {self.dim}, got {vectors.shape}.")
+
+        self._pending.append(vectors)
+        self.ids.extend(ids)
+
+        if self.is_trained:
+            assignments, codes = self._encode(vectors)
+            self.assignments = np.concatenate([self.assignments, assignments])
+            self.codes = np.concatenate([self.codes, codes])
+            self._inverted_lists = None
+
+    @staticmethod
+    def _merge_top_k(scores, indices, block_scores, offset, k):
+        """Merges a block of scores into the running (scores, indices) top-k."""
+        kb = min(k, block_scores.shape[1])
+        top = np.argpartition(-block_scores, kb - 1, axis=1)[:, :kb]
+        cand_scores = np.concatenate([scores, np.take_along_axis(block_scores, top, axis=1)], axis=1)
+        cand_indices = np.concatenate([indices, top + offset], axis=1)
+        keep = np.argsort(-cand_scores, axis=1)[:, :k]
+        return np.take_along_axis(cand_scores, keep, axis=1), np.take_along_axis(cand_indices, keep, axis=1)
+
+    def search(self, queries, k: int = 10, approximate: bool = False, n_probe: int = 8, rerank: int = 4,
+               block_size: int = 65536):
+        """
+        Finds the k most similar stored embeddings for each query.
+
+        Args:
+            queries: Array of shape (n_queries, dim) or a single vector.
+            k (int): Number of neighbours.
+            approximate (bool): Use the IVF-PQ index (requires `train_ivfpq`).
+            n_probe (int): Coarse lists scanned per query in approximate mode.
+            rerank (int): In approximate mode, re-score the best `rerank * k` PQ candidates
+                          exactly (0 returns the raw PQ estimates).
+            block_size (int): Database rows per matrix multiply in exact mode.
+
+        Returns:
+            tuple: (scores, indices) arrays of shape (n_queries, k), best first. Missing entries are -1.
+        """
+        queries = self._normalize(queries)
+        k = min(k, len(self))
+        if k == 0:
+            empty = np.zeros((len(queries), 0))
+            return empty.astype(np.float32), empty.astype(np.int64)
+
+        if approximate:
+            if not self.is_trained:
+                raise ValueError("Approximate search requires train_ivfpq() first.")
+            return self._search_ivfpq(queries, k, n_probe, rerank)
+
+        vectors = self.vectors
+        scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        indices = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(vectors), block_size):
+            block_scores = queries @ vectors[start:start + block_size].T
+            scores, indices = self._merge_top_k(scores, indices, block_scores, start, k)
+        return scores, indices
+
+    # --- Approximate (IVF-PQ) mode ---
+
+    @staticmethod
+    def _squared_distances(x: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        return (x * x).sum(1)[:, None] - 2 * x @ centers.T + (centers * centers).sum(1)[None, :]
+
+    @classmethod
+    def _kmeans(cls, x: np.ndarray, n_clusters: int, n_iter: int, rng) -> np.ndarray:
+        centers = x[rng.choice(len(x), n_clusters, replace=len(x) < n_clusters)].copy()
+        for _ in range(n_iter):
+            labels = cls._squared_distances(x, centers).argmin(1)
+            counts = np.bincount(labels, minlength=n_clusters)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, labels, x)
+            nonempty = counts > 0
+            centers[nonempty] = sums[nonempty] / counts[nonempty, None]
+            # Re-seed empty clusters from random points
+            if not nonempty.all():
+                centers[~nonempty] = x[rng.choice(len(x), (~nonempty).sum())]
+        return centers
+
+    def _encode(self, vectors: np.ndarray, chunk_size: int = 65536):
+        """Assigns vectors to coarse lists and PQ-encodes their residuals, chunk by chunk."""
+        n_sub, _, sub_dim = self.codebooks.shape
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        codes = np.empty((len(vectors), n_sub), dtype=np.uint8)
+
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            labels = self._squared_distances(chunk, self.centroids).argmin(1)
+            residuals = chunk - self.centroids[labels]
+            assignments[start:start + chunk_size] = labels
+            for m in range(n_sub):
+                sub = residuals[:, m * sub_dim:(m + 1) * sub_dim]
+                codes[start:start + chunk_size, m] = self._squared_distances(sub, self.codebooks[m]).argmin(1)
+        return assignments, codes
+
+    def train_ivfpq(self, n_lists: int = 1024, n_subvectors: int = 16, n_iter: int = 20,
+                    max_training_points: int = 100_000, seed: int = 0):
+        """
+        Trains the coarse quantizer and product-quantization codebooks on the stored vectors
+        and encodes them for approximate search.
+
+        Args:
+            n_lists (int): Number of inverted lists (coarse k-means clusters).
+            n_subvectors (int): PQ sub-spaces; must divide the embedding dimension.
+            n_iter (int): k-means iterations.
+            max_training_points (int): Random sample size used for training.
+        """
+        if self.dim % n_subvectors:
+            raise ValueError(f"n_subvectors ({n_subvectors}) must divide the dimension ({self.dim}).")
+
+        vectors = self.vectors
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), max_training_points), replace=False)]
+
+        self.centroids = self._kmeans(sample, min(n_lists, len(sample)), n_iter, rng)
+        residuals = sample - self.centroids[self._squared_distances(sample, self.centroids).argmin(1)]
+
+        sub_dim = self.dim // n_subvectors
+        self.codebooks = np.stack([
+            self._kmeans(residuals[:, m * sub_dim:(m + 1) * sub_dim], 256, n_iter, rng)
+            for m in range(n_subvectors)
+        ])
+        self.assignments, self.codes = self._encode(vectors)
+        self._inverted_lists = None
+
+    def _get_inverted_lists(self) -> List[np.ndarray]:
+        if self._inverted_lists is None:
+            order = np.argsort(self.assignments, kind="stable")
+            bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._inverted_lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        return self._inverted_lists
+
+    def _search_ivfpq(self, queries: np.ndarray, k: int, n_probe: int, rerank: int):
+        inverted_lists = self._get_inverted_lists()
+        vectors = self.vectors if rerank else None
+        n_sub, _, sub_dim = self.codebooks.shape
+        n_probe = min(n_probe, len(self.centroids))
+        probes = np.argsort(self._squared_distances(queries, self.centroids), axis=1)[:, :n_probe]
+
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        for qi, query in enumerate(queries):
+            cand_ids, cand_dist = [], []
+            for list_id in probes[qi]:
+                members = inverted_lists[list_id]
+                if len(members) == 0:
+                    continue
+                residual = (query - self.centroids[list_id]).reshape(n_sub, 1, sub_dim)
+                # Lookup table of squared distances from each query sub-vector to every code word
+                table = ((residual - self.codebooks) ** 2).sum(-1)
+                cand_dist.append(table[np.arange(n_sub), self.codes[members]].sum(1))
+                cand_ids.append(members)
+            if not cand_ids:
+                continue
+
+            cand_ids = np.concatenate(cand_ids)
+            # For unit vectors ||q - x||^2 = 2 - 2 cos(q, x)
+            cand_scores = 1.0 - np.concatenate(cand_dist) / 2.0
+            if rerank:
+                keep = np.argsort(-cand_scores)[:rerank * k]
+                cand_ids = cand_ids[keep]
+                cand_scores = vectors[cand_ids] @ query
+
+            top = np.argsort(-cand_scores)[:k]
+            scores[qi, :len(top)] = cand_scores[top]
+            indices[qi, :len(top)] = cand_ids[top]
+        return scores, indices
+
+    # --- Persistence ---
+
+    def save(self, path: str):
+        """
+        Saves the index to a single uncompressed .npz file. The file is written under a
+        temporary name and renamed into place, so indexes memory-mapped from the old file
+        (see `load`) stay valid.
+        """
+        arrays = {"vectors": self.vectors, "ids": np.array(self.ids, dtype=str)}
+        if self.is_trained:
+            arrays.update(centroids=self.centroids, codebooks=self.codebooks,
+                          assignments=self.assignments, codes=self.codes)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".npz.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, dim=self.dim, **arrays)
+            os.chmod(tmp_path, 0o644) # mkstemp creates owner-only files
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _memmap_member(path: str, name: str) -> Optional[np.ndarray]:
+        """
+        Read-only memory map of one array stored uncompressed in an .npz archive, located
+        from its zip local header and .npy header. None if the member is compressed.
+        """
+        with zipfile.ZipFile(path) as archive:
+            info = archive.getinfo(name)
+        if info.compress_type != zipfile.ZIP_STORED:
+            return None
+        with open(path, "rb") as f:
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+        if 0 in shape:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape, order="F" if fortran else "C")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = False) -> "EmbeddingIndex":
+        """
+        Loads an index. With `mmap=True` the vector block is memory-mapped instead of read,
+        so opening a large index costs only the ids and the IVF-PQ arrays.
+        """
+        vectors = cls._memmap_member(path, "vectors.npy") if mmap else None
+        with np.load(path) as data:
+            index = cls(int(data["dim"]))
+            index._vectors = data["vectors"] if vectors is None else vectors
+            index.ids = data["ids"].tolist()
+            if "centroids" in data:
+                index.centroids = data["centroids"]
+                index.codebooks = data["codebooks"]
+                index.assignments = data["assignments"]
+                index.codes = data["codes"]
+        return index
+
+# Indexes opened by search_similar_proteins, keyed by path and reused while the file is unchanged
+_index_cache: Dict[str, tuple] = {}
+
+def _load_cached(index_path: str) -> EmbeddingIndex:
+    """Memory-mapped index for `index_path`, reloaded only when the file's mtime or size changes."""
+    path = os.path.abspath(index_path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _index_cache.get(path)
+    if cached is None or cached[0] != version:
+        cached = (version, EmbeddingIndex.load(path, mmap=True))
+        _index_cache[path] = cached
+    return cached[1]
+
+def _embeddings_from_export(export_dir: str):
+    """Mean-pools each record of an `export_residue_embeddings` directory."""
+    with open(os.path.join(export_dir, "metadata.json")) as f:
+        metadata = json.load(f)
+    data = np.memmap(os.path.join(export_dir, "embeddings.bin"), dtype=metadata["dtype"], mode="r",
+                     shape=(metadata["num_residues"], metadata["hidden_size"]))
+
+    ids, vectors = [], []
+    with open(os.path.join(export_dir, "index.tsv")) as f:
+        next(f)
+        for line in f:
+            seq_id, offset, length = line.rstrip("\n").split("\t")
+            offset, length = int(offset), int(length)
+            ids.append(seq_id)
+            vectors.append(data[offset:offset + length].astype(np.float32).mean(0))
+    return ids, np.array(vectors, dtype=np.float32)
+
+def build_embedding_index(index_path: str, fasta_path: str = None, export_dir: str = None,
+                          approximate: bool = False, n_lists: int = 1024, retrain: bool = False) -> Dict[str, int]:
+    """
+    Builds or extends a protein embedding similarity index.
+
+    Embeddings come either from an `export_residue_embeddings` directory (mean-pooled per record)
+    or by embedding a FASTA with ESM. Records are appended if the index already exists.
+
+    Args:
+        index_path (str): Path of the .npz index file.
+        fasta_path (str): FASTA to embed with ESM.
+        export_dir (str): Existing per-residue embedding export.
+        approximate (bool): Train the IVF-PQ mode for large collections. Once trained, new
+                            records are encoded with the existing quantizers instead of retraining.
+        n_lists (int): Coarse lists for IVF-PQ.
+        retrain (bool): Retrain the IVF-PQ quantizers on all stored vectors (e.g. after the
+                        collection has grown a lot).
+
+    Returns:
+        Dict[str, int]: Number of added and total entries.
+    """
+    if export_dir:
+        ids, vectors = _embeddings_from_export(export_dir)
+    elif fasta_path:
+        from Bio import SeqIO
+        from proteintoolbox.skills import esm_skills
+        records = list(SeqIO.parse(fasta_path, "fasta"))
+        ids = [r.id for r in records]
+        vectors = np.array([esm_skills.get_embedding(str(r.seq)) for r in records], dtype=np.float32)
+    else:
+        raise ValueError("Provide either fasta_path or export_dir.")
+
+    index = EmbeddingIndex.load(index_path) if os.path.exists(index_path) else EmbeddingIndex(vectors.shape[1])
+    # add() encodes new vectors against already trained quantizers
+    index.add(vectors, ids)
+    if approximate and (retrain or not index.is_trained):
+        index.train_ivfpq(n_lists=n_lists)
+    index.save(index_path)
+
+    return {"added": len(ids), "total": len(index)}
+
+def search_similar_proteins(index_path: str, sequence: str, k: int = 10, approximate: bool = False) -> List[Dict]:
+    """
+    Finds the stored proteins whose ESM embeddings are most similar to a query sequence.
+
+    The index is loaded once per process (vectors memory-mapped) and reused until the file
+    changes, so repeated queries only pay for the embedding and the search.
+
+    Args:
+        index_path (str): Index built by `build_embedding_index`.
+        sequence (str): Query amino acid sequence (e.g. a new design).
+        k (int): Number of neighbours.
+        approximate (bool): Use the IVF-PQ mode if the index was trained for it.
+
+    Returns:
+        List[Dict]: Neighbours as {'id', 'score'} (cosine similarity), best first.
+    """
+    from proteintoolbox.skills import esm_skills
+
+    index = _load_cached(index_path)
+    query = np.array(esm_skills.get_embedding(sequence), dtype=np.float32)
+    scores, indices = index.search(query, k=k, approximate=approximate and index.is_trained)
+
+    return [
+        {"id": index.ids[i], "score": float(s)}
+        for s, i in zip(scores[0], indices[0]) if i >= 0
+    ]
@@ -1,7 +1,30 @@
 import freesasa
+import numpy as np
 from Bio.PDB import PDBParser
 import os
-from typing import Dict, List, Tuple
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+from typing import Dict, List, Sequence, Tuple
+from proteintoolbox.structure_io import atom_index, atom_radii, read_atoms
+
+__all__ = ["calculate_sasa", "get_residue_sasa", "identify_surface_residues", "find_surface_patches"]
+
+# Theoretical maximum residue SASA (Tien et al. 2013), for relative accessibility
+MAX_ASA = {
+    "ALA": 129.0, "ARG": 274.0, "ASN": 195.0, "ASP": 193.0, "CYS": 167.0, "GLN": 225.0, "GLU": 223.0,
+    "GLY": 104.0, "HIS": 224.0, "ILE": 197.0, "LEU": 201.0, "LYS": 236.0, "MET": 224.0, "PHE": 240.0,
+    "PRO": 159.0, "SER": 155.0, "THR": 172.0, "TRP": 285.0, "TYR": 263.0, "VAL": 174.0,
+}
+# Residues forming each patch type
+PATCH_TYPES = {
+    "hydrophobic": ("ALA", "VAL", "LEU", "ILE", "MET", "PHE", "TRP", "TYR", "CYS"),
+    "positive": ("LYS", "ARG"),
+    "negative": ("ASP", "GLU"),
+}
+# Kyte-Doolittle hydropathy, used to weight hydrophobic patch areas
+_HYDROPATHY = {"ALA": 1.8, "VAL": 4.2, "LEU": 3.8, "ILE": 4.5, "MET": 1.9, "PHE": 2.8, "TRP": -0.9,
+               "TYR": -1.3, "CYS": 2.5}
 
 def calculate_sasa(pdb_path: str) -> Dict[str, float]:
     """
@@ -86,3 +109,95 @@ def identify_surface_residues(pdb_path: str, threshold: float = 10.0) -> List[st
     """
     res_sasa = get_residue_sasa(pdb_path)
     return [res_id for res_id, area in res_sasa.items() if area > threshold]
+
+def find_surface_patches(pdb_path: str, patch_types: Sequence[str] = ("hydrophobic", "positive", "negative"),
+                         min_relative_sasa: float = 0.2, distance_cutoff: float = 7.0, min_patch_size: int = 2,
+                         charged_histidine: bool = False) -> Dict:
+    """
+    Finds contiguous hydrophobic and charged surface patches (developability / aggregation risk).
+
+    SASA is computed once per structure and shared by every patch type. Residues with relative
+    accessibility >= `min_relative_sasa` are surface residues; residues of one patch type are
+    linked when their side-chain centroids (CA for glycine) are within `distance_cutoff`
+    (KD-tree), and connected components of that graph are the patches.
+
+    Args:
+        pdb_path (str): Path to PDB.
+        patch_types (Sequence[str]): Any of "hydrophobic", "positive", "negative".
+        min_relative_sasa (float): Surface threshold as a fraction of the residue's maximum SASA.
+        distance_cutoff (float): Side-chain centroid distance linking two residues, in Angstroms.
+        min_patch_size (int): Smallest patch reported, in residues.
+        charged_histidine (bool): Count histidine as positive.
+
+    Returns:
+        Dict: Surface residue count and, per patch type, patches ranked by score (area, or for
+        hydrophobic patches area weighted by hydropathy), each with residues, area (A^2) and
+        composition; plus the largest patch area per type.
+    """
+    unknown = set(patch_types) - set(PATCH_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown patch type(s) {sorted(unknown)}. Choose from: {', '.join(PATCH_TYPES)}")
+    atoms = read_atoms(pdb_path, hetatm=False)
+    result = freesasa.calcCoord(atoms["coords"].ravel(), atom_radii(atoms))
+    areas = np.array([result.atomArea(i) for i in range(len(atoms["names"]))])
+    residue = atoms["residue_index"]
+    n_res = len(atoms["residue_starts"])
+    residue_sasa = np.bincount(residue, weights=areas, minlength=n_res)
+    res_names = atoms["residue_names"]
+    max_asa = np.array([MAX_ASA.get(name, np.nan) for name in res_names])
+    surface = residue_sasa / max_asa >= min_relative_sasa
+
+    # Side-chain centroids, or CA for residues without side-chain atoms (glycine)
+    side = ~np.isin(atoms["names"], ("N", "CA", "C", "O", "OXT"))
+    counts = np.bincount(residue[side], minlength=n_res)
+    centroids = np.stack([np.bincount(residue[side], weights=atoms["coords"][side, k], minlength=n_res)
+                          for k in range(3)], axis=1)
+    centroids[counts > 0] /= counts[counts > 0, None]
+    ca = atom_index(atoms, "CA")
+    bare = (counts == 0) & (ca >= 0)
+    centroids[bare] = atoms["coords"][ca[bare]]
+    located = (counts > 0) | bare
+
+    members = dict(PATCH_TYPES)
+    if charged_histidine:
+        members["positive"] = members["positive"] + ("HIS",)
+    labels = atoms["residue_labels"]
+    patches, largest = {}, {}
+    for patch_type in patch_types:
+        nodes = np.flatnonzero(surface & located & np.isin(res_names, members[patch_type]))
+        found = []
+        if len(nodes):
+            edges = cKDTree(centroids[nodes]).query_pairs(distance_cutoff, output_type="ndarray")
+            graph = coo_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(len(nodes), len(nodes)))
+            _, component = connected_components(graph, directed=False)
+            for c in range(component.max() + 1):
+                patch = nodes[component == c]
+                if len(patch) < min_patch_size:
+                    continue
+                area = float(residue_sasa[patch].sum())
+                if patch_type == "hydrophobic":
+                    # Hydropathy rescaled to 0..1 (Ile = 1, Arg = 0)
+                    score = float(sum(residue_sasa[r] * (_HYDROPATHY[res_names[r]] + 4.5) / 9.0 for r in patch))
+                else:
+                    score = area
+                composition = {}
+                for name in res_names[patch].tolist():
+                    composition[name] = composition.get(name, 0) + 1
+                found.append({
+                    "residues": [labels[r] for r in patch],
+                    "n_residues": len(patch),
+                    "area": round(area, 1),
+                    "score": round(score, 1),
+                    "composition": composition,
+                })
+        found.sort(key=lambda p: -p["score"])
+        for rank, patch in enumerate(found, start=1):
+            patch["rank"] = rank
+        patches[patch_type] = found
+        largest[patch_type] = max((p["area"] for p in found), default=0.0)
+
+    return {
+        "n_surface_residues": int(surface.sum()),
+        "patches": patches,
+        "largest_patch_area": largest,
+    }
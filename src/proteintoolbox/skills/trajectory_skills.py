@@ -0,0 +1,408 @@
+import os
+import struct
+import tempfile
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from scipy.spatial import cKDTree
+from typing import Dict, List, Tuple
+from proteintoolbox.geometry import RunningStats, radius_of_gyration, superpose_batch
+from proteintoolbox.resources import get_probe
+from proteintoolbox.structure_io import THREE_TO_ONE
+
+__all__ = ["analyze_trajectory"]
+
+# Water and ion residues left out of the solute (alignment, Rg, contacts); calcium is "CA"
+_SOLVENT_RESIDUES = {"HOH", "WAT", "SOL", "TIP", "TIP3", "NA", "CL", "K", "MG", "CA", "CA2", "ZN", "MN", "FE", "CU"}
+_MASSES = {"H": 1.008, "C": 12.011, "N": 14.007, "O": 15.999, "S": 32.06, "P": 30.974}
+_BACKBONE = {"N", "CA", "C", "O"}
+_SELECTIONS = ("ca", "backbone", "heavy", "all")
+
+def _read_topology(pdb_path: str) -> Dict:
+    """
+    Atom table (first model) of a topology PDB: names, residues, elements and coordinates,
+    in file order, which is the atom order of the matching trajectory.
+    """
+    names, residues, elements, coords, solvent, amino_acid = [], [], [], [], [], []
+    with open(pdb_path) as f:
+        for line in f:
+            if line.startswith("ENDMDL"):
+                break
+            if not line.startswith(("ATOM", "HETATM")):
+                continue
+            name, res_name = line[12:16].strip(), line[17:20].strip()
+            names.append(name)
+            residues.append(f"{line[21]}:{line[22:27].strip()}_{res_name}")
+            elements.append((line[76:78].strip() or name[:1]).upper())
+            coords.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+            solvent.append(res_name in _SOLVENT_RESIDUES)
+            amino_acid.append(res_name in THREE_TO_ONE)
+    if not names:
+        raise ValueError(f"No atoms found in {pdb_path}")
+    return {"names": np.array(names), "residues": residues, "elements": np.array(elements),
+            "coords": np.array(coords), "solvent": np.array(solvent), "amino_acid": np.array(amino_acid)}
+
+def _select(topology: Dict, selection: str) -> np.ndarray:
+    """Indices of solute atoms matching "ca", "backbone" (amino-acid residues only), "heavy" or "all"."""
+    if selection not in _SELECTIONS:
+        raise ValueError(f"Unknown selection '{selection}'. Choose from: {', '.join(_SELECTIONS)}")
+    mask = ~topology["solvent"]
+    if selection == "ca":
+        mask &= topology["amino_acid"] & (topology["names"] == "CA")
+    elif selection == "backbone":
+        mask &= topology["amino_acid"] & np.isin(topology["names"], list(_BACKBONE))
+    elif selection == "heavy":
+        mask &= topology["elements"] != "H"
+    indices = np.flatnonzero(mask)
+    if len(indices) < 3:
+        raise ValueError(f"Selection '{selection}' matches fewer than 3 atoms")
+    return indices
+
+class _DCDReader:
+    """
+    Random access to DCD frames through a memory map. The frame count comes from the file size,
+    so trajectories still being written (or with a stale header) are read up to the last
+    complete frame.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(100)
+            if len(header) < 100 or struct.unpack("<i", header[:4])[0] != 84 or header[4:8] != b"CORD":
+                raise ValueError(f"{path} is not a little-endian CHARMM/OpenMM DCD file")
+            if struct.unpack("<i", header[40:44])[0]:
+                raise ValueError("DCD files with fixed atoms are not supported")
+            has_box = struct.unpack("<i", header[48:52])[0] != 0
+            title_bytes = struct.unpack("<i", header[92:96])[0]
+            f.seek(96 + title_bytes + 4)
+            self.n_atoms = struct.unpack("<3i", f.read(12))[1]
+        self.offset = 96 + title_bytes + 4 + 12
+        # Words (float32) per frame: optional unit-cell record, then x, y and z records
+        self.box_words = 14 if has_box else 0
+        self.frame_words = self.box_words + 3 * (self.n_atoms + 2)
+        self.n_frames = (os.path.getsize(path) - self.offset) // (4 * self.frame_words)
+
+    def read(self, start: int, stop: int, stride: int = 1) -> np.ndarray:
+        """
+        Frames start, start + stride, ... < stop as an array of shape (frames, atoms, 3) in
+        Angstroms. Skipped frames are never copied out of the memory map.
+        """
+        count = max(0, min(stop, self.n_frames) - start)
+        if count == 0:
+            return np.zeros((0, self.n_atoms, 3), dtype=np.float32)
+        words = np.memmap(self.path, dtype="<f4", mode="r", offset=self.offset + 4 * self.frame_words * start,
+                          shape=(count, self.frame_words))[::stride]
+        n = self.n_atoms
+        first = self.box_words + 1
+        return np.stack([words[:, first + k * (n + 2):first + k * (n + 2) + n] for k in range(3)], axis=-1)
+
+def _xtc_utils():
+    """
+    OpenMM's XTC decoder. It lives in the private `openmm.app.internal` package (OpenMM only
+    exposes an XTC writer), so any change there surfaces here as one clear error.
+    """
+    try:
+        from openmm.app.internal import xtc_utils
+        return xtc_utils.get_xtc_natoms, xtc_utils.read_xtc
+    except (ImportError, AttributeError) as e:
+        raise ImportError("Reading XTC trajectories needs OpenMM >= 8.1 (openmm.app.internal.xtc_utils); "
+                          "convert the trajectory to DCD or multi-model PDB instead.") from e
+
+class _XTCReader:
+    """
+    Chunked XTC access. Frame byte offsets are indexed once by hopping over the frame headers;
+    a chunk's bytes are then copied to a temporary file and decompressed by OpenMM's reader,
+    so only one chunk is ever held in memory.
+    """
+
+    def __init__(self, path: str):
+        get_xtc_natoms, _ = _xtc_utils()
+        self.path = path
+        self.n_atoms = get_xtc_natoms(path.encode("utf-8"))
+        self.offsets = self._index()
+        self.n_frames = len(self.offsets) - 1
+
+    def _index(self) -> List[int]:
+        offsets = [0]
+        size = os.path.getsize(self.path)
+        with open(self.path, "rb") as f:
+            while offsets[-1] < size:
+                f.seek(offsets[-1])
+                magic, natoms = struct.unpack(">2i", f.read(8))
+                if magic not in (1995, 2023):
+                    raise ValueError(f"Corrupt XTC frame at byte {offsets[-1]} in {self.path}")
+                if natoms <= 9:
+                    length = 56 + 4 + 12 * natoms
+                else:
+                    # Header, precision, min/max ints and small index, then the compressed block
+                    f.seek(offsets[-1] + 88)
+                    if magic == 2023:
+                        n_bytes, length = struct.unpack(">q", f.read(8))[0], 96
+                    else:
+                        n_bytes, length = struct.unpack(">i", f.read(4))[0], 92
+                    length += (n_bytes + 3) // 4 * 4
+                if offsets[-1] + length > size:
+                    break  # truncated final frame
+                offsets.append(offsets[-1] + length)
+        return offsets
+
+    def read(self, start: int, stop: int, stride: int = 1) -> np.ndarray:
+        _, read_xtc = _xtc_utils()
+        stop = min(stop, self.n_frames)
+        if stop <= start:
+            return np.zeros((0, self.n_atoms, 3), dtype=np.float32)
+        with open(self.path, "rb") as f, tempfile.NamedTemporaryFile(suffix=".xtc") as chunk:
+            if stride == 1:
+                f.seek(self.offsets[start])
+                chunk.write(f.read(self.offsets[stop] - self.offsets[start]))
+            else:
+                # Frames are self-contained, so only the kept ones are copied and decompressed
+                for frame in range(start, stop, stride):
+                    f.seek(self.offsets[frame])
+                    chunk.write(f.read(self.offsets[frame + 1] - self.offsets[frame]))
+            chunk.flush()
+            coords = read_xtc(chunk.name.encode("utf-8"))[0]
+        return np.ascontiguousarray(coords.transpose(2, 0, 1)) * 10.0
+
+class _PDBReader:
+    """Multi-model PDB frames, located by the byte offsets of their MODEL records."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets = []
+        position = 0
+        n_atoms = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if line.startswith(b"MODEL"):
+                    self.offsets.append(position)
+                elif line.startswith((b"ATOM", b"HETATM")) and len(self.offsets) <= 1:
+                    n_atoms += 1
+                position += len(line)
+        if not self.offsets:
+            self.offsets = [0]
+        self.n_atoms = n_atoms
+        self.n_frames = len(self.offsets)
+
+    def read(self, start: int, stop: int, stride: int = 1) -> np.ndarray:
+        stop = min(stop, self.n_frames)
+        if stop <= start:
+            return np.zeros((0, self.n_atoms, 3), dtype=np.float32)
+        frames = []
+        with open(self.path, "rb") as f:
+            for frame in range(start, stop, stride):
+                f.seek(self.offsets[frame])
+                lines = []
+                for line in f:
+                    if line.startswith((b"ATOM", b"HETATM")):
+                        lines.append(line)
+                    elif line.startswith(b"ENDMDL"):
+                        break
+                if len(lines) != self.n_atoms:
+                    raise ValueError(f"Model {frame + 1} of {self.path} has {len(lines)} atoms, "
+                                     f"expected {self.n_atoms}")
+                frames.append([(float(l[30:38]), float(l[38:46]), float(l[46:54])) for l in lines])
+        return np.array(frames, dtype=np.float32).reshape(-1, self.n_atoms, 3)
+
+def _open_trajectory(path: str):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".dcd":
+        return _DCDReader(path)
+    if extension == ".xtc":
+        return _XTCReader(path)
+    if extension in (".pdb", ".ent"):
+        return _PDBReader(path)
+    raise ValueError(f"Unsupported trajectory format '{extension}' (use .dcd, .xtc or multi-model .pdb)")
+
+# Above this many contact atoms, per-frame KD-trees beat dense distance matrices
+_DENSE_CONTACT_ATOMS = 1500
+
+def _count_contacts(coords: np.ndarray, cutoff: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Counts, over a stack of frames (B x n x 3), how often each atom pair i < j - 2 is within
+    `cutoff`. Returns (pair codes i * n + j, counts) for pairs seen at least once.
+    """
+    n = coords.shape[1]
+    if n <= _DENSE_CONTACT_ATOMS:
+        counts = np.zeros((n, n), dtype=np.int64)
+        batch = max(1, 4_000_000 // (n * n))
+        for start in range(0, len(coords), batch):
+            block = coords[start:start + batch]
+            squared = (block ** 2).sum(axis=-1)
+            d2 = squared[:, :, None] + squared[:, None, :] - 2 * block @ block.transpose(0, 2, 1)
+            counts += (d2 < cutoff ** 2).sum(axis=0)
+        # Skip contacts between residues fewer than 3 apart in the chain
+        counts = np.triu(counts, k=3)
+        codes = np.flatnonzero(counts)
+        return codes, counts.ravel()[codes]
+
+    codes = [np.zeros(0, dtype=np.int64)]
+    for frame in coords:
+        pairs = cKDTree(frame).query_pairs(cutoff, output_type="ndarray")
+        pairs = np.sort(pairs, axis=1)
+        pairs = pairs[pairs[:, 1] - pairs[:, 0] >= 3]
+        codes.append(pairs[:, 0].astype(np.int64) * n + pairs[:, 1])
+    return np.unique(np.concatenate(codes), return_counts=True)
+
+def _analyze_chunk(trajectory_path: str, start: int, stop: int, stride: int, align: np.ndarray,
+                   reference: np.ndarray, rg_atoms: np.ndarray, rg_masses: np.ndarray,
+                   contact_atoms: np.ndarray, contact_cutoff: float) -> Dict:
+    """
+    Analyzes frames start, start + stride, ... < stop. Returns per-frame RMSD/Rg, the RMSF
+    accumulator of the aligned atoms and contact counts keyed by pair code (i * n + j).
+    """
+    coords = _open_trajectory(trajectory_path).read(start, stop, stride)
+    fitted, rmsd = superpose_batch(coords[:, align].astype(np.float64), reference)
+    stats = RunningStats()
+    stats.update_batch(fitted)
+
+    codes, counts = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    if contact_atoms is not None:
+        codes, counts = _count_contacts(coords[:, contact_atoms].astype(np.float64), contact_cutoff)
+
+    return {
+        "start": start,
+        "rmsd": rmsd,
+        "rg": radius_of_gyration(coords[:, rg_atoms], rg_masses),
+        "stats": (stats.count, stats.mean, stats.m2),
+        "contact_codes": codes,
+        "contact_counts": counts,
+    }
+
+def analyze_trajectory(trajectory_path: str, topology_path: str, output_dir: str = "output/trajectory_analysis",
+                       selection: str = "ca", reference_path: str = None, chunk_size: int = 500,
+                       stride: int = 1, n_workers: int = None, contact_cutoff: float = 8.0,
+                       min_contact_frequency: float = 0.1, timestep_ps: float = None) -> Dict:
+    """
+    Streams a DCD, XTC or multi-model PDB trajectory in chunks and computes RMSD, RMSF, radius
+    of gyration and residue contact frequencies without loading the whole trajectory.
+
+    Each chunk is superposed onto the reference with a batched (vectorized) Kabsch fit.
+    Chunks are processed in parallel worker processes, each reading its own frame range, and
+    partial RMSF and contact statistics are merged exactly, so memory is bounded by
+    `chunk_size` x `n_workers` frames. Works directly on the output of `run_md`
+    (`trajectory.xtc`/`.dcd` with `topology.pdb`).
+
+    Args:
+        trajectory_path: .dcd, .xtc or multi-model .pdb file.
+        topology_path: PDB with the trajectory's atoms in the same order.
+        output_dir: Directory for frames.tsv, rmsf.tsv and contacts.tsv.
+        selection: Atoms for superposition, RMSD and RMSF: "ca", "backbone", "heavy" or "all".
+        reference_path: Reference PDB for RMSD (same atoms); defaults to the topology coordinates.
+        chunk_size: Frames analyzed per work unit (after striding; skipped frames are never loaded).
+        stride: Analyze every n-th frame.
+        n_workers: Worker processes (defaults to the usable cores; 1 runs in-process).
+        contact_cutoff: CA-CA distance (Angstroms) defining a residue contact; 0 disables contacts.
+        min_contact_frequency: Fraction of frames a contact must be present in to be reported.
+        timestep_ps: Time between stored frames, for the time column (frame index if omitted).
+
+    Returns:
+        Dict: Frame count, RMSD/Rg summary, most flexible residues, contact count and output paths.
+    """
+    topology = _read_topology(topology_path)
+    reader = _open_trajectory(trajectory_path)
+    n_atoms = len(topology["names"])
+    if reader.n_atoms != n_atoms:
+        raise ValueError(f"Trajectory has {reader.n_atoms} atoms but the topology has {n_atoms}")
+
+    align = _select(topology, selection)
+    reference = _read_topology(reference_path)["coords"] if reference_path else topology["coords"]
+    if len(reference) != n_atoms:
+        raise ValueError(f"Reference has {len(reference)} atoms but the topology has {n_atoms}")
+    reference = reference[align]
+    rg_atoms = np.flatnonzero(~topology["solvent"] & (topology["elements"] != "H"))
+    rg_masses = np.array([_MASSES.get(e, 12.011) for e in topology["elements"][rg_atoms]])
+    contact_atoms = _select(topology, "ca") if contact_cutoff else None
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {name: os.path.join(output_dir, f"{name}.tsv") for name in ("frames", "rmsf", "contacts")}
+    if n_workers is None:
+        n_workers = get_probe().recommend_workers(max_workers=max(1, -(-reader.n_frames // chunk_size)))
+    span = chunk_size * stride
+    chunks = [(start, min(start + span, reader.n_frames)) for start in range(0, reader.n_frames, span)]
+    args = (stride, align, reference, rg_atoms, rg_masses, contact_atoms, contact_cutoff)
+
+    stats = RunningStats()
+    contact_totals = {}
+    summary = {"frames": 0, "rmsd_sum": 0.0, "rg_sum": 0.0, "rmsd_max": 0.0}
+    finished = {}
+    next_start = [0]
+    start_time = time.perf_counter()
+
+    with open(paths["frames"], "w") as frames_out:
+        frames_out.write("frame\ttime_ps\trmsd\trg\n")
+
+        def record(result):
+            # Per-frame rows are written in trajectory order as soon as the preceding chunks are in
+            finished[result["start"]] = result
+            while next_start[0] in finished:
+                chunk = finished.pop(next_start[0])
+                for k, (rmsd, rg) in enumerate(zip(chunk["rmsd"], chunk["rg"])):
+                    frame = chunk["start"] + k * stride
+                    time_ps = f"{frame * timestep_ps:.3f}" if timestep_ps else ""
+                    frames_out.write(f"{frame}\t{time_ps}\t{rmsd:.4f}\t{rg:.4f}\n")
+                stats.merge(*chunk["stats"])
+                for code, count in zip(chunk["contact_codes"].tolist(), chunk["contact_counts"].tolist()):
+                    contact_totals[code] = contact_totals.get(code, 0) + count
+                summary["frames"] += len(chunk["rmsd"])
+                summary["rmsd_sum"] += float(chunk["rmsd"].sum())
+                summary["rg_sum"] += float(chunk["rg"].sum())
+                summary["rmsd_max"] = max(summary["rmsd_max"], float(chunk["rmsd"].max(initial=0)))
+                next_start[0] += span
+
+        if n_workers <= 1:
+            for start, stop in chunks:
+                record(_analyze_chunk(trajectory_path, start, stop, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                pending = set()
+                for start, stop in chunks:
+                    pending.add(pool.submit(_analyze_chunk, trajectory_path, start, stop, *args))
+                    if len(pending) >= n_workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            record(future.result())
+                for future in wait(pending).done:
+                    record(future.result())
+
+    # Per-atom RMSF of the aligned atoms, averaged per residue
+    residues = [topology["residues"][i] for i in align]
+    atom_rmsf = np.sqrt(stats.variance.sum(axis=1)) if stats.count else np.zeros(len(align))
+    per_residue = {}
+    for residue, value in zip(residues, atom_rmsf):
+        per_residue.setdefault(residue, []).append(value)
+    rmsf = {residue: float(np.mean(values)) for residue, values in per_residue.items()}
+    with open(paths["rmsf"], "w") as f:
+        f.write("residue\trmsf\n")
+        for residue, value in rmsf.items():
+            f.write(f"{residue}\t{value:.4f}\n")
+
+    contacts = []
+    if contact_atoms is not None and summary["frames"]:
+        n = len(contact_atoms)
+        labels = [topology["residues"][i] for i in contact_atoms]
+        for code, count in sorted(contact_totals.items(), key=lambda item: -item[1]):
+            frequency = count / summary["frames"]
+            if frequency < min_contact_frequency:
+                break
+            contacts.append((labels[code // n], labels[code % n], frequency))
+    with open(paths["contacts"], "w") as f:
+        f.write("residue_a\tresidue_b\tfrequency\n")
+        for a, b, frequency in contacts:
+            f.write(f"{a}\t{b}\t{frequency:.4f}\n")
+
+    n_frames = summary["frames"]
+    return {
+        "frames": n_frames,
+        "n_atoms": n_atoms,
+        "selection": selection,
+        "mean_rmsd": round(summary["rmsd_sum"] / n_frames, 3) if n_frames else None,
+        "max_rmsd": round(summary["rmsd_max"], 3) if n_frames else None,
+        "mean_rg": round(summary["rg_sum"] / n_frames, 3) if n_frames else None,
+        "most_flexible": [r for r, _ in sorted(rmsf.items(), key=lambda item: -item[1])[:5]] if n_frames else [],
+        "n_contacts": len(contacts),
+        "n_workers": n_workers,
+        "elapsed_s": round(time.perf_counter() - start_time, 2),
+        **{f"{name}_path": path for name, path in paths.items()},
+    }
@@ -1,113 +1,284 @@
+import os
 import numpy as np
-from Bio.PDB import PDBParser, Selection, NeighborSearch, Residue
+from scipy.spatial import cKDTree
 from typing import Dict, List, Tuple, Any
+from proteintoolbox.geometry import dihedrals
+from proteintoolbox.structure_io import THREE_TO_ONE, atom_index, read_atoms
+
+__all__ = ["check_backbone_continuity", "check_steric_clashes", "calculate_dihedrals", "validate_structure"]
+
+# Side-chain dihedrals (chi1-chi4) per residue type, as atom name quadruplets
+CHI_ATOMS = {
+    "ARG": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "CD"), ("CB", "CG", "CD", "NE"), ("CG", "CD", "NE", "CZ")],
+    "ASN": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "OD1")],
+    "ASP": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "OD1")],
+    "CYS": [("N", "CA", "CB", "SG")],
+    "GLN": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "CD"), ("CB", "CG", "CD", "OE1")],
+    "GLU": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "CD"), ("CB", "CG", "CD", "OE1")],
+    "HIS": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "ND1")],
+    "ILE": [("N", "CA", "CB", "CG1"), ("CA", "CB", "CG1", "CD1")],
+    "LEU": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "CD1")],
+    "LYS": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "CD"), ("CB", "CG", "CD", "CE"), ("CG", "CD", "CE", "NZ")],
+    "MET": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "SD"), ("CB", "CG", "SD", "CE")],
+    "MSE": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "SE"), ("CB", "CG", "SE", "CE")],
+    "PHE": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "CD1")],
+    "PRO": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "CD")],
+    "SER": [("N", "CA", "CB", "OG")],
+    "THR": [("N", "CA", "CB", "OG1")],
+    "TRP": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "CD1")],
+    "TYR": [("N", "CA", "CB", "CG"), ("CA", "CB", "CG", "CD1")],
+    "VAL": [("N", "CA", "CB", "CG1")],
+}
+
+RAMACHANDRAN_CLASSES = ("general", "glycine", "proline")
+RAMACHANDRAN_REGIONS = ("outlier", "allowed", "favored")
+
+# Coarse (phi_min, phi_max, psi_min, psi_max) boxes in degrees approximating the core ("favored")
+# and generously allowed regions of high-resolution structures. Glycine also gets the mirrored boxes.
+_RAMA_BOXES = {
+    "general": {
+        "favored": [(-180, -45, 100, 180), (-180, -45, -180, -170), (-160, -40, -75, -5)],
+        "allowed": [(-180, -25, 50, 180), (-180, -25, -180, -150), (-180, -25, -110, 50), (40, 90, -20, 100)],
+    },
+    "glycine": {
+        "favored": [(-180, -45, 100, 180), (-180, -45, -180, -150), (-160, -40, -75, -5), (45, 180, -180, -100),
+                    (45, 180, 150, 180), (40, 160, -30, 75)],
+        "allowed": [(-180, -30, -180, 180), (30, 180, -180, 180)],
+    },
+    "proline": {
+        "favored": [(-95, -45, 100, 180), (-95, -45, -180, -170), (-95, -45, -65, -5)],
+        "allowed": [(-110, -35, 50, 180), (-110, -35, -180, -150), (-110, -35, -100, 50)],
+    },
+}
+
+def _ramachandran_table(bin_size: int = 10) -> np.ndarray:
+    """Region code (index into RAMACHANDRAN_REGIONS) per class x phi bin x psi bin."""
+    centers = np.arange(-180 + bin_size / 2, 180, bin_size)
+    phi, psi = np.meshgrid(centers, centers, indexing="ij")
+    table = np.zeros((len(RAMACHANDRAN_CLASSES), len(centers), len(centers)), dtype=np.int8)
+    for c, name in enumerate(RAMACHANDRAN_CLASSES):
+        for region in ("allowed", "favored"):
+            code = RAMACHANDRAN_REGIONS.index(region)
+            for phi0, phi1, psi0, psi1 in _RAMA_BOXES[name][region]:
+                table[c][(phi >= phi0) & (phi <= phi1) & (psi >= psi0) & (psi <= psi1)] = code
+    return table
+
+_RAMA_BIN = 10
+_RAMA_TABLE = _ramachandran_table(_RAMA_BIN)
+
+def _dihedral_at(coords: np.ndarray, quads: np.ndarray) -> np.ndarray:
+    """Dihedrals for rows of atom indices (n x 4); NaN where any atom is missing (-1)."""
+    angles = np.full(len(quads), np.nan)
+    ok = (quads >= 0).all(axis=1)
+    q = quads[ok]
+    angles[ok] = dihedrals(coords[q[:, 0]], coords[q[:, 1]], coords[q[:, 2]], coords[q[:, 3]])
+    return angles
+
+def _peptide_links(atoms: Dict, n: np.ndarray, c: np.ndarray, threshold: float) -> np.ndarray:
+    """linked[r]: residue r is peptide-bonded to residue r - 1 (same chain, C-N <= threshold)."""
+    polymer = np.isin(atoms["residue_names"], list(THREE_TO_ONE))
+    linked = np.zeros(len(n), dtype=bool)
+    candidate = np.flatnonzero(polymer[1:] & polymer[:-1] & (atoms["residue_chains"][1:] == atoms["residue_chains"][:-1])
+                               & (c[:-1] >= 0) & (n[1:] >= 0)) + 1
+    coords = atoms["coords"]
+    distance = np.linalg.norm(coords[c[candidate - 1]] - coords[n[candidate]], axis=1)
+    linked[candidate[distance <= threshold]] = True
+    return linked
+
+def _dihedral_table(atoms: Dict, threshold: float = 2.0) -> Dict[str, np.ndarray]:
+    """
+    Backbone (phi, psi, omega) and side-chain (chi1-chi4) dihedrals of every residue, plus the
+    Ramachandran class and region, all as per-residue arrays. Every angle type is one batched
+    dihedral call over gathered atom indices; phi/psi/omega are only defined across intact
+    peptide bonds.
+    """
+    coords = atoms["coords"]
+    res_names = atoms["residue_names"]
+    n_res = len(res_names)
+    n, ca, c = (atom_index(atoms, name) for name in ("N", "CA", "C"))
+    linked = _peptide_links(atoms, n, c, threshold)
+    previous = np.r_[0, np.arange(n_res - 1)]
+    following = np.r_[np.arange(1, n_res), 0]
+    missing = np.full(n_res, -1)
+    next_linked = np.r_[linked[1:], False]
+
+    table = {
+        "phi": _dihedral_at(coords, np.stack([np.where(linked, c[previous], missing), n, ca, c], axis=1)),
+        "psi": _dihedral_at(coords, np.stack([n, ca, c, np.where(next_linked, n[following], missing)], axis=1)),
+        "omega": _dihedral_at(coords, np.stack([np.where(linked, ca[previous], missing),
+                                                np.where(linked, c[previous], missing), n, ca], axis=1)),
+    }
+    names = {name for quads in CHI_ATOMS.values() for quad in quads for name in quad}
+    index = {name: atom_index(atoms, name) for name in names}
+    for k in range(4):
+        quads = np.full((n_res, 4), -1, dtype=np.int64)
+        for res_name, chis in CHI_ATOMS.items():
+            if len(chis) > k:
+                rows = res_names == res_name
+                quads[rows] = np.stack([index[name][rows] for name in chis[k]], axis=1)
+        table[f"chi{k + 1}"] = _dihedral_at(coords, quads)
+
+    classes = np.zeros(n_res, dtype=np.int8)
+    classes[res_names == "GLY"] = RAMACHANDRAN_CLASSES.index("glycine")
+    classes[res_names == "PRO"] = RAMACHANDRAN_CLASSES.index("proline")
+    defined = ~np.isnan(table["phi"]) & ~np.isnan(table["psi"])
+    bins = 360 // _RAMA_BIN
+    phi_bin = (np.floor((np.nan_to_num(table["phi"]) + 180) / _RAMA_BIN).astype(int)) % bins
+    psi_bin = (np.floor((np.nan_to_num(table["psi"]) + 180) / _RAMA_BIN).astype(int)) % bins
+    table["rama_class"] = classes
+    table["rama_region"] = np.where(defined, _RAMA_TABLE[classes, phi_bin, psi_bin], -1)
+    return table
+
+def _backbone_breaks(atoms: Dict, threshold: float) -> List[str]:
+    """Backbone break messages between consecutive standard (ATOM record) residues of each chain."""
+    starts = atoms["residue_starts"]
+    standard = np.flatnonzero(~atoms["hetatm"][starts])
+    chains, names, numbers = atoms["residue_chains"], atoms["residue_names"], atoms["residue_numbers"]
+    first, second = standard[:-1], standard[1:]
+    same_chain = chains[first] == chains[second]
+    first, second = first[same_chain], second[same_chain]
+    n, c = atom_index(atoms, "N"), atom_index(atoms, "C")
+    present = (c[first] >= 0) & (n[second] >= 0)
+    distance = np.full(len(first), np.nan)
+    distance[present] = np.linalg.norm(atoms["coords"][c[first[present]]] - atoms["coords"][n[second[present]]], axis=1)
+
+    breaks = []
+    for i, j, d, ok in zip(first, second, distance, present):
+        if not ok:
+            breaks.append(f"Missing backbone atoms in Chain {chains[i]}: {names[i]}{numbers[i]} or {names[j]}{numbers[j]}")
+        elif d > threshold:
+            breaks.append(f"Break in Chain {chains[i]}: {names[i]}{numbers[i]} - {names[j]}{numbers[j]} (Dist: {d:.2f}A)")
+    return breaks
+
+def _steric_clashes(atoms: Dict, min_distance: float) -> List[str]:
+    """Clash messages for non-bonded atom pairs closer than `min_distance` (KD-tree pair search)."""
+    coords = atoms["coords"]
+    pairs = cKDTree(coords).query_pairs(min_distance, output_type="ndarray")
+    residue = atoms["residue_index"]
+    ri, rj = residue[pairs[:, 0]], residue[pairs[:, 1]]
+    chains, numbers = atoms["residue_chains"], atoms["residue_numbers"]
+    # Skip atoms of one residue and of sequence neighbours (peptide bond)
+    keep = (ri != rj) & ~((chains[ri] == chains[rj]) & (np.abs(numbers[ri] - numbers[rj]) <= 1))
+    pairs = pairs[keep]
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    distance = np.linalg.norm(coords[pairs[:, 0]] - coords[pairs[:, 1]], axis=1)
+    # Disulfide bridges (SG - SG ~2.05 A)
+    elements = atoms["elements"]
+    bridge = (elements[pairs[:, 0]] == "S") & (elements[pairs[:, 1]] == "S") & (distance > 1.8) & (distance < 2.5)
+    names, res_names = atoms["names"], atoms["res_names"]
+    clashes = []
+    for (a, b), d in zip(pairs[~bridge], distance[~bridge]):
+        clashes.append(f"Clash: {res_names[a]}{numbers[residue[a]]}.{names[a]} - "
+                       f"{res_names[b]}{numbers[residue[b]]}.{names[b]} ({d:.2f}A)")
+    return clashes
+
+def _read_all_atoms(pdb_path: str) -> Dict:
+    return read_atoms(pdb_path, hetatm=True, hydrogens=True, waters=True)
 
 def check_backbone_continuity(pdb_path: str, threshold: float = 2.0) -> List[str]:
     """
     Checks for breaks in the protein backbone (C-N distance > threshold).
-    
+
     Args:
         pdb_path (str): Path to the PDB file.
         threshold (float): Max distance in Angstroms for a peptide bond. Default 2.0.
-        
+
     Returns:
         List[str]: List of messages describing breaks (e.g., "Break between A:10 and A:11").
     """
-    parser = PDBParser(QUIET=True)
-    structure = parser.get_structure("check", pdb_path)
-    breaks = []
-    
-    for model in structure:
-        for chain in model:
-            residues = [r for r in chain if r.get_id()[0] == " "] # Standard residues only
-            for i in range(len(residues) - 1):
-                res1 = residues[i]
-                res2 = residues[i+1]
-                
-                # Check if residues are consecutive in numbering
-                # (Note: PDB numbering can be messy, but strictly consecutive residues in sequence should be bonded)
-                # Here we assume list order implies sequence order.
-                
-                if 'C' in res1 and 'N' in res2:
-                    c_atom = res1['C']
-                    n_atom = res2['N']
-                    distance = c_atom - n_atom
-                    
-                    if distance > threshold:
-                        breaks.append(f"Break in Chain {chain.id}: {res1.get_resname()}{res1.get_id()[1]} - {res2.get_resname()}{res2.get_id()[1]} (Dist: {distance:.2f}A)")
-                else:
-                    breaks.append(f"Missing backbone atoms in Chain {chain.id}: {res1.get_resname()}{res1.get_id()[1]} or {res2.get_resname()}{res2.get_id()[1]}")
-                    
-    return breaks
+    return _backbone_breaks(_read_all_atoms(pdb_path), threshold)
 
 def check_steric_clashes(pdb_path: str, min_distance: float = 1.5) -> List[str]:
     """
     Checks for severe steric clashes between non-bonded atoms.
-    
+
     Args:
         pdb_path (str): Path to PDB.
         min_distance (float): Distance threshold in Angstroms. Default 1.5 (severe clash).
-        
+
     Returns:
         List[str]: List of clash descriptions.
     """
-    parser = PDBParser(QUIET=True)
-    structure = parser.get_structure("clash_check", pdb_path)
-    atoms = Selection.unfold_entities(structure, 'A')
-    
-    ns = NeighborSearch(atoms)
-    clashes = []
-    
-    # search_all returns all pairs within radius
-    pairs = ns.search_all(min_distance)
-    
-    for atom1, atom2 in pairs:
-        # Ignore atoms in same residue (bonded or close)
-        if atom1.get_parent() == atom2.get_parent():
-            continue
-            
-        # Ignore atoms in consecutive residues (peptide bond neighbors)
-        res1 = atom1.get_parent()
-        res2 = atom2.get_parent()
-        if res1.get_parent() == res2.get_parent(): # Same chain
-            try:
-                # Simple check for consecutive ID
-                id1 = res1.get_id()[1]
-                id2 = res2.get_id()[1]
-                if abs(id1 - id2) <= 1:
-                    continue
-            except:
-                pass # Fallback to reporting if IDs are weird
-        
-        # If we are here, it's likely a clash or a disulfide bridge
-        # Disulfide: SG - SG usually ~2.05A. If min_distance < 2.0, we might flag it.
-        # Check for disulfide
-        if atom1.element == 'S' and atom2.element == 'S':
-            if 1.8 < (atom1 - atom2) < 2.5:
-                continue # Likely bridge
-
-        clashes.append(f"Clash: {res1.get_resname()}{res1.get_id()[1]}.{atom1.name} - {res2.get_resname()}{res2.get_id()[1]}.{atom2.name} ({atom1 - atom2:.2f}A)")
-        
-    return clashes
+    return _steric_clashes(_read_all_atoms(pdb_path), min_distance)
+
+def calculate_dihedrals(pdb_path: str, output_path: str = None) -> Dict[str, Any]:
+    """
+    Backbone (phi, psi, omega) and side-chain (chi1-chi4) dihedrals of every residue, with the
+    Ramachandran region (favored / allowed / outlier) looked up from a precomputed grid.
+
+    Args:
+        pdb_path (str): Path to PDB.
+        output_path (str): Optional TSV with one row per residue.
+
+    Returns:
+        Dict: Residue count, Ramachandran summary and per-residue rows (angles in degrees,
+        None where undefined).
+    """
+    atoms = _read_all_atoms(pdb_path)
+    table = _dihedral_table(atoms)
+    columns = ("phi", "psi", "omega", "chi1", "chi2", "chi3", "chi4")
+    polymer = np.flatnonzero(~np.isnan(table["phi"]) | ~np.isnan(table["psi"]))
+    residues = []
+    for r in polymer:
+        row = {"residue": atoms["residue_labels"][r]}
+        for name in columns:
+            value = table[name][r]
+            row[name] = None if np.isnan(value) else round(float(value), 1)
+        row["rama_class"] = RAMACHANDRAN_CLASSES[table["rama_class"][r]]
+        row["rama_region"] = RAMACHANDRAN_REGIONS[table["rama_region"][r]] if table["rama_region"][r] >= 0 else None
+        residues.append(row)
+
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w") as f:
+            f.write("residue\t" + "\t".join(columns) + "\trama_class\trama_region\n")
+            for row in residues:
+                f.write("\t".join("" if row[k] is None else str(row[k])
+                                  for k in ("residue",) + columns + ("rama_class", "rama_region")) + "\n")
+    result = {"n_residues": len(residues), "ramachandran": _ramachandran_summary(atoms, table)[0], "residues": residues}
+    if output_path:
+        result["output_path"] = output_path
+    return result
+
+def _ramachandran_summary(atoms: Dict, table: Dict[str, np.ndarray]) -> Tuple[Dict, List[str]]:
+    """Region fractions over residues with both phi and psi, and outlier messages."""
+    region = table["rama_region"]
+    defined = region >= 0
+    total = int(defined.sum())
+    summary = {"n_residues": total}
+    for code, name in enumerate(RAMACHANDRAN_REGIONS):
+        summary[name] = round(float((region == code).sum()) / total, 4) if total else 0.0
+    outliers = [f"{atoms['residue_labels'][r]} (phi {table['phi'][r]:.0f}, psi {table['psi'][r]:.0f})"
+                for r in np.flatnonzero(region == 0)]
+    return summary, outliers
 
 def validate_structure(pdb_path: str) -> Dict[str, Any]:
     """
-    Runs a suite of validation checks on a PDB file.
-    
+    Runs a suite of validation checks on a PDB file: backbone breaks, steric clashes,
+    Ramachandran outliers and cis peptides. The file is parsed once into arrays and every check
+    is vectorized, so large assemblies validate in seconds.
+
     Args:
         pdb_path (str): Path to PDB.
-        
+
     Returns:
-        Dict: validation report.
+        Dict: validation report. Ramachandran outliers are reported but do not affect "is_valid".
     """
-    breaks = check_backbone_continuity(pdb_path)
-    clashes = check_steric_clashes(pdb_path)
-    
+    atoms = _read_all_atoms(pdb_path)
+    breaks = _backbone_breaks(atoms, 2.0)
+    clashes = _steric_clashes(atoms, 1.5)
+    table = _dihedral_table(atoms)
+    ramachandran, outliers = _ramachandran_summary(atoms, table)
+    cis = np.flatnonzero(np.abs(table["omega"]) < 30.0)
+
     valid = len(breaks) == 0 and len(clashes) == 0
-    
+
     return {
         "is_valid": valid,
         "backbone_breaks": breaks,
         "clashes": clashes,
-        "clash_count": len(clashes)
+        "clash_count": len(clashes),
+        "ramachandran": ramachandran,
+        "ramachandran_outliers": outliers,
+        "cis_peptides": [atoms["residue_labels"][r] for r in cis],
     }
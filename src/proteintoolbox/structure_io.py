@@ -0,0 +1,158 @@
+import os
+import numpy as np
+from typing import Dict, Iterable, Iterator, Sequence, Union
+from Bio.Data.IUPACData import protein_letters_3to1
+
+THREE_TO_ONE = {name.upper(): letter for name, letter in protein_letters_3to1.items()}
+THREE_TO_ONE.update({"MSE": "M", "HSD": "H", "HSE": "H", "HSP": "H", "HIE": "H", "HID": "H", "HIP": "H"})
+
+# Atom sets accepted by `read_residue_atoms`
+ATOM_SETS = {
+    "ca": ("CA",),
+    "backbone": ("N", "CA", "C", "O"),
+}
+
+def iter_structures(structures: Union[str, Iterable[str]], extensions=(".pdb",)) -> Iterator[str]:
+    """
+    Yields structure paths from a directory, a text file listing one path per line, or an iterable.
+    """
+    if isinstance(structures, str) and os.path.isdir(structures):
+        yield from (e.path for e in sorted(os.scandir(structures), key=lambda e: e.name)
+                    if e.name.endswith(tuple(extensions)))
+    elif isinstance(structures, str):
+        with open(structures) as f:
+            yield from (line.strip() for line in f if line.strip())
+    else:
+        yield from structures
+
+def read_residue_atoms(pdb_path: str, atoms: Union[str, Sequence[str]] = "ca") -> Dict:
+    """
+    Reads selected atoms of every amino-acid residue in the first model of a PDB file, with a
+    plain line scan (no Bio.PDB object tree), so thousands of files can be read quickly.
+
+    Residues missing any of the requested atoms are skipped; for alternate locations the first
+    one is kept.
+
+    Args:
+        pdb_path: PDB file.
+        atoms: "ca", "backbone" or a sequence of atom names.
+
+    Returns:
+        Dict: "labels" ("A:45_LYS"), "sequence" (one-letter) and "coords" (residues x atoms x 3).
+    """
+    names = ATOM_SETS[atoms] if isinstance(atoms, str) else tuple(atoms)
+    slot = {name: i for i, name in enumerate(names)}
+    residues = {}
+    with open(pdb_path) as f:
+        for line in f:
+            if line.startswith("ENDMDL"):
+                break
+            if not line.startswith(("ATOM", "HETATM")):
+                continue
+            name, res_name = line[12:16].strip(), line[17:20].strip()
+            if name not in slot or res_name not in THREE_TO_ONE:
+                continue
+            key = (line[21], line[22:27])
+            residue = residues.get(key)
+            if residue is None:
+                residue = residues[key] = [res_name, [None] * len(names)]
+            if residue[1][slot[name]] is None:
+                residue[1][slot[name]] = (float(line[30:38]), float(line[38:46]), float(line[46:54]))
+
+    labels, sequence, coords = [], [], []
+    for (chain, number), (res_name, positions) in residues.items():
+        if any(p is None for p in positions):
+            continue
+        labels.append(f"{chain}:{number.strip()}_{res_name}")
+        sequence.append(THREE_TO_ONE[res_name])
+        coords.append(positions)
+    return {
+        "labels": labels,
+        "sequence": "".join(sequence),
+        "coords": np.array(coords, dtype=float).reshape(len(labels), len(names), 3),
+    }
+
+WATERS = {"HOH", "WAT", "SOL", "DOD", "TIP3"}
+
+def read_atoms(pdb_path: str, hetatm: bool = True, hydrogens: bool = False, waters: bool = False) -> Dict:
+    """
+    Reads the first model of a PDB file into column arrays. The fixed-width records are sliced
+    as one byte matrix, so even 100k-atom files are parsed without a per-atom Python loop.
+    For alternate locations the first one is kept.
+
+    Returns:
+        Dict: Per atom: "coords" (n x 3 float), "names", "res_names", "chains", "elements",
+        "hetatm" and "residue_index"; per residue: "residue_labels" ("A:45_LYS"),
+        "residue_names", "residue_chains", "residue_numbers" and "residue_starts" (first atom
+        of each residue).
+    """
+    records = (b"ATOM", b"HETATM") if hetatm else (b"ATOM",)
+    lines = []
+    with open(pdb_path, "rb") as f:
+        for line in f:
+            if line.startswith(records):
+                lines.append(line.rstrip(b"\r\n")[:80].ljust(80))
+            elif line.startswith(b"ENDMDL"):
+                break
+    rows = np.array(lines, dtype="S80").view("S1").reshape(len(lines), 80)
+
+    def column(start: int, end: int) -> np.ndarray:
+        return np.char.strip(rows[:, start:end].copy().view(f"S{end - start}").ravel()).astype(str)
+
+    names, res_names, chains = column(12, 16), column(17, 20), column(21, 22)
+    elements = np.char.upper(column(76, 78))
+    missing = elements == ""
+    if missing.any():
+        # No element column: first letter of the atom name, skipping leading digits (e.g. "1HB")
+        elements[missing] = [name.lstrip("0123456789")[:1].upper() for name in names[missing]]
+    keep = np.ones(len(names), dtype=bool)
+    if (rows[:, 16] != b" ").any():
+        # Same residue and atom name seen before: a later alternate location
+        atom_keys = np.char.add(rows[:, 12:16].copy().view("S4").ravel(), rows[:, 17:27].copy().view("S10").ravel())
+        keep[:] = False
+        keep[np.unique(atom_keys, return_index=True)[1]] = True
+    if not hydrogens:
+        keep &= ~np.isin(elements, ("H", "D"))
+    if not waters:
+        keep &= ~np.isin(res_names, list(WATERS))
+    if not keep.any():
+        raise ValueError(f"No atoms found in {pdb_path}")
+
+    rows = rows[keep]
+    names, res_names, chains, elements = names[keep], res_names[keep], chains[keep], elements[keep]
+    coords = np.stack([column(30, 38), column(38, 46), column(46, 54)], axis=1).astype(float)
+    residue_keys = rows[:, 17:27].copy().view("S10").ravel()
+    starts = np.flatnonzero(np.r_[True, residue_keys[1:] != residue_keys[:-1]])
+    numbers = column(22, 27)[starts]
+    return {
+        "coords": coords,
+        "names": names,
+        "res_names": res_names,
+        "chains": chains,
+        "elements": elements,
+        "hetatm": rows[:, 0] == b"H",
+        "residue_index": np.cumsum(np.r_[True, residue_keys[1:] != residue_keys[:-1]]) - 1,
+        "residue_starts": starts,
+        "residue_names": res_names[starts],
+        "residue_chains": chains[starts],
+        "residue_numbers": np.array([int(n.rstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ")) for n in numbers]),
+        "residue_labels": [f"{c}:{n}_{r}" for c, n, r in zip(chains[starts], numbers, res_names[starts])],
+    }
+
+def atom_index(atoms: Dict, name: str) -> np.ndarray:
+    """Index of the atom called `name` in every residue of a `read_atoms` result (first one), -1 where missing."""
+    index = np.full(len(atoms["residue_starts"]), -1, dtype=np.int64)
+    hits = np.flatnonzero(atoms["names"] == name)[::-1]
+    index[atoms["residue_index"][hits]] = hits
+    return index
+
+def atom_radii(atoms: Dict) -> np.ndarray:
+    """FreeSASA default (ProtOr) radii for a `read_atoms` result, with element radii for unknown atoms."""
+    import freesasa
+    classifier = freesasa.Classifier()
+    fallback = {"C": 1.7, "N": 1.55, "O": 1.52, "S": 1.8, "P": 1.8}
+    radii = np.empty(len(atoms["names"]))
+    for i, (res_name, name, element) in enumerate(zip(atoms["res_names"], atoms["names"], atoms["elements"])):
+        radius = classifier.radius(res_name, name)
+        radii[i] = radius if radius > 0 else fallback.get(element, 1.8)
+    return radii
@@ -4,7 +4,7 @@ from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
 from dataclasses import dataclass
 
-from proteintoolbox.skills import structure_skills, sim_skills, validation_skills
+from proteintoolbox.skills import structure_skills, sim_skills, validation_skills, superposition_skills, interface_skills
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -41,8 +41,8 @@ class Workflow(ABC):
 class AntibodyDesignWorkflow(Workflow):
     """
     A workflow for Antibody structure preparation and analysis.
-    Focuses on validating the structure, identifying surface residues (often CDRs are exposed),
-    and relaxing the structure.
+    Focuses on validating the structure, finding the paratope and epitope (or surface residues
+    for an antibody without antigen), and relaxing the structure.
     """
     
     def __init__(self):
@@ -67,12 +67,23 @@ class AntibodyDesignWorkflow(Workflow):
                 return WorkflowResult(False, data, artifacts, logs) # Abort on breaks
             # Continue if just clashes, minimization fixes them
         
-        # Step 2: Surface Analysis (Identify potential binding sites)
-        logs.append("Step 2: Analyzing surface residues...")
+        # Step 2: Binding Site Analysis (paratope/epitope, or exposed surface without an antigen)
+        logs.append("Step 2: Analyzing binding site...")
         sasa_stats = structure_skills.calculate_sasa(input_pdb)
-        surface_res = structure_skills.identify_surface_residues(input_pdb)
         data['initial_sasa'] = sasa_stats
-        data['surface_residues_count'] = len(surface_res)
+        patches = structure_skills.find_surface_patches(input_pdb)
+        data['largest_patch_area'] = patches['largest_patch_area']
+        binding = interface_skills.find_paratope_epitope(input_pdb)
+        if binding['paratope']:
+            data['paratope'] = binding['paratope']
+            data['epitope'] = binding['epitope']
+            data['interface_buried_sasa'] = binding['buried_sasa']
+            logs.append(f"Paratope: {len(binding['paratope'])} residues, epitope: {len(binding['epitope'])} residues, "
+                        f"{binding['buried_sasa']:.0f} A^2 buried")
+        else:
+            surface_res = structure_skills.identify_surface_residues(input_pdb)
+            data['surface_residues_count'] = len(surface_res)
+            logs.append("No antibody-antigen interface found; using surface residues as binding-site proxy")
         
         # Step 3: Energy Minimization (Relaxation)
         logs.append("Step 3: Minimizing structure...")
@@ -82,6 +93,9 @@ class AntibodyDesignWorkflow(Workflow):
             msg = sim_skills.run_minimization(input_pdb, minimized_pdb_path)
             logs.append(msg)
             artifacts.append(minimized_pdb_path)
+            moved = superposition_skills.structure_rmsd(input_pdb, minimized_pdb_path)
+            data['minimization_rmsd'] = moved['rmsd']
+            logs.append(f"Minimization moved the backbone by {moved['rmsd']:.2f} A CA RMSD")
         except ImportError:
             logs.append("Minimization skipped: OpenMM not installed. Using input structure.")
             minimized_pdb_path = input_pdb
@@ -134,6 +148,9 @@ class EnzymeRefinementWorkflow(Workflow):
             msg = sim_skills.run_minimization(input_pdb, refined_pdb_path)
             logs.append(msg)
             artifacts.append(refined_pdb_path)
+            moved = superposition_skills.structure_rmsd(input_pdb, refined_pdb_path)
+            data['minimization_rmsd'] = moved['rmsd']
+            logs.append(f"Minimization moved the backbone by {moved['rmsd']:.2f} A CA RMSD")
         except ImportError:
             logs.append("Minimization skipped: OpenMM not installed. Using input structure.")
             refined_pdb_path = input_pdb
@@ -0,0 +1,31 @@
+import os
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+TEST_PDB = os.path.join(DATA_DIR, 'pdb1crn.ent')
+
+def random_motion(coords, rng, noise=0.0, shift_scale=10.0, noise_mask=None):
+    """
+    `coords` (N x 3) under a random rotation and translation, after adding Gaussian noise of
+    scale `noise` to every atom (or only to the atoms selected by `noise_mask`).
+    """
+    rotation, _ = np.linalg.qr(rng.normal(size=(3, 3)))
+    rotation *= np.sign(np.linalg.det(rotation))
+    moved = np.array(coords, dtype=float)
+    if noise:
+        mask = np.ones(len(moved), dtype=bool) if noise_mask is None else noise_mask
+        moved[mask] += rng.normal(scale=noise, size=(mask.sum(), 3))
+    return moved @ rotation + rng.normal(scale=shift_scale, size=3)
+
+def write_moved_crambin(path, seed, noise=0.0, hinge=0.0, residues=None):
+    """
+    Writes crambin's ATOM records under `random_motion`. `hinge` shifts residues 1-15 along x
+    first (a second conformation); `residues` keeps only those residue numbers.
+    """
+    with open(TEST_PDB) as f:
+        lines = [line for line in f if line.startswith("ATOM") and (not residues or int(line[22:26]) in residues)]
+    coords = np.array([[float(line[30:38]), float(line[38:46]), float(line[46:54])] for line in lines])
+    coords[[int(line[22:26]) <= 15 for line in lines], 0] += hinge
+    moved = random_motion(coords, np.random.default_rng(seed), noise=noise)
+    path.write_text("".join(f"{line[:30]}{x:8.3f}{y:8.3f}{z:8.3f}{line[54:]}" for line, (x, y, z) in zip(lines, moved)) + "END\n")
+    return str(path)
@@ -0,0 +1,89 @@
+import os
+import numpy as np
+import pytest
+from proteintoolbox.geometry import pairwise_rmsd, superpose
+from proteintoolbox.skills import clustering_skills
+from conftest import write_moved_crambin
+
+@pytest.fixture
+def models(tmp_path):
+    folder = tmp_path / "models"
+    folder.mkdir()
+    for i in range(4):
+        write_moved_crambin(folder / f"open_{i}.pdb", seed=i, noise=0.2)
+    for i in range(3):
+        write_moved_crambin(folder / f"closed_{i}.pdb", seed=10 + i, noise=0.2, hinge=8.0)
+    return str(folder)
+
+def test_pairwise_rmsd_matches_superposition():
+    rng = np.random.default_rng(0)
+    a, b = rng.normal(size=(4, 30, 3)), rng.normal(size=(3, 30, 3))
+    expected = [[superpose(x, y)[1] for y in b] for x in a]
+    assert np.allclose(pairwise_rmsd(a, b), expected)
+
+def test_pairwise_rmsd_degenerate_sets():
+    # Collinear sets zero the QCP derivative; those pairs fall back to SVD
+    lines = np.zeros((2, 10, 3))
+    lines[:, :, 0] = np.arange(10)
+    lines[1, :, 1] = 0.5 * np.arange(10)
+    matrix = pairwise_rmsd(lines, lines)
+    assert np.isfinite(matrix).all()
+    assert np.allclose(matrix, [[superpose(x, y)[1] for y in lines] for x in lines], atol=1e-6)
+
+@pytest.mark.parametrize("method", ["greedy", "hierarchical"])
+def test_clusters_separate_conformations(tmp_path, models, method):
+    report = clustering_skills.cluster_structures(models, str(tmp_path / method), method=method, n_workers=1)
+    assert report["n_structures"] == 7
+    assert report["n_clusters"] == 2
+    assert report["cluster_sizes"] == [4, 3]
+    assert [os.path.exists(p) for p in report["representatives"]] == [True, True]
+    assert "open_" in os.path.basename(report["representatives"][0])
+
+    with open(report["clusters_path"]) as f:
+        rows = [line.split("\t") for line in f.read().splitlines()[1:]]
+    clusters = {os.path.basename(r[0]).split("_")[0]: set() for r in rows}
+    for r in rows:
+        clusters[os.path.basename(r[0]).split("_")[0]].add(r[1])
+    assert clusters == {"open": {"1"}, "closed": {"2"}}
+
+def test_matrix_blocks_are_resumed_and_match_parallel(tmp_path, models):
+    out = str(tmp_path / "serial")
+    clustering_skills.cluster_structures(models, out, block_size=3, n_workers=1)
+    with open(os.path.join(out, "blocks.done")) as f:
+        assert len(f.read().splitlines()) == 6  # 3 x 3 blocks, upper triangle
+    serial = np.load(os.path.join(out, "distances.npy"))
+    assert np.allclose(serial, serial.T) and np.allclose(np.diag(serial), 0)
+
+    # Second run finds every block done and only re-clusters
+    clustering_skills.cluster_structures(models, out, block_size=3, n_workers=1, method="hierarchical")
+    with open(os.path.join(out, "blocks.done")) as f:
+        assert len(f.read().splitlines()) == 6
+
+    parallel = clustering_skills.cluster_structures(models, str(tmp_path / "parallel"), block_size=3, n_workers=2)
+    assert np.allclose(np.load(parallel["matrix_path"]), serial, atol=1e-5)
+
+def test_tm_distance(tmp_path, models):
+    report = clustering_skills.cluster_structures(models, str(tmp_path / "tm"), metric="tm", n_workers=1)
+    matrix = np.load(report["matrix_path"])
+    assert matrix.min() >= 0 and matrix.max() < 1
+    assert report["n_clusters"] == 2
+    # Noise-only copies score close to TM = 1
+    assert matrix[:3, :3].max() < 0.1
+
+def test_backbone_tm_distance_is_scored_per_residue(tmp_path, models):
+    ca = np.load(clustering_skills.cluster_structures(models, str(tmp_path / "ca"), metric="tm", n_workers=1)["matrix_path"])
+    report = clustering_skills.cluster_structures(models, str(tmp_path / "bb"), metric="tm", atoms="backbone", n_workers=1)
+    # d0 comes from the residue count, so the backbone fit only shifts scores slightly
+    assert np.allclose(np.load(report["matrix_path"]), ca, atol=0.02)
+    assert report["n_clusters"] == 2
+    with pytest.raises(ValueError, match="CA"):
+        clustering_skills.cluster_structures(models, str(tmp_path / "no_ca"), metric="tm", atoms=("N", "C"))
+
+def test_representatives_written_to_project(tmp_path, models, monkeypatch):
+    from proteintoolbox import project
+    monkeypatch.setattr(project, "PROJECTS_ROOT", str(tmp_path / "projects"))
+    write_moved_crambin(tmp_path / "models" / "short.pdb", seed=99, noise=0.2, residues=set(range(1, 41)))
+    report = clustering_skills.cluster_structures(models, project_name="campaign", n_workers=1)
+    assert report["output_dir"] == os.path.join(str(tmp_path / "projects"), "campaign", "clusters")
+    assert report["n_skipped"] == 1
+    assert all(p.startswith(report["output_dir"]) for p in report["representatives"])
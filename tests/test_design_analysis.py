@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from proteintoolbox.skills import design_skills, analysis_skills
 
 class TestDesignAnalysis(unittest.TestCase):
@@ -45,5 +46,30 @@ class TestDesignAnalysis(unittest.TestCase):
         self.assertAlmostEqual(comp['A'], 1.0)
         self.assertAlmostEqual(comp['C'], 0.0)
 
+    def test_scan_aggregation(self):
+        seq = "DEKRDEKRIVLIVFLVDEKRDEKR"
+        scan = analysis_skills.scan_aggregation(seq, window=5, hydrophobicity_window=5)
+        self.assertEqual(len(scan["aggregation_profile"]), len(seq))
+        # Profile is the centred 5-residue mean, truncated at the ends
+        a3v = [analysis_skills.AGGREGATION_SCALE[aa] for aa in seq]
+        expected = [np.mean(a3v[max(0, i - 2):i + 3]) for i in range(len(seq))]
+        np.testing.assert_allclose(scan["aggregation_profile"], expected, atol=1e-3)
+        aggregation = [r for r in scan["regions"] if r["type"] == "aggregation"]
+        self.assertEqual(len(aggregation), 1)
+        self.assertIn("IVLIVF", aggregation[0]["sequence"])
+        self.assertEqual(scan["n_hydrophobic_regions"], 1)
+        self.assertEqual(analysis_skills.scan_aggregation("DEKRDEKRDEKR")["regions"], [])
+
+    def test_scan_aggregation_batch(self):
+        library = {"charged": "DEKRDEKRDEKR", "prone": "DEKRDEKRIVLIVFDEKRDEKR", "empty": ""}
+        batch = analysis_skills.scan_aggregation_batch(library, window=5, batch_size=2)
+        self.assertEqual([r["id"] for r in batch["results"]], list(library))
+        self.assertEqual(batch["n_flagged"], 1)
+        # Batched results match scanning each sequence alone
+        single = analysis_skills.scan_aggregation(library["prone"], window=5)
+        self.assertEqual(batch["results"][1]["aggregation_profile"], single["aggregation_profile"])
+        self.assertEqual(batch["results"][1]["regions"], single["regions"])
+        self.assertEqual(batch["results"][2]["length"], 0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,307 @@
+import os
+import pytest
+import pandas as pd
+from rdkit import Chem
+from rdkit.Chem import AllChem
+from proteintoolbox.skills import docking_skills
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+TEST_PDB = os.path.join(DATA_DIR, 'pdb1crn.ent')
+
+# Small box on the crambin surface keeps the tests fast
+CENTER = [10.0, 10.0, 5.0]
+SIZE = [14, 14, 14]
+SMILES = {"phenol": "c1ccccc1O", "paracetamol": "CC(=O)Nc1ccc(O)cc1", "glycerol": "OCC(O)CO"}
+
+def _write_receptor_pdbqt(path):
+    """Minimal rigid receptor: heavy atoms with AutoDock types (Vina ignores charges)."""
+    lines = []
+    with open(TEST_PDB) as f:
+        for line in f:
+            if line.startswith("ATOM"):
+                element, name = line[76:78].strip(), line[12:16].strip()
+                ad_type = {"C": "C", "N": "N" if name == "N" else "NA", "O": "OA", "S": "SA"}[element]
+                lines.append(f"{line[:54]}  1.00  0.00    +0.000 {ad_type:<2}\n")
+    with open(path, "w") as f:
+        f.writelines(lines)
+    return str(path)
+
+@pytest.fixture(scope="module")
+def screen_inputs(tmp_path_factory):
+    root = tmp_path_factory.mktemp("screen")
+    receptor = _write_receptor_pdbqt(root / "receptor.pdbqt")
+    ligand_dir = root / "ligands"
+    ligand_dir.mkdir()
+    for name, smiles in SMILES.items():
+        mol = Chem.AddHs(Chem.MolFromSmiles(smiles))
+        AllChem.EmbedMolecule(mol, randomSeed=1)
+        sdf = str(root / f"{name}.sdf")
+        Chem.MolToMolFile(mol, sdf)
+        docking_skills.prepare_ligand(sdf, str(ligand_dir / f"{name}.pdbqt"))
+    return receptor, str(ligand_dir), root
+
+def test_screen_ligands_and_resume(screen_inputs):
+    receptor, ligand_dir, root = screen_inputs
+    output_dir = str(root / "out")
+
+    summary = docking_skills.screen_ligands(receptor, ligand_dir, CENTER, SIZE, output_dir=output_dir,
+                                            exhaustiveness=1, n_poses=2, n_workers=1, map_cache_dir=str(root / "maps"))
+    assert summary["docked"] == 3
+    assert summary["failed"] == 0
+
+    with open(summary["scores_path"]) as f:
+        rows = [line.rstrip("\n").split("\t") for line in f][1:]
+    assert sorted(r[0] for r in rows) == sorted(SMILES)
+    assert all(float(r[1]) < 0 for r in rows)
+
+    store = docking_skills.DockingResultsStore(summary["results_dir"])
+    assert sorted(store.ligand_ids()) == sorted(SMILES)
+    assert len(store) == sum(int(r[2]) for r in rows)
+
+    # Second run resumes: everything already scored is skipped
+    again = docking_skills.screen_ligands(receptor, ligand_dir, CENTER, SIZE, output_dir=output_dir,
+                                          exhaustiveness=1, n_poses=2, n_workers=1, map_cache_dir=str(root / "maps"))
+    assert again["skipped"] == 3
+    assert again["docked"] == 0
+
+def test_screen_records_failed_ligands(screen_inputs, tmp_path):
+    receptor, ligand_dir, _ = screen_inputs
+    broken = tmp_path / "broken.pdbqt"
+    broken.write_text("not a pdbqt\n")
+
+    summary = docking_skills.screen_ligands(receptor, [os.path.join(ligand_dir, "phenol.pdbqt"), str(broken)],
+                                            CENTER, SIZE, output_dir=str(tmp_path / "out"),
+                                            exhaustiveness=1, n_poses=1, n_workers=1, map_cache_dir=None)
+    assert summary["docked"] == 1
+    assert summary["failed"] == 1
+
+def test_screen_retries_failed_ligands_on_resume(screen_inputs, tmp_path):
+    receptor, ligand_dir, _ = screen_inputs
+    ligand = tmp_path / "late.pdbqt"
+    ligand.write_text("not a pdbqt\n")
+    kwargs = dict(output_dir=str(tmp_path / "out"), exhaustiveness=1, n_poses=1, n_workers=1, map_cache_dir=None)
+
+    first = docking_skills.screen_ligands(receptor, [str(ligand)], CENTER, SIZE, **kwargs)
+    assert first["failed"] == 1
+
+    # The file is fixed before the rerun: it is docked instead of skipped
+    ligand.write_text(open(os.path.join(ligand_dir, "phenol.pdbqt")).read())
+    again = docking_skills.screen_ligands(receptor, [str(ligand)], CENTER, SIZE, **kwargs)
+    assert again["docked"] == 1
+    assert again["skipped"] == 0
+
+    with open(again["scores_path"]) as f:
+        statuses = [line.split("\t")[3] for line in f][1:]
+    assert statuses == ["failed", "docked"]
+
+def test_screen_keeps_same_named_ligands_apart(screen_inputs, tmp_path):
+    receptor, ligand_dir, _ = screen_inputs
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    other = other_dir / "phenol.pdbqt"
+    other.write_text(open(os.path.join(ligand_dir, "glycerol.pdbqt")).read())
+    library = [os.path.join(ligand_dir, "phenol.pdbqt"), str(other)]
+    kwargs = dict(output_dir=str(tmp_path / "out"), exhaustiveness=1, n_poses=1, n_workers=1, map_cache_dir=None)
+
+    summary = docking_skills.screen_ligands(receptor, library, CENTER, SIZE, **kwargs)
+    assert summary["docked"] == 2
+    ids = sorted(docking_skills.DockingResultsStore(summary["results_dir"]).ligand_ids())
+    assert ids[0] == "phenol" and ids[1].startswith("phenol_")
+
+    # IDs are stable across runs, so the resume skips both files
+    again = docking_skills.screen_ligands(receptor, library, CENTER, SIZE, **kwargs)
+    assert again["skipped"] == 2
+
+def test_screen_counts_only_stored_ligands_as_docked(screen_inputs, tmp_path, monkeypatch):
+    receptor, ligand_dir, _ = screen_inputs
+    append = docking_skills.DockingResultsStore.append
+
+    def failing_append(store, ligand_id, poses):
+        if ligand_id == "phenol":
+            raise OSError("disk full")
+        return append(store, ligand_id, poses)
+
+    monkeypatch.setattr(docking_skills.DockingResultsStore, "append", failing_append)
+    kwargs = dict(output_dir=str(tmp_path / "out"), exhaustiveness=1, n_poses=1, n_workers=1, map_cache_dir=None)
+    summary = docking_skills.screen_ligands(receptor, ligand_dir, CENTER, SIZE, **kwargs)
+    assert summary["docked"] == 2
+    assert summary["failed"] == 1
+    assert sorted(docking_skills.DockingResultsStore(summary["results_dir"]).ligand_ids()) == ["glycerol", "paracetamol"]
+
+    # The unstored ligand is retried on resume
+    monkeypatch.setattr(docking_skills.DockingResultsStore, "append", append)
+    again = docking_skills.screen_ligands(receptor, ligand_dir, CENTER, SIZE, **kwargs)
+    assert again["docked"] == 1 and again["skipped"] == 2
+
+_dock_in_worker = docking_skills._dock_in_worker
+
+def _dock_or_crash(ligand_id, ligand_pdbqt, exhaustiveness, n_poses):
+    """Stands in for a Vina segfault: the worker process dies without raising."""
+    if ligand_id == "crash":
+        os._exit(1)
+    return _dock_in_worker(ligand_id, ligand_pdbqt, exhaustiveness, n_poses)
+
+def test_screen_survives_worker_crash(screen_inputs, tmp_path, monkeypatch):
+    receptor, ligand_dir, _ = screen_inputs
+    crash = tmp_path / "crash.pdbqt"
+    crash.write_text(open(os.path.join(ligand_dir, "phenol.pdbqt")).read())
+    library = [str(crash)] + [os.path.join(ligand_dir, f"{name}.pdbqt") for name in SMILES]
+    monkeypatch.setattr(docking_skills, "_dock_in_worker", _dock_or_crash)
+
+    summary = docking_skills.screen_ligands(receptor, library, CENTER, SIZE, output_dir=str(tmp_path / "out"),
+                                            exhaustiveness=1, n_poses=1, n_workers=2, map_cache_dir=None)
+    assert summary["docked"] == 3
+    assert summary["failed"] == 1
+    with open(summary["scores_path"]) as f:
+        rows = [line.rstrip("\n").split("\t") for line in f][1:]
+    assert [r for r in rows if r[3] == "failed"][0][0] == "crash"
+
+def test_results_store_queries(screen_inputs):
+    receptor, ligand_dir, root = screen_inputs
+    results_dir = str(root / "out" / "results")
+    if not os.path.exists(results_dir):
+        docking_skills.screen_ligands(receptor, ligand_dir, CENTER, SIZE, output_dir=str(root / "out"),
+                                      exhaustiveness=1, n_poses=2, n_workers=1, map_cache_dir=str(root / "maps"))
+    store = docking_skills.DockingResultsStore(results_dir)
+
+    top = store.top_k(2)
+    assert len(top) == 2
+    assert list(top["pose_rank"]) == [1, 1]
+    assert top["affinity"].is_monotonic_increasing
+    best = store.filter(max_pose_rank=1)["affinity"].min()
+    assert top["affinity"].iloc[0] == best
+
+    weak = store.filter(min_affinity=float(top["affinity"].iloc[0]) + 1e-3)
+    assert (weak["affinity"] > top["affinity"].iloc[0]).all()
+    assert set(store.filter(ligand_ids=["phenol"])["ligand_id"]) == {"phenol"}
+
+    props = pd.DataFrame({"ligand_id": list(SMILES), "smiles": list(SMILES.values())})
+    joined = store.join(props)
+    assert len(joined) == 3
+    assert dict(zip(joined["ligand_id"], joined["smiles"])) == SMILES
+
+    # Poses are read lazily from their byte offsets
+    pose = store.get_pose(int(top.index[0]))
+    assert pose.startswith("MODEL") and pose.rstrip().endswith("ENDMDL")
+    assert f"{top['affinity'].iloc[0]:.3f}"[:5] in pose
+
+    rows = docking_skills.query_docking_results(results_dir, top_k=1)
+    assert rows[0]["ligand_id"] == top["ligand_id"].iloc[0]
+    assert docking_skills.extract_docking_pose(results_dir, rows[0]["ligand_id"]) == pose
+
+def test_results_store_discards_uncommitted_rows(tmp_path):
+    poses = ("MODEL 1\nREMARK VINA RESULT:    -5.000      0.000      0.000\nATOM\nENDMDL\n"
+             "MODEL 2\nREMARK VINA RESULT:    -4.500      1.200      2.300\nATOM\nENDMDL\n")
+    store = docking_skills.DockingResultsStore(str(tmp_path / "results"))
+    assert store.append("a", poses) == 2
+
+    # Simulate a crash part-way through an append: data written but meta.json not committed
+    with open(tmp_path / "results" / "affinity.bin", "ab") as f:
+        f.write(b"\0" * 8)
+    with open(tmp_path / "results" / "poses.pdbqt", "ab") as f:
+        f.write(b"MODEL 1\n")
+    with open(tmp_path / "results" / "ligands.txt", "a") as f:
+        f.write("b\n")
+
+    reopened = docking_skills.DockingResultsStore(str(tmp_path / "results"))
+    assert len(reopened) == 2
+    assert reopened.ligand_ids() == ["a"]
+    assert list(reopened.filter()["rmsd_ub"]) == pytest.approx([0.0, 2.3])
+    reopened.append("b", poses)
+    assert reopened.get_pose(3).startswith("MODEL 2")
+    assert list(reopened.top_k(5)["ligand_id"]) == ["a", "b"]
+
+def test_grid_map_cache_hits_and_eviction(screen_inputs, tmp_path):
+    receptor, _, _ = screen_inputs
+    cache = docking_skills.GridMapCache(str(tmp_path / "cache"))
+
+    prefix = cache.get_maps(receptor, CENTER, SIZE)
+    assert cache.get_maps(receptor, CENTER, SIZE) == prefix
+    cache.get_maps(receptor, CENTER, [12, 12, 12])
+
+    stats = docking_skills.get_map_cache_stats(str(tmp_path / "cache"))
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 2
+
+    # A 1-byte budget forces the older entries out but keeps the one just stored
+    small = docking_skills.GridMapCache(str(tmp_path / "cache"), max_bytes=1)
+    kept = small.get_maps(receptor, CENTER, [10, 10, 10])
+    assert small.stats()["evictions"] == 2
+    assert small.stats()["entries"] == 1
+    assert any(name.startswith("receptor") for name in os.listdir(os.path.dirname(kept)))
+
+def test_run_docking_reuses_cached_maps(screen_inputs, tmp_path):
+    receptor, ligand_dir, _ = screen_inputs
+    cache_dir = str(tmp_path / "cache")
+    for i in range(2):
+        msg = docking_skills.run_docking(receptor, os.path.join(ligand_dir, "phenol.pdbqt"), CENTER, SIZE,
+                                         output_path=str(tmp_path / f"docked{i}.pdbqt"), exhaustiveness=1,
+                                         n_poses=1, map_cache_dir=cache_dir)
+        assert "Docking complete" in msg
+    assert docking_skills.get_map_cache_stats(cache_dir)["hits"] == 1
+
+def test_prepare_ligand_library_smiles(tmp_path):
+    library = tmp_path / "library.smi"
+    # Phenol twice (different SMILES, same InChIKey) and one unparsable entry
+    library.write_text("c1ccccc1O phenol\nOc1ccccc1 phenol_again\nC1CC broken\nOCC(O)CO glycerol\n")
+    output_dir = str(tmp_path / "prepared")
+
+    summary = docking_skills.prepare_ligand_library(str(library), output_dir, n_workers=1)
+    assert summary["prepared"] + summary["cached"] == 3
+    assert summary["prepared"] >= 2
+    assert summary["failed"] == 1
+
+    with open(summary["ligand_list"]) as f:
+        paths = [line.strip() for line in f]
+    assert len(paths) == 2
+    assert all(os.path.exists(p) and os.path.basename(os.path.dirname(p)) == os.path.basename(p)[:2] for p in paths)
+
+    # Re-running never prepares the same molecule twice
+    again = docking_skills.prepare_ligand_library(str(library), output_dir, n_workers=1)
+    assert again["prepared"] == 0
+    assert again["cached"] == 3
+
+def test_prepare_ligand_library_prepares_in_flight_duplicates_once(tmp_path):
+    library = tmp_path / "library.smi"
+    library.write_text("c1ccccc1O phenol\nOc1ccccc1 phenol_again\nOCC(O)CO glycerol\nC(O)C(O)CO glycerol_again\n")
+    summary = docking_skills.prepare_ligand_library(str(library), str(tmp_path / "prepared"), n_workers=2)
+    assert summary["prepared"] == 2
+    assert summary["cached"] == 2
+    with open(summary["index_path"]) as f:
+        rows = [line.rstrip("\n").split("\t") for line in f][1:]
+    assert sorted(r[0] for r in rows) == ["glycerol", "glycerol_again", "phenol", "phenol_again"]
+    assert len({r[2] for r in rows}) == 2
+
+_prepare_record = docking_skills._prepare_record
+
+def _prepare_or_crash(name, fmt, text, output_dir, seed):
+    """Stands in for an RDKit segfault: the worker process dies without raising."""
+    if name == "crash":
+        os._exit(1)
+    return _prepare_record(name, fmt, text, output_dir, seed)
+
+def test_prepare_ligand_library_survives_worker_crash(tmp_path, monkeypatch):
+    library = tmp_path / "library.smi"
+    library.write_text("CCO crash\nc1ccccc1O phenol\nOCC(O)CO glycerol\nCC(=O)Nc1ccc(O)cc1 paracetamol\n")
+    monkeypatch.setattr(docking_skills, "_prepare_record", _prepare_or_crash)
+
+    summary = docking_skills.prepare_ligand_library(str(library), str(tmp_path / "prepared"), n_workers=2)
+    assert summary["prepared"] == 3
+    assert summary["failed"] == 1
+    with open(summary["failures_path"]) as f:
+        assert f.read().splitlines()[1:] == ["crash\tworker process crashed"]
+
+def test_prepare_ligand_library_gzipped_sdf_without_3d(tmp_path):
+    import gzip
+    library = tmp_path / "library.sdf.gz"
+    with gzip.open(library, "wt") as f:
+        for name, smiles in SMILES.items():
+            mol = Chem.MolFromSmiles(smiles)
+            AllChem.Compute2DCoords(mol)
+            mol.SetProp("_Name", name)
+            f.write(Chem.MolToMolBlock(mol) + "$$$$\n")
+
+    summary = docking_skills.prepare_ligand_library(str(library), str(tmp_path / "prepared"), n_workers=1)
+    assert summary["prepared"] == 3
+    assert summary["failed"] == 0
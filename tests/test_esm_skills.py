@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 from proteintoolbox.skills import esm_skills
 
@@ -10,3 +11,94 @@ def test_esm_embedding():
     assert all(isinstance(x, float) for x in embedding)
     # esm2_t6_8M_UR50D has hidden size 320
     assert len(embedding) == 320
+
+def test_window_spans_cover_sequence():
+    """Test that sliding windows cover every residue and respect the window length."""
+    spans = esm_skills.ESMSkills._window_spans(2500, 1022, 128)
+    assert spans[0][0] == 0
+    assert spans[-1][1] == 2500
+    assert all(end - start == 1022 for start, end in spans)
+    # Neighbouring windows overlap by at least the requested amount
+    assert all(prev[1] - nxt[0] >= 128 for prev, nxt in zip(spans, spans[1:]))
+
+    assert esm_skills.ESMSkills._window_spans(50, 1022, 128) == [(0, 50)]
+    with pytest.raises(ValueError):
+        esm_skills.ESMSkills._window_spans(2500, 100, 100)
+
+def test_esm_embedding_long_sequence():
+    """Test that sequences beyond the ESM-2 positional limit are chunked instead of failing."""
+    seq = "MKTVRQERLKSIVRILERSKEPVSGAQLAEELSVSRQVIVQDIAYLRSLGYNIVATPRGYVLAGG" * 30
+    embedding = esm_skills.get_embedding(seq)
+
+    assert len(seq) > 1022
+    assert len(embedding) == 320
+
+def test_esm_residue_embeddings_windowed():
+    """Test that stitched per-residue embeddings keep one row per residue."""
+    seq = "MKTVRQERLKSIVRILERSKEPVSGAQLAEELSVSRQVIVQDIAYLRSLGYNIVATPRGYVLAGG"
+    residues = esm_skills._esm_skills.get_residue_embeddings(seq, window_size=32, overlap=8, batch_size=2)
+
+    assert residues.shape == (len(seq), 320)
+
+def test_esm_quantized_cpu_backend_accuracy():
+    """Test that the int8 CPU backend stays close to the fp32 embeddings."""
+    skills = esm_skills.ESMSkills(device="cpu", quantize=True, num_threads=2)
+    report = skills.compare_to_reference(["MKTVRQERLKSIVRILERSKEPVSGAQLAEELSVSRQVIVQDIAYLRSLGYNIVATPRGYVLAGG"])
+
+    assert report["min_cosine_similarity"] > 0.95
+
+def test_esm_backend_options_validated():
+    with pytest.raises(ValueError):
+        esm_skills.ESMSkills(dtype="float16")
+    with pytest.raises(ValueError):
+        esm_skills.ESMSkills(dtype="bfloat16", quantize=True)
+
+def test_export_residue_embeddings(tmp_path):
+    """Test that per-residue embeddings are streamed to disk and indexed per record."""
+    fasta = tmp_path / "library.fasta"
+    fasta.write_text(">short\nMKTVRQERLK\n>insulin\nGIVEQCCTSICSLYQLENYCN\n>crambin\nTTCCPSIVARSNFNVCRLPGTPEAICATYTGCIIIPGATCPGDYAN\n"
+                     ">soft_masked\nmktvrqerlk\n")
+    export_dir = tmp_path / "export"
+
+    summary = esm_skills.export_residue_embeddings(str(fasta), str(export_dir), batch_size=2)
+    assert summary["num_sequences"] == 4
+    assert summary["num_residues"] == 10 + 21 + 46 + 10
+
+    residues = esm_skills.load_residue_embeddings(str(export_dir), "insulin")
+    assert residues.shape == (21, 320)
+    assert residues.dtype.name == "float16"
+
+    # Lower-case records are embedded like their upper-case sequence, as in get_residue_embeddings
+    soft_masked = esm_skills.load_residue_embeddings(str(export_dir), "soft_masked").astype(np.float32)
+    assert np.allclose(soft_masked, esm_skills.load_residue_embeddings(str(export_dir), "short"), atol=2e-2)
+    assert np.allclose(soft_masked, esm_skills._esm_skills.get_residue_embeddings("mktvrqerlk").float().cpu().numpy(), atol=2e-2)
+
+    with pytest.raises(KeyError):
+        esm_skills.load_residue_embeddings(str(export_dir), "missing")
+
+def test_score_mutations_masked_marginal():
+    """Test that the L x 20 log-likelihood-ratio matrix covers the saturation library."""
+    from proteintoolbox.skills import design_skills
+    seq = "GIVEQCCTSICSLYQLENYCN"
+    result = esm_skills.score_mutations(seq, batch_size=8)
+
+    assert len(result["scores"]) == len(seq)
+    assert all(len(row) == 20 for row in result["scores"])
+    # Wild-type residues score zero by construction
+    assert result["scores"][0][result["alphabet"].index("G")] == pytest.approx(0.0)
+    # Scores are keyed like the saturation library variants
+    assert set(design_skills.generate_saturation_library(seq, 3)) <= set(result["mutations"])
+    assert len(result["mutations"]) == 19 * len(seq)
+
+def test_score_mutations_wildtype_marginal():
+    seq = "GIVEQCCTSICSLYQLENYCN"
+    result = esm_skills.score_mutations(seq, method="wildtype_marginal")
+    assert len(result["scores"]) == len(seq)
+
+    with pytest.raises(ValueError):
+        esm_skills.score_mutations(seq, method="pseudo_likelihood")
+
+def test_score_mutations_rejects_non_standard_residues():
+    # Checked before the model is loaded
+    with pytest.raises(ValueError, match="non-standard residue\\(s\\) X \\(first at position 3\\)"):
+        esm_skills.score_mutations("mkxtv")
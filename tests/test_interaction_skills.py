@@ -0,0 +1,61 @@
+import os
+import networkx as nx
+import numpy as np
+from proteintoolbox.skills import interaction_skills
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+TEST_PDB = os.path.join(DATA_DIR, 'pdb1crn.ent')
+
+def test_crambin_salt_bridges_and_networks(tmp_path):
+    graph_path = str(tmp_path / "network.graphml")
+    result = interaction_skills.find_interaction_networks(TEST_PDB, graph_path=graph_path)
+    # Arg10 pairs with the C-terminal carboxylate, Arg17 with Glu23
+    assert [(a, b) for a, b, _ in result["salt_bridges"]] == [("A:10_ARG", "A:46_ASN"), ("A:17_ARG", "A:23_GLU")]
+    assert all(d <= 4.0 for _, _, d in result["salt_bridges"])
+    assert result["per_residue"]["A:17_ARG"]["salt_bridges"] == 1
+
+    # H-bonds respect the distance window, and backbone-backbone pairs are excluded by default
+    backbone = ("N", "O", "OXT")
+    for donor, acceptor, distance in result["hbonds"]:
+        assert 2.5 <= distance <= 3.5
+        assert not (donor.split(".")[1] in backbone and acceptor.split(".")[1] in backbone)
+
+    network = next(n for n in result["networks"] if "A:17_ARG" in n["residues"])
+    assert {"A:21_THR", "A:23_GLU"} <= set(network["residues"])
+    assert all(len(n["residues"]) >= 3 for n in result["networks"])
+
+    graph = nx.read_graphml(graph_path)
+    assert graph.number_of_edges() == len(result["graph"]["edges"])
+    assert graph.edges["A:17_ARG", "A:23_GLU"]["salt_bridge"]
+
+def test_backbone_hbonds_follow_secondary_structure():
+    result = interaction_skills.find_interaction_networks(TEST_PDB, backbone_hbonds=True)
+    pairs = {(d.split(".")[0], a.split(".")[0]) for d, a, _ in result["hbonds"]}
+    # Helix 7-19: NH(i+4) -> CO(i)
+    assert ("A:12_ASN", "A:8_VAL") in pairs
+    assert result["n_hbonds"] > interaction_skills.find_interaction_networks(TEST_PDB)["n_hbonds"]
+
+def test_heavy_atom_angle_criterion():
+    coords = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [3.9, 0.0, 0.0], [-0.5, 1.0, 0.0]])
+    center, other = np.array([1, 1]), np.array([2, 3])
+    # Antecedent 0 - donor 1 - acceptor 2 is linear (180 degrees); acceptor 3 folds back (~ 34 degrees)
+    ok = interaction_skills._angle_ok(coords, center, other, np.array([0, 0]))
+    assert ok.tolist() == [True, False]
+
+def test_interface_interactions(tmp_path):
+    with open(TEST_PDB) as f:
+        atoms = [line for line in f if line.startswith("ATOM")]
+    lines = [line[:21] + "A" + line[22:] for line in atoms]
+    for line in atoms:
+        x = float(line[30:38]) + 16.0
+        lines.append(f"{line[:21]}B{line[22:30]}{x:8.3f}{line[38:]}")
+    path = tmp_path / "dimer.pdb"
+    path.write_text("".join(lines))
+
+    result = interaction_skills.find_interaction_networks(str(path))
+    assert result["interface"]["hbonds"]
+    for donor, acceptor in result["interface"]["hbonds"]:
+        assert donor[0] != acceptor[0]
+    # Each copy keeps its own intra-chain salt bridges
+    assert result["n_salt_bridges"] == 4
+    assert any(set(n["chains"]) == {"A", "B"} for n in result["networks"])
@@ -0,0 +1,95 @@
+import os
+import numpy as np
+import pytest
+from proteintoolbox.skills import interface_skills
+from proteintoolbox.structure_io import atom_radii, read_atoms
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+TEST_PDB = os.path.join(DATA_DIR, 'pdb1crn.ent')
+
+def _complex(path, chains=("A", "B"), shift=(16.0, 0.0, 0.0)):
+    """Two crambin copies side by side, the second translated by `shift`."""
+    with open(TEST_PDB) as f:
+        atoms = [line for line in f if line.startswith("ATOM")]
+    lines = [line[:21] + chains[0] + line[22:] for line in atoms]
+    for line in atoms:
+        x, y, z = (float(line[30 + 8 * i:38 + 8 * i]) + shift[i] for i in range(3))
+        lines.append(f"{line[:21]}{chains[1]}{line[22:30]}{x:8.3f}{y:8.3f}{z:8.3f}{line[54:]}")
+    with open(path, "w") as f:
+        f.write("".join(lines) + "END\n")
+    return str(path)
+
+def test_contact_map_matches_dense_distances(tmp_path):
+    output = str(tmp_path / "contacts.npz")
+    report = interface_skills.compute_contact_map(TEST_PDB, cutoff=4.5, output_path=output)
+
+    atoms = read_atoms(TEST_PDB, hetatm=False)
+    distances = np.linalg.norm(atoms["coords"][:, None] - atoms["coords"][None], axis=-1)
+    residue = atoms["residue_index"]
+    n = len(atoms["residue_labels"])
+    expected = np.full((n, n), np.inf)
+    np.minimum.at(expected, (residue[:, None].repeat(len(residue), 1), residue[None].repeat(len(residue), 0)), distances)
+    i, j = np.nonzero(np.triu(expected <= 4.5, k=1))
+    assert report["n_contacts"] == len(i)
+
+    from scipy import sparse
+    matrix = sparse.load_npz(output).toarray()
+    assert np.allclose(matrix[i, j], expected[i, j], atol=1e-3)
+
+def test_min_separation_drops_sequence_neighbours():
+    close = interface_skills.compute_contact_map(TEST_PDB, min_separation=1)
+    far = interface_skills.compute_contact_map(TEST_PDB, min_separation=3)
+    assert far["n_contacts"] < close["n_contacts"]
+    number = lambda label: int(label.split(":")[1].split("_")[0])
+    assert all(number(b) - number(a) >= 3 for a, b, _, _ in far["contacts"])
+
+def test_interface_residues_and_buried_sasa(tmp_path):
+    path = _complex(tmp_path / "complex.pdb")
+    report = interface_skills.analyze_interfaces(path)
+    assert report["n_interfaces"] == 1
+    interface = report["interfaces"][0]
+    assert interface["residues_a"] and all(r.startswith("A:") for r in interface["residues_a"])
+    assert interface["residues_b"] and all(r.startswith("B:") for r in interface["residues_b"])
+    assert interface["n_atom_contacts"] >= interface["n_residue_contacts"] > 0
+
+    # Matches a full FreeSASA calculation of each chain alone and of the complex
+    import freesasa
+    atoms = read_atoms(path)
+    radii = atom_radii(atoms)
+    total = lambda mask: freesasa.calcCoord(atoms["coords"][mask].ravel(), radii[mask]).totalArea()
+    chain_a = atoms["chains"] == "A"
+    expected = total(chain_a) + total(~chain_a) - total(np.ones(len(radii), dtype=bool))
+    assert interface["buried_sasa"] == pytest.approx(expected, abs=0.5)
+    assert sum(interface["buried_by_residue"].values()) == pytest.approx(expected, abs=2.0)
+
+def test_interface_ignores_hetatm_by_default(tmp_path):
+    path = _complex(tmp_path / "complex.pdb")
+    atoms = read_atoms(path)
+    chain_a, chain_b = atoms["coords"][atoms["chains"] == "A"], atoms["coords"][atoms["chains"] == "B"]
+    distances = np.linalg.norm(chain_a[:, None] - chain_b[None], axis=-1)
+    i, j = np.unravel_index(np.argmin(distances), distances.shape)
+    x, y, z = (chain_a[i] + chain_b[j]) / 2
+    with open(path) as f:
+        lines = f.read().replace("END\n", "")
+    with open(path, "w") as f:
+        f.write(lines + f"HETATM 9999 ZN    ZN A 101    {x:8.3f}{y:8.3f}{z:8.3f}  1.00  0.00          ZN\nEND\n")
+
+    default = interface_skills.analyze_interfaces(path)["interfaces"][0]
+    assert not any(r.endswith("_ZN") for r in default["residues_a"])
+    with_ligands = interface_skills.analyze_interfaces(path, hetatm=True)["interfaces"][0]
+    assert "A:101_ZN" in with_ligands["residues_a"]
+
+def test_separated_chains_have_no_interface(tmp_path):
+    path = _complex(tmp_path / "apart.pdb", shift=(60.0, 0.0, 0.0))
+    assert interface_skills.analyze_interfaces(path)["n_interfaces"] == 0
+
+def test_paratope_epitope(tmp_path):
+    path = _complex(tmp_path / "antibody.pdb", chains=("H", "C"))
+    result = interface_skills.find_paratope_epitope(path, antibody_chains=("H", "L"))
+    assert result["antibody_chains"] == ["H"] and result["antigen_chains"] == ["C"]
+    assert result["paratope"] and all(r.startswith("H:") for r in result["paratope"])
+    assert result["epitope"] and all(r.startswith("C:") for r in result["epitope"])
+    assert result["buried_sasa"] > 0
+
+    alone = interface_skills.find_paratope_epitope(TEST_PDB)
+    assert alone["paratope"] == [] and alone["epitope"] == []
@@ -1,6 +1,7 @@
 import unittest
 import os
 import sys
+import tempfile
 
 # Add src to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
@@ -29,6 +30,37 @@ class TestLogicSkills(unittest.TestCase):
         self.assertFalse(result['pass'])
         self.assertIn("GRAVY", result['violations'][0])
 
+    def test_check_design_constraints_aggregation(self):
+        seq = "DEKRDEKRIVLIVFDEKRDEKR"
+        result = logic_skills.check_design_constraints(seq, {"max_aggregation_regions": 0})
+        self.assertFalse(result['pass'])
+        self.assertIn("Aggregation", result['violations'][0])
+        self.assertEqual(result['metrics']['aggregation_regions'], 1)
+        self.assertTrue(logic_skills.check_design_constraints(seq, {"max_aggregation_regions": 1})['pass'])
+
+    def test_screen_designs(self):
+        library = {
+            "soluble": "DEKRDEKRDEKRDEKR",
+            "prone": "DEKRDEKRIVLIVFDEKRDEKR",
+            "heavy": "DEKRDEKRDEKRDEKRDEKRDEKRDEKRDEKRDEKRDEKR",
+        }
+        report = logic_skills.screen_designs(library, {"max_aggregation_regions": 0, "max_molecular_weight": 3000})
+        self.assertEqual(report['passed'], ["soluble"])
+        self.assertEqual(report['n_rejected_aggregation'], 1)
+        stages = {r['id']: r['stage'] for r in report['results']}
+        self.assertEqual(stages, {"soluble": "properties", "prone": "aggregation", "heavy": "properties"})
+        self.assertIn("Molecular Weight", report['results'][2]['violations'][0])
+
+        # FASTA files and plain lists give the same screen under their own ids
+        with tempfile.TemporaryDirectory() as tmp:
+            fasta = os.path.join(tmp, "designs.fasta")
+            with open(fasta, "w") as f:
+                f.writelines(f">{name}\n{seq}\n" for name, seq in library.items())
+            from_fasta = logic_skills.screen_designs(fasta, {"max_aggregation_regions": 0, "max_molecular_weight": 3000})
+        self.assertEqual(from_fasta['passed'], ["soluble"])
+        from_list = logic_skills.screen_designs(list(library.values()), {"max_aggregation_regions": 0})
+        self.assertEqual([r['id'] for r in from_list['results']], ["seq_1", "seq_2", "seq_3"])
+
     def test_infer_functionality_issues(self):
         # Short sequence
         short_seq = "ACDEF"
@@ -0,0 +1,46 @@
+import os
+import numpy as np
+import pytest
+from proteintoolbox.skills import pocket_skills
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+TEST_PDB = os.path.join(DATA_DIR, 'pdb1crn.ent')
+
+def _write_shell(path, center=(20.0, 20.0, 20.0), inner=6.0, outer=12.0, spacing=1.5):
+    """Hollow ball of carbon atoms; the enclosed cavity is the pocket."""
+    grid = np.arange(-outer, outer + spacing, spacing)
+    points = np.stack(np.meshgrid(grid, grid, grid, indexing="ij"), axis=-1).reshape(-1, 3)
+    radius = np.linalg.norm(points, axis=1)
+    keep = (radius >= inner) & (radius <= outer)
+    lines = []
+    for i, (x, y, z) in enumerate(points[keep] + center):
+        lines.append(f"ATOM  {i % 100000:5d}  C   ALA A{i // 10 % 10000:4d}    "
+                     f"{x:8.3f}{y:8.3f}{z:8.3f}  1.00  0.00           C\n")
+    path.write_text("".join(lines))
+    return str(path)
+
+def test_detects_buried_cavity(tmp_path):
+    pdb = _write_shell(tmp_path / "shell.pdb")
+    pockets = pocket_skills.detect_pockets(pdb)
+    assert pockets
+    top = pockets[0]
+    assert top["rank"] == 1
+    assert np.allclose(top["center"], [20.0, 20.0, 20.0], atol=1.5)
+    # Cavity of radius 6 minus the 3 A probe shell leaves a ~3 A ball of empty points
+    assert 50 <= top["volume"] <= 4 / 3 * np.pi * 4.5 ** 3
+    assert all(s > 8 for s in top["size"])
+
+def test_crambin_pockets_are_ranked():
+    pockets = pocket_skills.detect_pockets(TEST_PDB, min_volume=10)
+    assert pockets
+    assert [p["rank"] for p in pockets] == list(range(1, len(pockets) + 1))
+    scores = [p["score"] for p in pockets]
+    assert scores == sorted(scores, reverse=True)
+    assert all(p["residues"] and 0 < p["buriedness"] <= 1 for p in pockets)
+
+def test_suggest_docking_box_matches_top_pocket():
+    box = pocket_skills.suggest_docking_box(TEST_PDB)
+    top = pocket_skills.detect_pockets(TEST_PDB)[0]
+    assert box == {"center": top["center"], "size": top["size"]}
+    with pytest.raises(ValueError):
+        pocket_skills.suggest_docking_box(TEST_PDB, pocket_rank=50)
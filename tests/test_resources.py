@@ -0,0 +1,61 @@
+import subprocess
+import sys
+from proteintoolbox.resources import ResourceProbe, ResourceManager
+
+MEMINFO = "MemTotal:       16384000 kB\nMemFree:         1000000 kB\nMemAvailable:    8192000 kB\n"
+STAT = "cpu  100 0 100 800 0 0 0 0 0 0\ncpu0 100 0 100 800 0 0 0 0 0 0\n"
+
+def _fake_roots(tmp_path, cpu_max=None, memory_max=None, memory_current=None):
+    proc = tmp_path / "proc"
+    cgroup = tmp_path / "cgroup"
+    proc.mkdir()
+    cgroup.mkdir()
+    (proc / "meminfo").write_text(MEMINFO)
+    (proc / "stat").write_text(STAT)
+    if cpu_max:
+        (cgroup / "cpu.max").write_text(cpu_max)
+    if memory_max:
+        (cgroup / "memory.max").write_text(memory_max)
+    if memory_current:
+        (cgroup / "memory.current").write_text(memory_current)
+    return ResourceProbe(proc_root=str(proc), cgroup_root=str(cgroup))
+
+def test_cgroup_v2_limits(tmp_path):
+    probe = _fake_roots(tmp_path, cpu_max="150000 100000", memory_max=str(4 * 2 ** 30), memory_current=str(2 ** 30))
+    assert probe.cgroup_cpu_limit == 1.5
+    assert probe.cpu_count <= 2
+    assert probe.total_memory == 4 * 2 ** 30
+    # Headroom inside the cgroup (3 GiB) is less than MemAvailable (~7.8 GiB)
+    assert probe.available_memory() == 3 * 2 ** 30
+
+def test_unlimited_cgroup(tmp_path):
+    probe = _fake_roots(tmp_path, cpu_max="max 100000", memory_max="max")
+    assert probe.cgroup_cpu_limit is None
+    assert probe.cgroup_memory_limit is None
+    assert probe.total_memory == 16384000 * 1024
+    assert probe.available_memory() == 8192000 * 1024
+
+def test_worker_sizing(tmp_path):
+    probe = _fake_roots(tmp_path, cpu_max="400000 100000")
+    cores = probe.cpu_count
+    assert probe.recommend_workers() == cores
+    assert probe.recommend_workers(threads_per_worker=cores) == 1
+    assert probe.recommend_workers(memory_per_worker_mb=10 ** 6) == 1
+    assert probe.threads_per_worker(cores) == 1
+    snapshot = probe.snapshot(interval=0)
+    assert snapshot["available_memory_mb"] == 8000
+
+def test_gpus_hidden_by_cuda_visible_devices(tmp_path, monkeypatch):
+    monkeypatch.setenv("CUDA_VISIBLE_DEVICES", "")
+    probe = _fake_roots(tmp_path)
+    assert probe.gpus == []
+
+def test_resource_manager_does_not_import_torch():
+    code = (
+        "import sys\n"
+        "from proteintoolbox.resources import ResourceManager\n"
+        "status = ResourceManager().get_status()\n"
+        "print('torch' in sys.modules, status['cpu_count'] >= 1)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "False True"
@@ -0,0 +1,198 @@
+import os
+import struct
+import numpy as np
+import pytest
+from proteintoolbox.skills import sim_skills
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+TEST_PDB = os.path.join(DATA_DIR, 'pdb1crn.ent')
+
+pytestmark = pytest.mark.skipif(sim_skills.mm is None, reason="OpenMM not installed")
+
+def _write_fragment(path, first_residue):
+    """C-terminal segment of crambin (keeps OXT): a different topology from the full chain."""
+    with open(TEST_PDB) as f:
+        atoms = [l for l in f if l.startswith("ATOM") and int(l[22:26]) >= first_residue]
+    path.write_text("".join(atoms) + "END\n")
+    return str(path)
+
+def test_forcefield_is_loaded_once():
+    assert sim_skills._get_forcefield(*sim_skills.DEFAULT_FORCEFIELD) is sim_skills._get_forcefield(*sim_skills.DEFAULT_FORCEFIELD)
+
+def test_minimization_reuses_system_for_identical_topology(tmp_path):
+    engine = sim_skills.MinimizationEngine(solvent="vacuum")
+    first = engine.minimize(TEST_PDB, str(tmp_path / "a.pdb"))
+    second = engine.minimize(TEST_PDB, str(tmp_path / "b.pdb"))
+
+    assert not first["reused_system"]
+    assert second["reused_system"]
+    assert set(first["timings"]) == {"load", "hydrogens", "create_system", "minimize", "write"}
+    assert first["final_energy"] < first["initial_energy"]
+    assert second["final_energy"] == pytest.approx(first["final_energy"], rel=0.05)
+    assert os.path.exists(second["output_path"])
+
+    fragment = engine.minimize(_write_fragment(tmp_path / "frag.pdb", 27), str(tmp_path / "c.pdb"))
+    assert not fragment["reused_system"]
+    assert fragment["n_atoms"] < first["n_atoms"]
+
+def test_run_minimization_skill(tmp_path):
+    msg = sim_skills.run_minimization(TEST_PDB, str(tmp_path / "min.pdb"))
+    assert "Minimization complete" in msg
+    assert os.path.exists(tmp_path / "min.pdb")
+
+def test_engine_pins_cpu_threads(tmp_path):
+    engine = sim_skills.MinimizationEngine(platform="CPU", threads=1, solvent="vacuum")
+    report = engine.minimize(TEST_PDB, str(tmp_path / "a.pdb"))
+    simulation = next(iter(engine._templates.values()))
+    assert simulation.context.getPlatform().getName() == "CPU"
+    assert simulation.context.getPlatform().getPropertyValue(simulation.context, "Threads") == "1"
+    assert not report["timed_out"]
+
+def test_minimization_timeout_stops_early(tmp_path):
+    engine = sim_skills.MinimizationEngine(platform="CPU", threads=1, solvent="vacuum")
+    report = engine.minimize(TEST_PDB, str(tmp_path / "a.pdb"), timeout_s=1e-6)
+    assert report["timed_out"]
+    assert os.path.exists(report["output_path"])
+
+def test_minimize_batch(tmp_path):
+    broken = tmp_path / "broken.pdb"
+    broken.write_text("ATOM      1  CA  XYZ A   1       0.000   0.000   0.000  1.00  0.00           C\nEND\n")
+    inputs = [TEST_PDB, _write_fragment(tmp_path / "frag.pdb", 27), str(broken)]
+
+    summary = sim_skills.minimize_batch(inputs, output_dir=str(tmp_path / "out"), n_workers=1, timeout_s=120,
+                                         solvent="vacuum")
+    assert summary["minimized"] == 2
+    assert summary["failed"] == 1
+    assert summary["threads_per_worker"] >= 1
+
+    with open(summary["summary_path"]) as f:
+        rows = [line.rstrip("\n").split("\t") for line in f][1:]
+    assert {r[1] for r in rows} == {"minimized", "failed"}
+    assert all(os.path.exists(r[5]) for r in rows if r[1] == "minimized")
+
+def test_minimize_batch_keeps_same_named_inputs_apart(tmp_path):
+    inputs = []
+    for folder, first_residue in (("a", 20), ("b", 27)):
+        (tmp_path / folder).mkdir()
+        inputs.append(_write_fragment(tmp_path / folder / "frag.pdb", first_residue))
+
+    summary = sim_skills.minimize_batch(inputs, output_dir=str(tmp_path / "out"), n_workers=1, max_iterations=10,
+                                         solvent="vacuum")
+    assert summary["minimized"] == 2
+    with open(summary["summary_path"]) as f:
+        outputs = {r[0]: r[5] for r in (line.rstrip("\n").split("\t") for line in f.readlines()[1:])}
+    assert len(set(outputs.values())) == 2
+    assert os.path.basename(outputs[inputs[0]]) == "frag_min.pdb"
+
+def test_nonbonded_settings_scale_with_system_size():
+    app = sim_skills.app
+    assert sim_skills._resolve_solvent("auto", 1000) == "vacuum"
+    assert sim_skills._resolve_solvent("auto", 50000) == "cutoff"
+    assert sim_skills._nonbonded_settings("obc2", 1000)["nonbondedMethod"] == app.NoCutoff
+    assert sim_skills._nonbonded_settings("gbn2", 50000)["nonbondedMethod"] == app.CutoffNonPeriodic
+    assert sim_skills._nonbonded_settings("cutoff", 100)["nonbondedMethod"] == app.CutoffNonPeriodic
+    assert sim_skills._nonbonded_settings("pme", 100)["nonbondedMethod"] == app.PME
+    with pytest.raises(ValueError):
+        sim_skills._resolve_solvent("water")
+
+def test_native_obc2_matches_xml_definition():
+    mm, app = sim_skills.mm, sim_skills.app
+    pdb = app.PDBFile(TEST_PDB)
+    modeller = app.Modeller(pdb.topology, pdb.positions)
+    modeller.addHydrogens(sim_skills._get_forcefield("amber14-all.xml"))
+    forcefield = sim_skills._get_forcefield(*sim_skills.SOLVENT_FORCEFIELDS["obc2"])
+
+    energies = []
+    for native in (False, True):
+        system = forcefield.createSystem(modeller.topology, nonbondedMethod=app.NoCutoff)
+        if native:
+            sim_skills._use_native_obc2(system)
+            assert any(isinstance(f, mm.GBSAOBCForce) for f in system.getForces())
+        context = mm.Context(system, mm.VerletIntegrator(0.001), mm.Platform.getPlatformByName("Reference"))
+        context.setPositions(modeller.positions)
+        energies.append(context.getState(getEnergy=True).getPotentialEnergy()._value)
+    assert energies[1] == pytest.approx(energies[0], abs=0.5)
+
+def test_pme_mode_writes_solute_only(tmp_path):
+    engine = sim_skills.MinimizationEngine(platform="CPU", solvent="pme")
+    report = engine.minimize(TEST_PDB, str(tmp_path / "pme.pdb"), max_iterations=20)
+    assert report["solvent"] == "pme"
+    assert report["n_atoms"] > 3000
+    written = sim_skills.app.PDBFile(report["output_path"])
+    assert written.topology.getNumAtoms() < 700
+    assert not any(r.name == "HOH" for r in written.topology.residues())
+
+MD_SETTINGS = dict(equilibration_ps=0.02, report_interval_ps=0.02, checkpoint_interval_ps=0.04,
+                   solvent="vacuum", platform="CPU", threads=1)
+
+def test_run_md_streams_frames_and_analysis(tmp_path):
+    from openmm.app.internal.xtc_utils import get_xtc_nframes
+    report = sim_skills.run_md(TEST_PDB, str(tmp_path / "md"), production_ps=0.1, **MD_SETTINGS)
+
+    assert report["frames"] == 5 and not report["resumed"]
+    assert get_xtc_nframes(report["trajectory_path"].encode()) == 5
+    with open(report["analysis_path"]) as f:
+        rows = [line.split("\t") for line in f.read().splitlines()[1:]]
+    assert [int(r[0]) for r in rows] == [20, 30, 40, 50, 60]
+    assert report["mean_rmsd"] > 0 and report["mean_rg"] == pytest.approx(9.5, abs=0.5)
+    with open(report["rmsf_path"]) as f:
+        assert len(f.read().splitlines()) == 1 + 46
+
+def test_run_md_resumes_from_checkpoint_without_duplicate_frames(tmp_path):
+    out = str(tmp_path / "md")
+    first = sim_skills.run_md(TEST_PDB, out, production_ps=0.1, trajectory_format="dcd", **MD_SETTINGS)
+    trajectory = first["trajectory_path"]
+    # x, y, z records for 642 atoms plus the unit-cell record from crambin's CRYST1 line
+    size, frame_bytes = os.path.getsize(trajectory), 3 * (4 + 4 * 642 + 4) + 56
+
+    # Simulate a crash that left partial output after the last checkpoint
+    with open(trajectory, "ab") as f:
+        f.write(b"\0" * 100)
+    with open(first["analysis_path"], "a") as f:
+        f.write("999\tpartial")
+
+    second = sim_skills.run_md(TEST_PDB, out, production_ps=0.2, trajectory_format="dcd", **MD_SETTINGS)
+    assert second["resumed"]
+    assert second["frames"] == 10 and second["steps"] == 110
+    assert os.path.getsize(trajectory) == size + 5 * frame_bytes
+    with open(trajectory, "rb") as f:
+        f.seek(8)
+        assert struct.unpack("<i", f.read(4))[0] == 10
+    with open(second["analysis_path"]) as f:
+        steps = [int(line.split("\t")[0]) for line in f.read().splitlines()[1:]]
+    assert steps == list(range(20, 111, 10))
+
+def test_run_md_checkpoints_when_interval_is_not_a_report_multiple(tmp_path, monkeypatch):
+    write_atomic, checkpointed_frames = sim_skills._write_atomic, []
+
+    def recording_write(path, write):
+        write_atomic(path, write)
+        checkpointed_frames.append(int(np.load(path)["frames"]))
+
+    monkeypatch.setattr(sim_skills, "_write_atomic", recording_write)
+    # 25-step checkpoint interval against 10-step reports: frames 3 (step 40) and 5 (the end)
+    settings = {**MD_SETTINGS, "checkpoint_interval_ps": 0.05}
+    sim_skills.run_md(TEST_PDB, str(tmp_path / "md"), production_ps=0.1, **settings)
+    assert checkpointed_frames == [0, 3, 5]
+
+@pytest.mark.parametrize("changed", [{"timestep_fs": 1.0}, {"report_interval_ps": 0.04}])
+def test_run_md_refuses_checkpoint_from_other_settings(tmp_path, changed):
+    out = str(tmp_path / "md")
+    sim_skills.run_md(TEST_PDB, out, production_ps=0.04, **MD_SETTINGS)
+    with pytest.raises(ValueError, match=next(iter(changed))):
+        sim_skills.run_md(TEST_PDB, out, production_ps=0.08, **{**MD_SETTINGS, **changed})
+
+def test_run_md_ignores_calcium_ions_in_ca_analysis(tmp_path):
+    calcium_bound = tmp_path / "calcium.pdb"
+    with open(TEST_PDB) as f:
+        atoms = [l for l in f if l.startswith("ATOM")]
+    calcium = "HETATM  328 CA    CA A 101      20.000  10.000   5.000  1.00  0.00          CA\n"
+    calcium_bound.write_text("".join(atoms) + calcium + "END\n")
+
+    report = sim_skills.run_md(str(calcium_bound), str(tmp_path / "md"), production_ps=0.04, **MD_SETTINGS)
+    with open(report["topology_path"]) as f:
+        assert any(l.startswith("HETATM") and l[17:20] == " CA" for l in f)
+    with open(report["rmsf_path"]) as f:
+        rows = [line.split("\t") for line in f.read().splitlines()[1:]]
+    assert len(rows) == 46
+    assert all(r[2] != "CA" for r in rows)
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from proteintoolbox.skills.similarity_skills import EmbeddingIndex, build_embedding_index
+
+def _clustered_vectors(n=2000, dim=32, n_clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    return (centers[rng.integers(0, n_clusters, n)] + 0.2 * rng.normal(size=(n, dim))).astype(np.float32)
+
+def test_exact_search_matches_brute_force():
+    vectors = _clustered_vectors()
+    index = EmbeddingIndex(32)
+    # Incremental adds across several blocks
+    index.add(vectors[:700], [f"p{i}" for i in range(700)])
+    index.add(vectors[700:], [f"p{i}" for i in range(700, 2000)])
+
+    queries = vectors[:5]
+    scores, indices = index.search(queries, k=5, block_size=256)
+
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normed[:5] @ normed.T), axis=1)[:, :5]
+    assert np.array_equal(indices, expected)
+    assert scores[:, 0] == pytest.approx(1.0, abs=1e-5)
+
+def test_approximate_search_finds_self():
+    vectors = _clustered_vectors()
+    index = EmbeddingIndex(32)
+    index.add(vectors, [f"p{i}" for i in range(len(vectors))])
+    index.train_ivfpq(n_lists=16, n_subvectors=8, n_iter=5)
+
+    _, indices = index.search(vectors[:10], k=5, approximate=True, n_probe=4)
+    assert all(i in row for i, row in enumerate(indices))
+
+    with pytest.raises(ValueError):
+        index.train_ivfpq(n_subvectors=5)
+
+def test_index_persistence_and_incremental_add(tmp_path):
+    vectors = _clustered_vectors(n=500)
+    index = EmbeddingIndex(32)
+    index.add(vectors[:400], [f"p{i}" for i in range(400)])
+    index.train_ivfpq(n_lists=8, n_subvectors=4, n_iter=3)
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+
+    loaded = EmbeddingIndex.load(path)
+    assert loaded.ids == index.ids
+    assert loaded.is_trained
+
+    # New entries are encoded against the trained quantizers
+    loaded.add(vectors[400:], [f"p{i}" for i in range(400, 500)])
+    assert len(loaded) == 500
+    _, indices = loaded.search(vectors[450], k=1, approximate=True, n_probe=8)
+    assert loaded.ids[indices[0, 0]] == "p450"
+
+def test_build_index_from_export(tmp_path):
+    export_dir = tmp_path / "export"
+    export_dir.mkdir()
+    residues = np.random.default_rng(1).normal(size=(30, 16)).astype(np.float16)
+    residues.tofile(export_dir / "embeddings.bin")
+    (export_dir / "index.tsv").write_text("id\toffset\tlength\na\t0\t10\nb\t10\t20\n")
+    (export_dir / "metadata.json").write_text('{"dtype": "float16", "hidden_size": 16, "num_residues": 30}')
+
+    path = str(tmp_path / "index.npz")
+    assert build_embedding_index(path, export_dir=str(export_dir)) == {"added": 2, "total": 2}
+    assert build_embedding_index(path, export_dir=str(export_dir))["total"] == 4
+
+    index = EmbeddingIndex.load(path)
+    _, indices = index.search(residues[10:].astype(np.float32).mean(0), k=1)
+    assert index.ids[indices[0, 0]] == "b"
+
+def test_memory_mapped_load_and_cache(tmp_path):
+    from proteintoolbox.skills import similarity_skills
+    vectors = _clustered_vectors(n=300)
+    index = EmbeddingIndex(32)
+    index.add(vectors, [f"p{i}" for i in range(300)])
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+
+    mapped = EmbeddingIndex.load(path, mmap=True)
+    assert isinstance(mapped.vectors, np.memmap)
+    assert np.array_equal(mapped.vectors, index.vectors)
+    assert np.array_equal(mapped.search(vectors[:3], k=3)[1], index.search(vectors[:3], k=3)[1])
+
+    # Reused until the file changes; saving over a mapped index leaves the old map readable
+    cached = similarity_skills._load_cached(path)
+    assert similarity_skills._load_cached(path) is cached
+    index.add(vectors[:1], ["extra"])
+    index.save(path)
+    assert len(similarity_skills._load_cached(path)) == 301
+    assert cached.vectors[0] == pytest.approx(index.vectors[0])
+
+def _write_export(export_dir, vectors, first_id=0):
+    """One-residue records, so each mean-pooled embedding is the vector itself."""
+    export_dir.mkdir()
+    vectors.astype(np.float32).tofile(export_dir / "embeddings.bin")
+    rows = "".join(f"p{first_id + i}\t{i}\t1\n" for i in range(len(vectors)))
+    (export_dir / "index.tsv").write_text("id\toffset\tlength\n" + rows)
+    (export_dir / "metadata.json").write_text(
+        f'{{"dtype": "float32", "hidden_size": {vectors.shape[1]}, "num_residues": {len(vectors)}}}')
+    return str(export_dir)
+
+def test_build_index_extends_trained_quantizers(tmp_path):
+    vectors = _clustered_vectors(n=600)
+    path = str(tmp_path / "index.npz")
+
+    build_embedding_index(path, export_dir=_write_export(tmp_path / "a", vectors[:300]), approximate=True, n_lists=8)
+    centroids = EmbeddingIndex.load(path).centroids
+    extended = build_embedding_index(path, export_dir=_write_export(tmp_path / "b", vectors[300:], 300),
+                                     approximate=True, n_lists=8)
+    assert extended["total"] == 600
+
+    # Existing quantizers are reused and the new vectors encoded against them
+    index = EmbeddingIndex.load(path)
+    assert np.array_equal(index.centroids, centroids)
+    assert len(index.codes) == 600
+    _, indices = index.search(vectors[450], k=1, approximate=True, n_probe=8)
+    assert index.ids[indices[0, 0]] == "p450"
@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+import pytest
+from proteintoolbox import skills
+
+# Generous wall-clock budget for `import proteintoolbox.skills` in a fresh interpreter
+IMPORT_BUDGET_SECONDS = 1.0
+HEAVY_MODULES = ["torch", "transformers", "vina", "meeko", "rdkit", "openmm", "freesasa", "networkx"]
+
+def _run_python(code: str) -> str:
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+def test_import_time_budget():
+    """Importing the registry must not pull in heavy dependencies."""
+    out = _run_python(
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import proteintoolbox.skills\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    elapsed, loaded = (out.splitlines() + [""])[:2]
+    assert float(elapsed) < IMPORT_BUDGET_SECONDS
+    assert loaded == ""
+
+def test_skill_module_imported_on_first_call():
+    out = _run_python(
+        "import sys\n"
+        "from proteintoolbox.skills import SKILL_REGISTRY\n"
+        "print('proteintoolbox.skills.design_skills' in sys.modules)\n"
+        "print(SKILL_REGISTRY['generate_alanine_scan']['function']('MKT')['M1A'])\n"
+        "print('proteintoolbox.skills.design_skills' in sys.modules)\n"
+    )
+    assert out.splitlines() == ["False", "AKT", "True"]
+
+def test_manifest_matches_sources():
+    # Fresh in-memory scan; the committed manifest must be up to date (python -m proteintoolbox.skills)
+    manifest = skills.load_manifest(rebuild=True)
+    assert list(manifest) == skills.SKILL_MODULES
+    with open(skills.MANIFEST_PATH) as f:
+        assert json.load(f) == manifest
+
+    entry = skills.SKILL_REGISTRY["fetch_pdb_structure"]
+    assert entry["module"] == "proteintoolbox.skills.bio_skills"
+    assert entry["signature"] == "(pdb_id: str, output_dir: str = 'data/pdb') -> str"
+    assert entry["short_description"] == "Downloads a PDB structure file."
+    # Private helpers and classes are not skills
+    assert "_embeddings_from_export" not in skills.SKILL_REGISTRY
+    assert "EmbeddingIndex" not in skills.SKILL_REGISTRY
+    assert "scan_aggregation" in skills.SKILL_REGISTRY
+
+def test_skills_require_all():
+    source = b"def listed():\n    pass\n\ndef helper():\n    pass\n\n__all__ = ['listed']\n"
+    assert [s["name"] for s in skills._scan_module("demo", source)["skills"]] == ["listed"]
+    with pytest.raises(ValueError, match="__all__"):
+        skills._scan_module("demo", b"def listed():\n    pass\n")
+
+def test_write_manifest_is_atomic(tmp_path):
+    path = tmp_path / "manifest.json"
+    written = skills.write_manifest(str(path))
+    assert json.loads(path.read_text()) == written
+    assert [p.name for p in tmp_path.iterdir()] == ["manifest.json"]
+
+def test_submodule_attribute_access():
+    assert skills.logic_skills.check_design_constraints
+    with pytest.raises(AttributeError):
+        skills.not_a_skill_module
@@ -6,7 +6,7 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
 from proteintoolbox.skills.bio_skills import fetch_pdb_structure
-from proteintoolbox.skills.structure_skills import calculate_sasa, identify_surface_residues
+from proteintoolbox.skills.structure_skills import calculate_sasa, identify_surface_residues, find_surface_patches, PATCH_TYPES
 
 class TestStructureSkills(unittest.TestCase):
     @classmethod
@@ -28,5 +28,32 @@ class TestStructureSkills(unittest.TestCase):
         self.assertGreater(len(surface_res), 0)
         print(f"Surface residues (first 5): {surface_res[:5]}")
 
+    def test_surface_patches(self):
+        result = find_surface_patches(self.pdb_path)
+        self.assertEqual(set(result["patches"]), {"hydrophobic", "positive", "negative"})
+        hydrophobic = result["patches"]["hydrophobic"]
+        self.assertGreater(len(hydrophobic), 0)
+        self.assertEqual([p["rank"] for p in hydrophobic], list(range(1, len(hydrophobic) + 1)))
+        scores = [p["score"] for p in hydrophobic]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        for patch in hydrophobic:
+            self.assertGreaterEqual(patch["n_residues"], 2)
+            self.assertTrue(all(r.split("_")[1] in PATCH_TYPES["hydrophobic"] for r in patch["residues"]))
+            self.assertEqual(sum(patch["composition"].values()), patch["n_residues"])
+        self.assertEqual(result["largest_patch_area"]["hydrophobic"], max(p["area"] for p in hydrophobic))
+        # Crambin's two arginines are far apart: no positive patch of two or more residues
+        self.assertEqual(result["patches"]["positive"], [])
+
+    def test_surface_patch_linking(self):
+        # With a huge linking distance every exposed residue of a type joins one patch
+        single = find_surface_patches(self.pdb_path, patch_types=["positive"], distance_cutoff=100.0)
+        self.assertEqual(len(single["patches"]["positive"]), 1)
+        self.assertEqual(sorted(single["patches"]["positive"][0]["residues"]), ["A:10_ARG", "A:17_ARG"])
+        # Stricter surface threshold keeps fewer residues
+        buried = find_surface_patches(self.pdb_path, min_relative_sasa=0.6)
+        self.assertLess(buried["n_surface_residues"], find_surface_patches(self.pdb_path)["n_surface_residues"])
+        with self.assertRaises(ValueError):
+            find_surface_patches(self.pdb_path, patch_types=["aromatic"])
+
 if __name__ == '__main__':
     unittest.main()
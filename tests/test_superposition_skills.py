@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from proteintoolbox.geometry import kabsch_batch, superpose, superpose_batch
+from proteintoolbox.skills import superposition_skills
+from proteintoolbox.structure_io import read_residue_atoms
+from conftest import TEST_PDB, write_moved_crambin
+
+def test_batched_fit_matches_single_fits():
+    rng = np.random.default_rng(1)
+    reference = rng.normal(size=(20, 3))
+    mobile = reference + rng.normal(scale=0.2, size=(8, 20, 3))
+    rotations, _, _ = kabsch_batch(mobile, reference)
+    assert np.allclose(np.linalg.det(rotations), 1.0)
+    fitted, rmsds = superpose_batch(mobile, reference)
+    for coords, batch_fit, batch_rmsd in zip(mobile, fitted, rmsds):
+        single_fit, single_rmsd = superpose(coords, reference)
+        assert np.allclose(batch_fit, single_fit)
+        assert batch_rmsd == pytest.approx(single_rmsd)
+
+def test_rigid_copies_superpose_exactly(tmp_path):
+    paths = [write_moved_crambin(tmp_path / f"m{i}.pdb", seed=i) for i in range(5)]
+    report = superposition_skills.superpose_structures(TEST_PDB, paths, atoms="backbone",
+                                                       output_dir=str(tmp_path / "out"), batch_size=2)
+    assert report["n_failed"] == 0
+    assert [r["path"] for r in report["results"]] == paths
+    for result in report["results"]:
+        assert result["rmsd"] < 0.01
+        assert result["n_aligned"] == 46
+
+    # The written copy lies on the reference
+    fitted = read_residue_atoms(report["results"][0]["output_path"])["coords"]
+    assert np.allclose(fitted, read_residue_atoms(TEST_PDB)["coords"], atol=0.01)
+
+def test_transform_reproduces_reported_rmsd(tmp_path):
+    path = write_moved_crambin(tmp_path / "noisy.pdb", seed=3, noise=0.5)
+    result = superposition_skills.superpose_structures(TEST_PDB, [path])["results"][0]
+    mobile = read_residue_atoms(path)["coords"][:, 0]
+    reference = read_residue_atoms(TEST_PDB)["coords"][:, 0]
+    fitted = mobile @ np.array(result["rotation"]) + np.array(result["translation"])
+    assert np.sqrt(((fitted - reference) ** 2).sum(axis=1).mean()) == pytest.approx(result["rmsd"], abs=1e-3)
+    assert result["rmsd"] == pytest.approx(superpose(mobile, reference)[1], abs=1e-3)
+
+def test_sequence_mapping_handles_missing_residues(tmp_path):
+    fragment = write_moved_crambin(tmp_path / "fragment.pdb", seed=4, residues=set(range(5, 41)))
+    by_sequence = superposition_skills.structure_rmsd(TEST_PDB, fragment, mapping="sequence")
+    assert by_sequence["n_aligned"] == 36
+    assert by_sequence["rmsd"] < 0.01
+    # Pairing residues in order puts the fragment out of register
+    assert superposition_skills.structure_rmsd(TEST_PDB, fragment, mapping="index")["rmsd"] > 1.0
+
+def test_unreadable_structures_are_reported(tmp_path):
+    empty = tmp_path / "empty.pdb"
+    empty.write_text("END\n")
+    report = superposition_skills.superpose_structures(TEST_PDB, [TEST_PDB, str(empty)])
+    assert report["n_failed"] == 1
+    assert "error" in report["results"][1]
+    assert report["results"][0]["rmsd"] == pytest.approx(0.0, abs=1e-3)
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from proteintoolbox.geometry import superpose
+from proteintoolbox.skills import trajectory_skills
+from conftest import TEST_PDB, random_motion
+
+app = pytest.importorskip("openmm.app")
+unit = pytest.importorskip("openmm.unit")
+
+def _frames(n_frames=12, seed=0):
+    """Crambin under random rigid motions, with the last residue (ASN 46) jiggling."""
+    pdb = app.PDBFile(TEST_PDB)
+    coords = pdb.getPositions(asNumpy=True).value_in_unit(unit.angstrom)
+    mobile = np.array([a.residue.index == 45 for a in pdb.topology.atoms()])
+    rng = np.random.default_rng(seed)
+    frames = [random_motion(coords, rng, noise=0.5, shift_scale=5.0, noise_mask=mobile) for _ in range(n_frames)]
+    return pdb.topology, coords, np.array(frames)
+
+def _write(tmp_path, fmt, n_frames=12):
+    topology, coords, frames = _frames(n_frames)
+    topology_path = str(tmp_path / "topology.pdb")
+    with open(topology_path, "w") as f:
+        app.PDBFile.writeFile(topology, coords * unit.angstrom, f)
+    path = str(tmp_path / f"traj.{fmt}")
+    if fmt == "dcd":
+        with open(path, "wb") as f:
+            writer = app.DCDFile(f, topology, 0.002)
+            for frame in frames:
+                writer.writeModel(frame * unit.angstrom)
+    elif fmt == "xtc":
+        writer = app.XTCFile(path, topology, 0.002)
+        for frame in frames:
+            writer.writeModel(frame * unit.angstrom)
+    else:
+        with open(path, "w") as f:
+            for i, frame in enumerate(frames):
+                app.PDBFile.writeModel(topology, frame * unit.angstrom, f, modelIndex=i + 1)
+            app.PDBFile.writeFooter(topology, f)
+    return path, topology_path, coords, frames
+
+@pytest.mark.parametrize("fmt, tolerance", [("dcd", 1e-3), ("xtc", 1e-2), ("pdb", 1e-3)])
+def test_readers_return_chunks_in_angstroms(tmp_path, fmt, tolerance):
+    path, _, _, frames = _write(tmp_path, fmt)
+    reader = trajectory_skills._open_trajectory(path)
+    assert reader.n_frames == len(frames)
+    assert reader.n_atoms == frames.shape[1]
+    assert np.allclose(reader.read(3, 7), frames[3:7], atol=tolerance)
+    assert len(reader.read(10, 100)) == 2
+    # Strided reads return only the kept frames
+    assert np.allclose(reader.read(1, 12, 4), frames[1:12:4], atol=tolerance)
+
+def test_analyze_trajectory_matches_direct_calculation(tmp_path):
+    path, topology_path, coords, frames = _write(tmp_path, "dcd")
+    report = trajectory_skills.analyze_trajectory(path, topology_path, str(tmp_path / "out"),
+                                                  chunk_size=5, n_workers=1)
+    assert report["frames"] == 12
+
+    ca = [a.index for a in app.PDBFile(topology_path).topology.atoms() if a.name == "CA"]
+    expected = [superpose(frame[ca], coords[ca])[1] for frame in frames]
+    with open(report["frames_path"]) as f:
+        rows = [line.split("\t") for line in f.read().splitlines()[1:]]
+    assert [int(r[0]) for r in rows] == list(range(12))
+    assert np.allclose([float(r[2]) for r in rows], expected, atol=1e-3)
+
+    # Only the perturbed C-terminal residue moves relative to the rigid body
+    assert report["most_flexible"][0] == "A:46_ASN"
+    with open(report["contacts_path"]) as f:
+        contacts = f.read().splitlines()[1:]
+    assert contacts and all(float(c.split("\t")[2]) >= 0.1 for c in contacts)
+
+def test_parallel_chunks_and_stride(tmp_path):
+    path, topology_path, _, _ = _write(tmp_path, "xtc", n_frames=20)
+    serial = trajectory_skills.analyze_trajectory(path, topology_path, str(tmp_path / "serial"),
+                                                  chunk_size=3, n_workers=1, timestep_ps=2.0)
+    parallel = trajectory_skills.analyze_trajectory(path, topology_path, str(tmp_path / "parallel"),
+                                                    chunk_size=3, n_workers=2, timestep_ps=2.0)
+    for name in ("frames_path", "rmsf_path", "contacts_path"):
+        with open(serial[name]) as a, open(parallel[name]) as b:
+            assert a.read() == b.read()
+
+    strided = trajectory_skills.analyze_trajectory(path, topology_path, str(tmp_path / "strided"),
+                                                   chunk_size=4, stride=3, n_workers=1, timestep_ps=2.0)
+    with open(strided["frames_path"]) as f:
+        assert [line.split("\t")[1] for line in f.read().splitlines()[1:]] == [f"{6.0 * i:.3f}" for i in range(7)]
+
+def test_atom_count_mismatch_is_rejected(tmp_path):
+    path, _, _, _ = _write(tmp_path, "dcd", n_frames=2)
+    fragment = tmp_path / "fragment.pdb"
+    with open(TEST_PDB) as f:
+        fragment.write_text("".join(l for l in f if l.startswith("ATOM") and int(l[22:26]) < 10))
+    with pytest.raises(ValueError, match="atoms"):
+        trajectory_skills.analyze_trajectory(path, str(fragment), str(tmp_path / "out"))
+
+def test_calcium_ion_is_not_a_ca_atom(tmp_path):
+    topology_path = tmp_path / "calcium.pdb"
+    with open(TEST_PDB) as f:
+        atoms = [l for l in f if l.startswith("ATOM")]
+    calcium = "HETATM 9999 CA    CA A 101       0.000   0.000   0.000  1.00  0.00          CA\n"
+    topology_path.write_text("".join(atoms) + calcium)
+    topology = trajectory_skills._read_topology(str(topology_path))
+    for selection in ("ca", "heavy", "all"):
+        assert len(topology["names"]) - 1 not in trajectory_skills._select(topology, selection)
+    assert len(trajectory_skills._select(topology, "ca")) == 46
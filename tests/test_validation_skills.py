@@ -6,7 +6,10 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
 from proteintoolbox.skills.bio_skills import fetch_pdb_structure
+import numpy as np
+from Bio.PDB import PDBParser, PPBuilder
 from proteintoolbox.skills.validation_skills import validate_structure, check_backbone_continuity, check_steric_clashes
+from proteintoolbox.skills.validation_skills import calculate_dihedrals, _RAMA_TABLE, _RAMA_BIN, RAMACHANDRAN_REGIONS
 
 class TestValidationSkills(unittest.TestCase):
     @classmethod
@@ -26,5 +29,55 @@ class TestValidationSkills(unittest.TestCase):
         clashes = check_steric_clashes(self.pdb_path, min_distance=0.5) # Very strict to avoid noise, 1CRN is high qual
         self.assertIsInstance(clashes, list)
 
+    def test_dihedrals_match_biopython(self):
+        structure = PDBParser(QUIET=True).get_structure("crn", self.pdb_path)
+        expected = []
+        for peptide in PPBuilder().build_peptides(structure):
+            expected += [[np.nan if a is None else np.degrees(a) for a in pair] for pair in peptide.get_phi_psi_list()]
+        result = calculate_dihedrals(self.pdb_path)
+        angles = [[np.nan if r[k] is None else r[k] for k in ("phi", "psi")] for r in result["residues"]]
+        np.testing.assert_allclose(angles, expected, atol=0.06)
+        # Chain ends have no phi (first) or psi (last)
+        self.assertIsNone(result["residues"][0]["phi"])
+        self.assertIsNone(result["residues"][-1]["psi"])
+        # Side chains: Thr has chi1 only, Arg all four
+        thr = result["residues"][0]
+        self.assertIsNotNone(thr["chi1"])
+        self.assertIsNone(thr["chi2"])
+        arg = next(r for r in result["residues"] if r["residue"].endswith("ARG"))
+        self.assertTrue(all(arg[k] is not None for k in ("chi1", "chi2", "chi3", "chi4")))
+
+    def test_ramachandran_lookup(self):
+        def region(cls, phi, psi):
+            bins = 360 // _RAMA_BIN
+            return RAMACHANDRAN_REGIONS[_RAMA_TABLE[cls, int((phi + 180) // _RAMA_BIN) % bins, int((psi + 180) // _RAMA_BIN) % bins]]
+        self.assertEqual(region(0, -63, -43), "favored")   # alpha helix
+        self.assertEqual(region(0, -120, 130), "favored")  # beta strand
+        self.assertEqual(region(0, 60, -120), "outlier")
+        self.assertEqual(region(1, 80, 10), "favored")     # left-handed glycine
+        self.assertEqual(region(2, 60, 40), "outlier")     # proline cannot take positive phi
+
+    def test_validation_report_dihedrals_and_breaks(self):
+        report = validate_structure(self.pdb_path)
+        self.assertEqual(report["ramachandran"]["n_residues"], 44)
+        self.assertGreater(report["ramachandran"]["favored"], 0.9)
+        self.assertEqual(report["ramachandran_outliers"], [])
+        self.assertEqual(report["cis_peptides"], [])
+
+        # Dropping residues 10-12 breaks the chain: no phi across the gap
+        gapped = os.path.join(os.path.dirname(self.pdb_path), "gapped_1crn.pdb")
+        try:
+            with open(self.pdb_path) as f, open(gapped, "w") as out:
+                out.writelines(l for l in f if not (l.startswith("ATOM") and 10 <= int(l[22:26]) <= 12))
+            breaks = check_backbone_continuity(gapped)
+            self.assertEqual(len(breaks), 1)
+            self.assertIn("ALA9 - PHE13", breaks[0])
+            residues = {r["residue"]: r for r in calculate_dihedrals(gapped)["residues"]}
+            self.assertIsNone(residues["A:13_PHE"]["phi"])
+            self.assertIsNone(residues["A:9_ALA"]["psi"])
+            self.assertEqual(validate_structure(gapped)["ramachandran"]["n_residues"], 44 - 3 - 2)
+        finally:
+            os.remove(gapped)
+
 if __name__ == '__main__':
     unittest.main()